@@ -21,16 +21,31 @@ import csv
 import argparse
 import logging
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Set
-from datetime import datetime
+from typing import List, Tuple, Optional, Dict, Set, Union, NamedTuple
+from datetime import datetime, timedelta
 import re
 import json
 import hashlib
 import secrets
 import time
 import random
+import errno
+import functools
+import bisect
+import heapq
+import gzip
+import mmap
+import array
+import struct
+import threading
+import asyncio
+import queue
+import multiprocessing
+import socket
+import contextlib
 from urllib.parse import quote
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 try:
     from tqdm import tqdm
@@ -38,6 +53,12 @@ try:
 except ImportError:
     TQDM_AVAILABLE = False
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # Default Microsoft limits and thresholds
 DEFAULT_MAX_site_url_count = 400
 DEFAULT_MAX_FILENAME_LENGTH = 255
@@ -75,6 +96,104 @@ INVALID_CHARS_BASE = set('~"*:<>?/\\{|}')
 MAX_RETRIES = 3
 BASE_RETRY_DELAY = 0.5
 TRANSIENT_ERROR_CODES = [32, 53, 64, 121]  # Sharing violation, network, file in use, timeout
+# POSIX equivalents (e.g. Linux CIFS mounts); some are missing on Windows
+TRANSIENT_ERRNOS = {
+    getattr(errno, name) for name in (
+        'EAGAIN', 'EBUSY', 'EINTR', 'EIO', 'ETIMEDOUT', 'EHOSTDOWN', 'EHOSTUNREACH',
+        'ENETDOWN', 'ENETUNREACH', 'ECONNRESET', 'ECONNABORTED', 'ESTALE'
+    ) if hasattr(errno, name)
+}
+
+# Deferred retry kinds
+RETRY_LISTING = 'listing'
+RETRY_STAT = 'stat'
+
+# Passed as an item's stat_result once its stat has failed for good (after
+# any deferred retries): falsy like None, but check_item does not stat again
+STAT_FAILED = False
+
+# Traversal engines: 'thread' (serial, or a pool with --workers), 'async'
+# and 'pipeline' (enumerate -> check -> write stages)
+ENGINES = ['thread', 'async', 'pipeline']
+DEFAULT_MAX_INFLIGHT = 128  # Concurrent directory listings for the async engine
+DEFAULT_QUEUE_SIZE = 256  # Bounded queue length between pipeline stages
+
+# --workers auto: AIMD control of concurrent directory listings
+WORKERS_AUTO = 'auto'
+AUTO_WORKERS_INITIAL = 4
+AUTO_WORKERS_MAX = 64
+AUTO_WINDOW_SECONDS = 2.0  # Minimum measurement window between adjustments
+AUTO_LATENCY_FACTOR = 2.0  # Window latency above baseline * factor means the share is saturated
+AUTO_BASELINE_DRIFT = 1.02  # Lets the latency baseline rise slowly when it is never matched again
+AUTO_MIN_GAIN = 1.05  # Throughput must improve by 5% to keep adding listings
+
+# Politeness throttling: longest single sleep while waiting for the scan window
+SCHEDULE_POLL_SECONDS = 60
+
+# Sharded (--processes) scans split the top of the tree until there are at
+# least this many shards per process, so one large subtree cannot dominate
+SHARDS_PER_PROCESS = 4
+MAX_SHARD_SPLIT_LEVELS = 2
+
+# Distributed (--queue-dir) scans: shards are leased from a shared directory;
+# a lease whose heartbeat stops for this long goes back to the queue
+DEFAULT_LEASE_TIMEOUT = 120
+QUEUE_POLL_SECONDS = 2.0
+
+# Rule engine: metadata a rule reads besides the item's name and path, and
+# which items it applies to
+RULE_NEEDS_SIZE = 'size'
+RULE_NEEDS_MTIME = 'mtime'
+RULE_NEEDS_SIBLINGS = 'siblings'
+RULE_APPLIES_ANY = 'any'
+RULE_APPLIES_FILE = 'file'
+RULE_APPLIES_FOLDER = 'folder'
+RULE_APPLIES_TO = [RULE_APPLIES_ANY, RULE_APPLIES_FILE, RULE_APPLIES_FOLDER]
+
+# Memoized URL encoding of path components (folder and file names repeat across a share)
+QUOTE_CACHE_SIZE = 65536
+
+# Batch checking (--batch-check, needs NumPy): folders with at least this
+# many entries are pre-checked with array comparisons
+BATCH_MIN_ENTRIES = 256
+
+# Issue report columns (stable order)
+REPORT_FIELDNAMES = [
+    'ItemType', 'FullPath', 'IssueType', 'CurrentValue', 'SuggestedFix',
+    'CharacterCount', 'CharacterCountPath', 'SiteURLCount', 'SharePointURL',
+    'FileSizeMB', 'FolderDepth'
+]
+REPORT_INT_FIELDS = ['CharacterCount', 'CharacterCountPath', 'SiteURLCount', 'FolderDepth']
+
+# Inventory ModifiedDate column (local time); read back by --from-inventory
+INVENTORY_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Checkpoint/resume
+DEFAULT_CHECKPOINT_INTERVAL = 30  # Seconds between checkpoints
+
+# Compact tree snapshot (--tree-snapshot)
+TREE_SNAPSHOT_MAGIC = b'SPOTREE1'
+TREE_SNAPSHOT_HEADER = struct.Struct('<8sIIQQQ')  # magic, version, byte order, items, names, name bytes
+TREE_NO_PARENT = 0xFFFFFFFF
+TREE_FLAG_FILE = 1
+
+# Watch mode (--watch)
+DEFAULT_WATCH_INTERVAL = 300  # Seconds between passes
+
+# Recheck mode (--recheck-from): status of each issue compared to the previous report
+RECHECK_STILL_OPEN = 'Still open'
+RECHECK_RESOLVED = 'Resolved'
+RECHECK_NEW = 'New'
+RECHECK_FIELDNAMES = REPORT_FIELDNAMES + ['RecheckStatus']
+
+# Multi-destination scans (--destinations): combined report tags each row
+DESTINATION_FIELDNAMES = ['Destination'] + REPORT_FIELDNAMES
+
+# What-if destinations (--what-if): one row per candidate destination
+WHAT_IF_FIELDNAMES = [
+    'SharePointURL', 'DocumentLibrary', 'SharePointBase', 'URLOverhead', 'EffectivePathLimit',
+    'ItemsChecked', 'PathTooLong', 'LongestURL'
+]
 
 
 def get_invalid_chars(allow_hash_percent: bool = True) -> Set[str]:
@@ -85,6 +204,18 @@ def get_invalid_chars(allow_hash_percent: bool = True) -> Set[str]:
     return chars
 
 
+def build_spo_base(spo_url: str, spo_library: str) -> str:
+    """SharePoint URL prefix of every item in a library: site URL + encoded library + '/'."""
+    return f"{spo_url.rstrip('/')}/{quote(spo_library)}/"
+
+
+@functools.lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def quote_path_component(name: str) -> str:
+    """URL-encode one path component as it appears in a SharePoint URL (memoized)."""
+    # Backslashes become separators, as they do when a Windows relative path is converted
+    return quote(name.replace('\\', '/'))
+
+
 def check_reserved_name(name: str) -> bool:
     """Check if name is a Windows reserved device name or special SharePoint file."""
     base_name = os.path.splitext(name)[0].upper()
@@ -108,8 +239,28 @@ def check_reserved_name(name: str) -> bool:
     return False
 
 
+def is_transient_error(error: OSError) -> bool:
+    """Classify an OSError as transient (worth retrying) by winerror or errno."""
+    if isinstance(error, TimeoutError):
+        return True
+    if getattr(error, 'winerror', None) in TRANSIENT_ERROR_CODES:
+        return True
+    return error.errno in TRANSIENT_ERRNOS
+
+
+def retry_backoff_delay(attempt: int) -> float:
+    """Exponential backoff with 10% jitter for the given (0-based) retry attempt."""
+    delay = BASE_RETRY_DELAY * (2 ** attempt)
+    return delay + random.uniform(0, delay * 0.1)
+
+
 def retry_with_backoff(func, *args, max_retries: int = MAX_RETRIES, **kwargs):
-    """Retry function with exponential backoff for transient errors."""
+    """
+    Retry function with exponential backoff for transient errors.
+    
+    This sleeps in the calling thread; the scanner itself defers transient
+    failures to DeferredRetryQueue instead.
+    """
     for attempt in range(max_retries):
         try:
             return func(*args, **kwargs)
@@ -117,15 +268,76 @@ def retry_with_backoff(func, *args, max_retries: int = MAX_RETRIES, **kwargs):
             if attempt == max_retries - 1:
                 raise
             
-            if hasattr(e, 'winerror') and e.winerror in TRANSIENT_ERROR_CODES:
-                delay = BASE_RETRY_DELAY * (2 ** attempt)
-                jitter = random.uniform(0, delay * 0.1)
-                time.sleep(delay + jitter)
+            if is_transient_error(e):
+                time.sleep(retry_backoff_delay(attempt))
                 continue
             else:
                 raise
 
 
+class DeferredRetryQueue:
+    """
+    Transient failures parked for a later pass.
+    
+    Scanning threads never sleep on a flaky share: a listing or stat that
+    fails with a transient error is queued here with a backoff deadline
+    and retried after the main pass, up to max_retries times.
+    """
+    
+    def __init__(self, max_retries: int = MAX_RETRIES):
+        self.max_retries = max_retries
+        self.retries = 0
+        self.permanent_failures = 0
+        self._items = []  # (ready_at, kind, path, payload)
+        self._attempts = {}  # (kind, path) -> retries scheduled so far
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+    
+    def defer(self, kind: str, path: str, payload=None) -> bool:
+        """Queue a failed operation; returns False once its retries are used up."""
+        with self._lock:
+            attempt = self._attempts.get((kind, path), 0)
+            if attempt >= self.max_retries:
+                return False
+            self._attempts[(kind, path)] = attempt + 1
+            self._items.append((time.monotonic() + retry_backoff_delay(attempt), kind, path, payload))
+            return True
+    
+    def record_failure(self):
+        """Count an operation that failed for good (permanent error or retries exhausted)."""
+        with self._lock:
+            self.permanent_failures += 1
+    
+    def take_ready(self) -> List[Tuple[str, str, object]]:
+        """Wait for the earliest backoff to expire and return every operation that is due."""
+        with self._lock:
+            earliest = min(item[0] for item in self._items)
+        
+        delay = earliest - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        
+        now = time.monotonic()
+        with self._lock:
+            ready = [item for item in self._items if item[0] <= now]
+            self._items = [item for item in self._items if item[0] > now]
+            self.retries += len(ready)
+        return [(kind, path, payload) for _, kind, path, payload in ready]
+    
+    def add_counts(self, retries: int = 0, permanent_failures: int = 0):
+        """Fold in counts from another queue (e.g. a shard worker process)."""
+        with self._lock:
+            self.retries += retries
+            self.permanent_failures += permanent_failures
+    
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            return {'retries': self.retries, 'permanent_failures': self.permanent_failures}
+
+
 def anonymize_path(path: str, salt: str) -> str:
     """Hash path components for PHI/PII compliance."""
     parts = path.split(os.sep)
@@ -371,150 +583,1742 @@ def interactive_setup() -> Tuple[str, str, str, bool]:
     return scan_path, url, library_name, is_onedrive
 
 
-class StreamedCSVWriter:
-    """Write CSV rows as issues are found (memory efficient)."""
+class NameViolations(NamedTuple):
+    """Name-level problems found by NameValidator.check (only returned when there is one)."""
+    reserved: bool
+    too_long: bool
+    invalid_chars: List[str]  # Distinct invalid characters, in order of appearance
+    padded: bool  # Leading/trailing space or period
+    blocked_extension: Optional[str]
+
+
+class NameValidator:
+    """
+    Name-level checks for one scanner configuration, compiled once.
     
-    def __init__(self, output_path: str, fieldnames: List[str], anonymize_fn=None):
-        self.output_path = output_path
-        self.fieldnames = fieldnames
-        self.anonymize_fn = anonymize_fn
-        self.file = None
-        self.writer = None
-        self.issue_count = 0
+    check() classifies a name with one precompiled character-class regex
+    for invalid characters, an anchored reserved-name regex that only runs
+    for names starting with a character a reserved name can start with,
+    and index/lookup tests for padding, length and blocked extensions.
+    Clean names (the vast majority) cost a handful of C-level operations.
+    """
     
-    def __enter__(self):
-        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
-        self.file = open(self.output_path, 'w', newline='', encoding='utf-8-sig')
-        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames)
-        self.writer.writeheader()
-        return self
+    def __init__(self, invalid_chars: Set[str], max_filename: int, blocked_extensions: Set[str]):
+        self.max_filename = max_filename
+        # Matches the os.path.splitext(...)[1].lower() lookup, so only lowercase entries can match
+        self.blocked_extensions = frozenset(ext for ext in blocked_extensions if ext == ext.lower())
+        self.sanitize_table = str.maketrans({char: '_' for char in invalid_chars})
+        self._invalid = re.compile('[' + ''.join(re.escape(char) for char in sorted(invalid_chars)) + ']')
+        
+        # Device names with or without one extension (as split by os.path.splitext),
+        # special files and the temp-file prefix; _vti_ anywhere is a substring test
+        devices = '|'.join(sorted(RESERVED_NAMES))
+        patterns = '|'.join(re.escape(pattern) for pattern in RESERVED_PATTERNS)
+        self._reserved = re.compile(
+            rf"(?i:(?:(?:{devices})(?:\.[^.]*)?|{patterns})\Z)|{re.escape(TEMP_PREFIX)}"
+        )
+        initials = [name[0] for name in RESERVED_NAMES] + [pattern[0] for pattern in RESERVED_PATTERNS]
+        self._reserved_initials = frozenset(
+            [char.lower() for char in initials] + [char.upper() for char in initials] + [TEMP_PREFIX[0]]
+        )
     
-    def write_issue(self, issue: dict):
-        """Write single issue immediately."""
-        if self.anonymize_fn:
-            issue = issue.copy()
-            issue['FullPath'] = self.anonymize_fn(issue['FullPath'])
-            issue['CurrentValue'] = self.anonymize_fn(issue['CurrentValue'])
+    def check(self, name: str, is_file: bool) -> Optional[NameViolations]:
+        """Return the name's violations, or None if it has none."""
+        invalid_chars = self._invalid.findall(name)
+        reserved = (
+            (name[0] in self._reserved_initials and self._reserved.match(name) is not None)
+            or ('_' in name and VTI_PATTERN in name.lower())
+        )
+        padded = name[0] in ' .' or name[-1] in ' .'
+        too_long = len(name) > self.max_filename
+        
+        blocked_extension = None
+        if is_file:
+            dot = name.rfind('.')
+            if dot > 0:
+                ext = name[dot:]
+                if ext.lower() in self.blocked_extensions and name[:dot].lstrip('.'):
+                    blocked_extension = ext
         
-        self.writer.writerow(issue)
-        self.issue_count += 1
+        if not (invalid_chars or reserved or padded or too_long or blocked_extension):
+            return None
+        return NameViolations(reserved, too_long, list(dict.fromkeys(invalid_chars)), padded, blocked_extension)
     
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.file:
-            self.file.close()
+    def sanitize(self, name: str) -> str:
+        """Replace invalid characters with underscores and trim spaces/periods."""
+        return name.translate(self.sanitize_table).strip(' .')
 
 
-class PreflightScanner:
-    """Core scanner logic for SharePoint Online preflight checks."""
+class ItemFacts:
+    """
+    Metadata of one item as seen by the rules, shared by all of its IssueRecords.
     
-    def __init__(
-        self,
-        scan_root: str,
-        max_path: int = DEFAULT_MAX_site_url_count,
-        max_filename: int = DEFAULT_MAX_FILENAME_LENGTH,
-        max_file_size_gb: int = DEFAULT_MAX_FILE_SIZE_GB,
-        max_depth: int = DEFAULT_MAX_FOLDER_DEPTH,
-        blocked_extensions: Optional[List[str]] = None,
-        allow_hash_percent: bool = True,
-        exclude_dirs: Optional[List[str]] = None,
-        exclude_exts: Optional[List[str]] = None,
-        workers: int = 1,
-        anonymize: bool = False,
-        progress: bool = False,
-        stream_csv: bool = True,
-        spo_url: Optional[str] = None,
-        spo_library: Optional[str] = None,
-        is_onedrive: bool = False,
-        spo_overhead: int = 80
-    ):
-        self.scan_root = os.path.normpath(scan_root)
-        self.max_path = max_path
-        self.max_filename = max_filename
-        self.max_file_size_bytes = max_file_size_gb * 1024 * 1024 * 1024
-        self.max_depth = max_depth
-        self.blocked_extensions = set(
-            (blocked_extensions or DEFAULT_BLOCKED_EXTENSIONS)
-        )
-        self.invalid_chars = get_invalid_chars(allow_hash_percent)
-        self.exclude_dirs = set(exclude_dirs or DEFAULT_EXCLUDE_DIRS)
-        self.exclude_exts = set(exclude_exts or DEFAULT_EXCLUDE_EXTS)
-        self.workers = workers
-        self.anonymize = anonymize
-        self.progress = progress and TQDM_AVAILABLE
-        self.stream_csv = stream_csv
-        self.anon_salt = secrets.token_hex(16) if anonymize else None
-        self.scan_count = 0
-        self.issue_count = 0
-        self.logger = logging.getLogger(__name__)
-        self.csv_writer = None
-        
-        # SharePoint URL configuration
-        self.spo_url = spo_url
-        self.spo_library = spo_library
-        self.is_onedrive = is_onedrive
-        
-        # Calculate SharePoint URL base and overhead
-        if spo_url and spo_library:
-            library_encoded = quote(spo_library)
-            self.spo_base = f"{spo_url.rstrip('/')}/{library_encoded}/"
-            self.url_overhead = len(self.spo_base)
-            self.effective_path_limit = 400 - self.url_overhead
-        else:
-            self.spo_base = None
-            self.url_overhead = spo_overhead
-            self.effective_path_limit = 400 - spo_overhead
-        
-        if anonymize:
-            self.logger.info(f"Anonymization enabled. Salt: {self.anon_salt} (save to de-anonymize)")
-        
-        if progress and not TQDM_AVAILABLE:
-            self.logger.warning("tqdm not installed. Progress bar disabled. Install with: pip install tqdm")
+    size and mtime are None unless a rule needs them; folder is the parent's
+    FolderContext and scanner the scanner (or destination checker) whose
+    limits the item was checked against.
+    """
+    __slots__ = ('name', 'full_path', 'is_file', 'size', 'mtime', 'depth', 'site_url_count', 'folder',
+                 'violations', 'colliding_names', 'scanner')
     
-    def should_exclude(self, entry_name: str, is_dir: bool) -> bool:
-        """Check if item should be excluded from scan."""
-        if is_dir:
-            return entry_name in self.exclude_dirs
-        else:
-            _, ext = os.path.splitext(entry_name)
-            return ext.lower() in self.exclude_exts
+    def __init__(self, name: str, full_path: str, is_file: bool, size: Optional[int], mtime: Optional[float],
+                 depth: int, site_url_count: int, folder: 'FolderContext', violations: Optional[NameViolations],
+                 colliding_names: List[str], scanner: 'PreflightScanner'):
+        self.name = name
+        self.full_path = full_path
+        self.is_file = is_file
+        self.size = size
+        self.mtime = mtime
+        self.depth = depth
+        self.site_url_count = site_url_count
+        self.folder = folder
+        self.violations = violations
+        self.colliding_names = colliding_names
+        self.scanner = scanner
+    
+    def sharepoint_url(self) -> str:
+        folder = self.folder
+        return folder.base + folder.prefix + quote_path_component(self.name) if folder.base else 'N/A'
+    
+    def file_size_mb(self) -> str:
+        return f'{self.size / (1024 * 1024):.2f}' if self.size is not None and self.is_file else ''
+
 
+class Rule:
+    """
+    One check in the rule registry.
     
-    def compute_depth(self, full_path: str, root_path: str) -> int:
-        """
-        Compute folder depth relative to the scan root.
-        Handles both local drives and UNC paths correctly.
-        """
-        try:
-            # Normalize paths
-            full_normalized = os.path.normpath(full_path)
-            root_normalized = os.path.normpath(root_path)
-            
-            # Get relative path
-            rel_path = os.path.relpath(full_normalized, root_normalized)
-            
-            # Count directory separators
-            if rel_path == '.':
-                return 0
-            return rel_path.count(os.sep)
-        except (ValueError, Exception) as e:
-            self.logger.warning(f"Could not compute depth for {full_path}: {e}")
-            return 0
+    needs lists the item metadata the check reads besides the name and
+    path (RULE_NEEDS_SIZE, RULE_NEEDS_MTIME, RULE_NEEDS_SIBLINGS); files are
+    only stat'ed, and folders only compared for case collisions, when an
+    enabled rule needs it. check(scanner, item) tells whether an ItemFacts
+    breaks the rule; describe(scanner, item) returns its (CurrentValue,
+    SuggestedFix) text and only runs when the issue is written out.
+    """
+    __slots__ = ('name', 'issue_type', 'check', 'describe', 'needs', 'applies_to')
     
-    def sanitize_filename(self, name: str) -> str:
-        """
-        Replace invalid characters with underscores and trim spaces/periods.
-        """
-        # Replace invalid characters
-        sanitized = ''.join('_' if c in self.invalid_chars else c for c in name)
+    def __init__(self, name: str, issue_type: str, check, describe, needs: Tuple[str, ...] = (),
+                 applies_to: str = RULE_APPLIES_ANY):
+        self.name = name
+        self.issue_type = issue_type
+        self.check = check
+        self.describe = describe
+        self.needs = frozenset(needs)
+        self.applies_to = applies_to
+
+
+def _rule_reserved_name(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+    return bool(item.violations and item.violations.reserved)
+
+
+def _describe_reserved_name(scanner: 'PreflightScanner', item: ItemFacts):
+    return item.name, f'{item.name}_file' if item.is_file else f'{item.name}_folder'
+
+
+def _rule_path_length(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+    return item.site_url_count > scanner.max_path
+
+
+def _describe_path_length(scanner: 'PreflightScanner', item: ItemFacts):
+    length = item.site_url_count
+    return (f'SharePoint URL: {length} chars' if item.folder.base else f'{length} chars',
+            f'Shorten to ≤{scanner.max_path} chars (current: {length}, limit: {scanner.max_path})')
+
+
+def _rule_filename_length(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+    return bool(item.violations and item.violations.too_long)
+
+
+def _rule_invalid_chars(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+    return bool(item.violations and item.violations.invalid_chars)
+
+
+def _describe_invalid_chars(scanner: 'PreflightScanner', item: ItemFacts):
+    return f"{item.name} (chars: {', '.join(item.violations.invalid_chars)})", scanner.suggest_fix(item.name)
+
+
+def _rule_padding(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+    return bool(item.violations and item.violations.padded)
+
+
+def _describe_renamed(scanner: 'PreflightScanner', item: ItemFacts):
+    return item.name, scanner.suggest_fix(item.name)
+
+
+def _rule_blocked_extension(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+    return bool(item.violations and item.violations.blocked_extension)
+
+
+def _describe_blocked_extension(scanner: 'PreflightScanner', item: ItemFacts):
+    return item.violations.blocked_extension, 'Remove or rename file'
+
+
+def _rule_file_size(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+    return item.size > scanner.max_file_size_bytes
+
+
+def _describe_file_size(scanner: 'PreflightScanner', item: ItemFacts):
+    return (f'{item.size / (1024 * 1024):.2f} MB',
+            f'Split or reduce to ≤{scanner.max_file_size_bytes / (1024**3):.0f} GB')
+
+
+def _rule_folder_depth(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+    return item.depth > scanner.max_depth
+
+
+def _describe_folder_depth(scanner: 'PreflightScanner', item: ItemFacts):
+    return str(item.depth), f'Flatten hierarchy to ≤{scanner.max_depth} levels'
+
+
+def _rule_case_collision(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+    return bool(item.colliding_names)
+
+
+def _describe_case_collision(scanner: 'PreflightScanner', item: ItemFacts):
+    return (f'{item.name} (collides with: {", ".join(item.colliding_names)})',
+            f'Rename to make unique: {item.name}_1, {item.name}_2, etc.')
+
+
+# Built-in rules, in report order. The name rules read NameValidator results.
+BUILTIN_RULES = [
+    Rule('reserved-name', 'Reserved device name (Windows)', _rule_reserved_name, _describe_reserved_name),
+    Rule('path-length', 'Path too long', _rule_path_length, _describe_path_length),
+    Rule('filename-length', 'Filename too long', _rule_filename_length, _describe_renamed),
+    Rule('invalid-chars', 'Invalid characters', _rule_invalid_chars, _describe_invalid_chars),
+    Rule('padding', 'Leading/trailing space or period', _rule_padding, _describe_renamed),
+    Rule('blocked-extension', 'Blocked file extension', _rule_blocked_extension, _describe_blocked_extension,
+         applies_to=RULE_APPLIES_FILE),
+    Rule('file-size', 'File too large', _rule_file_size, _describe_file_size, (RULE_NEEDS_SIZE,), RULE_APPLIES_FILE),
+    Rule('folder-depth', 'Excessive folder depth', _rule_folder_depth, _describe_folder_depth),
+    Rule('case-collision', 'Case-insensitive duplicate', _rule_case_collision, _describe_case_collision,
+         (RULE_NEEDS_SIBLINGS,)),
+]
+NAME_RULES = {'reserved-name', 'filename-length', 'invalid-chars', 'padding', 'blocked-extension'}
+
+
+def age_reference() -> float:
+    """Local midnight of today as a timestamp: ages are whole-day cut-offs, stable through one scan day."""
+    return datetime.combine(datetime.now().date(), datetime.min.time()).timestamp()
+
+
+def build_custom_rule(spec: dict) -> Rule:
+    """
+    Build a rule from a --custom-rules entry.
+    
+    An item breaks the rule when every condition given holds:
+    name_pattern (regex searched in the name), min_size_mb/max_size_mb
+    (files) and older_than_days/newer_than_days (last modified, counted
+    from the scanner's age_reference, local midnight of the scan day).
+    
+    Raises:
+        ValueError: if the entry is missing its name, issue type or conditions
+    """
+    if not isinstance(spec, dict) or not spec.get('name') or not spec.get('issue_type'):
+        raise ValueError(f"each custom rule needs a name and issue_type: {spec}")
+    applies_to = spec.get('applies_to', RULE_APPLIES_ANY)
+    if applies_to not in RULE_APPLIES_TO:
+        raise ValueError(f"applies_to must be one of {', '.join(RULE_APPLIES_TO)}: {spec}")
+    
+    try:
+        pattern = re.compile(spec['name_pattern']) if spec.get('name_pattern') else None
+    except re.error as e:
+        raise ValueError(f"invalid name_pattern in rule {spec['name']}: {e}")
+    min_size = spec.get('min_size_mb')
+    max_size = spec.get('max_size_mb')
+    # Ages in seconds; the cut-off times depend on the day the scan runs
+    older_than = spec['older_than_days'] * 86400 if spec.get('older_than_days') is not None else None
+    newer_than = spec['newer_than_days'] * 86400 if spec.get('newer_than_days') is not None else None
+    
+    needs = []
+    if min_size is not None or max_size is not None:
+        needs.append(RULE_NEEDS_SIZE)
+    if older_than is not None or newer_than is not None:
+        needs.append(RULE_NEEDS_MTIME)
+    if pattern is None and not needs:
+        raise ValueError(f"custom rule {spec['name']} has no conditions")
+    suggested_fix = spec.get('suggested_fix', 'Review before migrating')
+    
+    def check(scanner: 'PreflightScanner', item: ItemFacts) -> bool:
+        if pattern is not None and not pattern.search(item.name):
+            return False
+        if min_size is not None or max_size is not None:
+            size_mb = (item.size or 0) / (1024 * 1024)
+            if (min_size is not None and size_mb < min_size) or (max_size is not None and size_mb > max_size):
+                return False
+        if older_than is not None or newer_than is not None:
+            if item.mtime is None:
+                return False
+            age = scanner.age_reference - item.mtime
+            if (older_than is not None and age <= older_than) or (newer_than is not None and age > newer_than):
+                return False
+        return True
+    
+    def describe(scanner: 'PreflightScanner', item: ItemFacts):
+        details = []
+        if min_size is not None or max_size is not None:
+            details.append(f'{(item.size or 0) / (1024 * 1024):.2f} MB')
+        if older_than is not None or newer_than is not None:
+            details.append(f"modified {datetime.fromtimestamp(item.mtime).strftime('%Y-%m-%d')}")
+        return (f"{item.name} ({', '.join(details)})" if details else item.name), suggested_fix
+    
+    return Rule(spec['name'], spec['issue_type'], check, describe, tuple(needs), applies_to)
+
+
+class IssueRecord(Mapping):
+    """
+    One issue found by check_item: the rule an item breaks, and the item.
+    
+    All issues of an item share its ItemFacts, so a record is three slots
+    instead of an 11-key dict. The report text (CurrentValue, SuggestedFix,
+    SharePointURL, FileSizeMB) is only formatted at the output sink: row()
+    builds the whole report row, and reading a column by key (the same
+    interface as the dict rows read back from reports and snapshots)
+    formats just that column.
+    """
+    __slots__ = ('item', 'rule', 'destination')
+    
+    def __init__(self, item: ItemFacts, rule: Rule, destination: Optional[str] = None):
+        self.item = item
+        self.rule = rule
+        self.destination = destination  # Set in multi-destination scans
+    
+    def row(self) -> dict:
+        """The issue as a report row."""
+        item = self.item
+        current_value, suggested_fix = self.rule.describe(item.scanner, item)
+        row = {
+            'ItemType': 'File' if item.is_file else 'Folder',
+            'FullPath': item.full_path,
+            'IssueType': self.rule.issue_type,
+            'CurrentValue': current_value,
+            'SuggestedFix': suggested_fix,
+            'CharacterCount': len(item.name),
+            'CharacterCountPath': len(item.full_path),
+            'SharePointURL': item.sharepoint_url(),
+            'SiteURLCount': item.site_url_count,
+            'FileSizeMB': item.file_size_mb(),
+            'FolderDepth': item.depth,
+        }
+        if self.destination is not None:
+            row['Destination'] = self.destination
+        return row
+    
+    def __getitem__(self, key: str):
+        if key == 'Destination' and self.destination is not None:
+            return self.destination
+        column = ISSUE_COLUMNS.get(key)
+        if column is None:
+            raise KeyError(key)
+        return column(self)
+    
+    def __iter__(self):
+        yield from REPORT_FIELDNAMES
+        if self.destination is not None:
+            yield 'Destination'
+    
+    def __len__(self):
+        return len(REPORT_FIELDNAMES) + (self.destination is not None)
+
+
+# Column getters for reading one IssueRecord column by key
+ISSUE_COLUMNS = {
+    'ItemType': lambda issue: 'File' if issue.item.is_file else 'Folder',
+    'FullPath': lambda issue: issue.item.full_path,
+    'IssueType': lambda issue: issue.rule.issue_type,
+    'CurrentValue': lambda issue: issue.rule.describe(issue.item.scanner, issue.item)[0],
+    'SuggestedFix': lambda issue: issue.rule.describe(issue.item.scanner, issue.item)[1],
+    'CharacterCount': lambda issue: len(issue.item.name),
+    'CharacterCountPath': lambda issue: len(issue.item.full_path),
+    'SharePointURL': lambda issue: issue.item.sharepoint_url(),
+    'SiteURLCount': lambda issue: issue.item.site_url_count,
+    'FileSizeMB': lambda issue: issue.item.file_size_mb(),
+    'FolderDepth': lambda issue: issue.item.depth,
+}
+
+
+def report_row(issue: Mapping) -> dict:
+    """An issue as a report row: IssueRecords are formatted, rows read from files pass through."""
+    return issue.row() if isinstance(issue, IssueRecord) else issue
+
+
+def issue_metrics(issue: Mapping) -> Tuple[str, str, int, int, Optional[float]]:
+    """(IssueType, FullPath, path length, FolderDepth, FileSizeMB or None) of an issue, without formatting it."""
+    if isinstance(issue, IssueRecord):
+        item = issue.item
+        size_mb = round(item.size / (1024 * 1024), 2) if item.is_file and item.size is not None else None
+        return issue.rule.issue_type, item.full_path, len(item.full_path), item.depth, size_mb
+    return (issue['IssueType'], issue['FullPath'], int(issue['CharacterCountPath']), int(issue['FolderDepth'] or 0),
+            float(issue['FileSizeMB']) if issue['FileSizeMB'] else None)
+
+
+class BatchChecker:
+    """
+    Vectorized pre-check of a folder's entries for --batch-check (needs NumPy).
+    
+    flagged() encodes a whole listing as one UTF-8 buffer of NUL-separated
+    names (no file name can contain NUL) and evaluates the name length,
+    file size, depth and SharePoint URL length limits, invalid characters
+    and padding as NumPy array operations. Reserved names are only matched
+    for names whose first byte can start one, and _vti_ and blocked
+    extensions are found with one regex scan of the joined names. It may
+    flag clean rows but never misses a row with an issue: flagged rows
+    still go through check_item, which builds the report, so only the rows
+    that fail pay per-item Python cost. Built-in rules only.
+    """
+    SEP = '\0'
+    
+    def __init__(self, scanner: 'PreflightScanner'):
+        enabled = {rule.name for rule in scanner.rules}
+        self.validator = scanner.name_validator
+        self.max_path = scanner.max_path if 'path-length' in enabled else None
+        self.max_filename = scanner.max_filename if 'filename-length' in enabled else None
+        self.max_file_size = scanner.max_file_size_bytes if 'file-size' in enabled else None
+        self.max_depth = scanner.max_depth if 'folder-depth' in enabled else None
+        self.check_reserved = 'reserved-name' in enabled
+        self.check_collisions = 'case-collision' in enabled
         
-        # Strip leading/trailing spaces and periods
-        sanitized = sanitized.strip(' .')
+        # Byte tables (all invalid characters, padding characters and reserved-name
+        # initials are ASCII, so one UTF-8 byte is one character for these tests)
+        self.invalid_bytes = self._byte_table(scanner.invalid_chars if 'invalid-chars' in enabled else ())
+        self.padding_bytes = self._byte_table(' .' if 'padding' in enabled else ())
+        self.reserved_initial_bytes = self._byte_table(self.validator._reserved_initials)
+        # Encoded length of each byte in quote_path_component: unreserved
+        # characters and '/' (a backslash becomes one) stay, the rest are %XX
+        self.quote_costs = np.full(256, 3, dtype=np.int64)
+        self.quote_costs[list(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~/\\')] = 1
+        self.quote_costs[0] = 0
         
-        return sanitized
+        # Case-insensitive substring tests of NameValidator.check
+        sep = re.escape(self.SEP)
+        patterns = [re.escape(VTI_PATTERN)] if self.check_reserved else []
+        if 'blocked-extension' in enabled and self.validator.blocked_extensions:
+            patterns.append(
+                '(?:' + '|'.join(re.escape(ext) for ext in sorted(self.validator.blocked_extensions)) + f')(?={sep})'
+            )
+        self.substrings = re.compile('|'.join(patterns), re.IGNORECASE) if patterns else None
     
-    def truncate_to_limit(self, name: str, limit: int) -> str:
+    @staticmethod
+    def _byte_table(chars) -> 'np.ndarray':
+        table = np.zeros(256, dtype=bool)
+        table[[ord(char) for char in chars if ord(char) < 128]] = True
+        return table
+    
+    def flagged(self, rows: List[tuple], folder: 'FolderContext') -> List[tuple]:
         """
-        Truncate filename to the specified length, preserving extension if possible.
+        Return the rows that may break a rule, in listing order.
+        
+        rows are (full_path, name, is_file, stat_result, colliding_names)
+        tuples of one folder listing.
+        """
+        if self.max_depth is not None and folder.depth > self.max_depth:
+            return rows  # Every entry is too deep
+        
+        names = [row[1] for row in rows]
+        count = len(names)
+        joined = self.SEP.join(names) + self.SEP
+        try:
+            encoded = np.frombuffer(joined.encode('utf-8'), dtype=np.uint8)
+        except UnicodeEncodeError:
+            return rows  # Undecodable names; let check_item handle them
+        ends = np.flatnonzero(encoded == 0)  # Separator after each name
+        starts = np.append(0, ends[:-1] + 1)
+        flags = np.zeros(count, dtype=bool)
+        
+        lengths = np.fromiter(map(len, names), dtype=np.int64, count=count)
+        if self.max_filename is not None:
+            flags |= lengths > self.max_filename
+        
+        if self.max_path is not None:
+            if not folder.base:
+                path_lengths = np.fromiter(map(len, (row[0] for row in rows)), dtype=np.int64, count=count)
+                flags |= path_lengths > self.max_path
+            elif folder.url_length + 3 * int((np.diff(ends, prepend=-1) - 1).max()) > self.max_path:
+                # Some names could overflow even if fully %-encoded: count the encoded lengths
+                encoded_lengths = np.diff(np.cumsum(self.quote_costs.take(encoded))[ends], prepend=0)
+                flags |= folder.url_length + encoded_lengths > self.max_path
+        
+        if self.max_file_size is not None:
+            sizes = np.fromiter(
+                (row[3].st_size if row[2] and row[3] else 0 for row in rows), dtype=np.int64, count=count
+            )
+            flags |= sizes > self.max_file_size
+        
+        flags |= self.padding_bytes[encoded[starts]] | self.padding_bytes[encoded[ends - 1]]
+        invalid = np.flatnonzero(self.invalid_bytes.take(encoded))
+        if invalid.size:
+            flags[np.searchsorted(starts, invalid, side='right') - 1] = True
+        
+        if self.check_reserved:
+            for index in np.flatnonzero(self.reserved_initial_bytes[encoded[starts]]):
+                if self.validator._reserved.match(names[index]):
+                    flags[index] = True
+        
+        if self.substrings is not None:
+            positions = [match.end() - 1 for match in self.substrings.finditer(joined)]
+            if positions:
+                char_starts = np.cumsum(lengths + 1) - lengths - 1
+                flags[np.searchsorted(char_starts, positions, side='right') - 1] = True
+        
+        if self.check_collisions and rows[0][4] is not None:
+            flags[[index for index, row in enumerate(rows) if row[4]]] = True
+        
+        return [rows[index] for index in np.flatnonzero(flags)]
+
+
+class StageCounter:
+    """Thread-safe throughput counter for one pipeline stage."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def add(self, items: int, seconds: float):
+        with self._lock:
+            self.items += items
+            self.batches += 1
+            self.busy_seconds += seconds
+    
+    @property
+    def items_per_second(self) -> float:
+        """Items handled per second of busy time in this stage."""
+        return self.items / self.busy_seconds if self.busy_seconds else 0.0
+    
+    def as_dict(self) -> dict:
+        return {
+            'items': self.items,
+            'batches': self.batches,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'items_per_second': round(self.items_per_second, 1),
+        }
+    
+    def __str__(self):
+        return (f"Stage {self.name}: {self.items:,} items in {self.batches:,} batches, "
+                f"{self.busy_seconds:.1f}s busy ({self.items_per_second:,.0f} items/s)")
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller for the number of directory listings in flight.
+    
+    Works as a semaphore whose size changes while the scan runs. Each
+    measurement window compares listing throughput and mean latency with
+    the previous window: while extra listings still raise throughput the
+    limit grows by one, once throughput stops improving it holds, and when
+    latency climbs well above its baseline, or listings fail, the limit is
+    halved.
+    """
+    
+    def __init__(self, initial: int = AUTO_WORKERS_INITIAL, minimum: int = 1,
+                 maximum: int = AUTO_WORKERS_MAX, logger: Optional[logging.Logger] = None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.peak_limit = self.limit
+        self.active = 0
+        self.logger = logger or logging.getLogger(__name__)
+        self._cond = threading.Condition()
+        self._baseline_latency = None
+        self._last_throughput = None
+        self._reset_window()
+    
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._window_latency = 0.0
+        self._window_errors = 0
+    
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one in-flight listing slot and measure the listing's latency."""
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+        
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except OSError:
+            failed = True
+            raise
+        finally:
+            latency = time.perf_counter() - started
+            with self._cond:
+                self.active -= 1
+                self._record(latency, failed)
+                self._cond.notify_all()
+    
+    def _record(self, latency: float, failed: bool):
+        """Add one listing to the current window and adjust when it is complete (lock held)."""
+        self._window_count += 1
+        self._window_latency += latency
+        if failed:
+            self._window_errors += 1
+        
+        elapsed = time.monotonic() - self._window_start
+        if elapsed < AUTO_WINDOW_SECONDS or self._window_count < self.limit * 2:
+            return
+        
+        throughput = self._window_count / elapsed
+        mean_latency = self._window_latency / self._window_count
+        
+        if self._baseline_latency is None:
+            self._baseline_latency = mean_latency
+        else:
+            self._baseline_latency = min(mean_latency, self._baseline_latency * AUTO_BASELINE_DRIFT)
+        
+        old_limit = self.limit
+        if self._window_errors or mean_latency > self._baseline_latency * AUTO_LATENCY_FACTOR:
+            # Multiplicative decrease: the share is saturated or failing
+            self.limit = max(self.minimum, self.limit // 2)
+        elif self._last_throughput is None or throughput >= self._last_throughput * AUTO_MIN_GAIN:
+            # Additive increase: more parallelism is still paying off
+            self.limit = min(self.maximum, self.limit + 1)
+        # Otherwise hold: throughput has plateaued near its peak
+        
+        if self.limit != old_limit:
+            self.peak_limit = max(self.peak_limit, self.limit)
+            self.logger.info(
+                f"Adaptive workers: {old_limit} -> {self.limit} "
+                f"({throughput:,.1f} listings/s, {mean_latency * 1000:,.0f} ms mean latency, "
+                f"{self._window_errors} errors)"
+            )
+        
+        self._last_throughput = throughput
+        self._reset_window()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    
+    Tokens refill continuously at `rate` per second up to `burst`. A caller
+    that finds the bucket empty reserves its token anyway (the balance goes
+    negative) and sleeps until that token would have been refilled, so
+    concurrent callers queue fairly instead of polling.
+    """
+    
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens, sleeping if necessary. Returns the seconds spent waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            self.tokens -= tokens
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class ScanWindow:
+    """Daily time window (e.g. 19:00-07:00, may wrap past midnight) in which scanning is allowed."""
+    
+    def __init__(self, spec: str):
+        try:
+            start, end = spec.split('-')
+            self.start = datetime.strptime(start.strip(), '%H:%M').time()
+            self.end = datetime.strptime(end.strip(), '%H:%M').time()
+        except ValueError:
+            raise ValueError(f"Invalid schedule window {spec!r}; expected HH:MM-HH:MM (e.g. 19:00-07:00)")
+        self.spec = spec
+    
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        current = (now or datetime.now()).time()
+        if self.start <= self.end:
+            return self.start <= current < self.end
+        return current >= self.start or current < self.end
+    
+    def seconds_until_open(self, now: Optional[datetime] = None) -> float:
+        now = now or datetime.now()
+        if self.is_open(now):
+            return 0.0
+        opens = datetime.combine(now.date(), self.start)
+        if opens <= now:
+            opens += timedelta(days=1)
+        return (opens - now).total_seconds()
+
+
+class IOThrottle:
+    """
+    Politeness limits for scanning live file servers.
+    
+    Caps directory listings and stat calls per second with token buckets
+    and, optionally, holds all I/O outside a daily scan window. Time spent
+    waiting is accumulated per cause (summed over all threads) so the caps
+    can be tuned.
+    """
+    
+    def __init__(self, max_listings_per_sec: Optional[float] = None,
+                 max_stats_per_sec: Optional[float] = None,
+                 schedule_window: Optional[str] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.listing_bucket = TokenBucket(max_listings_per_sec) if max_listings_per_sec else None
+        self.stat_bucket = TokenBucket(max_stats_per_sec) if max_stats_per_sec else None
+        self.window = ScanWindow(schedule_window) if schedule_window else None
+        self.logger = logger or logging.getLogger(__name__)
+        self.waited = {'listing': 0.0, 'stat': 0.0, 'schedule': 0.0}
+        self._lock = threading.Lock()
+        self._paused = False
+    
+    def _add_wait(self, cause: str, seconds: float):
+        if seconds:
+            with self._lock:
+                self.waited[cause] += seconds
+    
+    def _wait_for_window(self):
+        """Block while outside the scan window (checked before every listing)."""
+        if not self.window:
+            return
+        waited = 0.0
+        while True:
+            remaining = self.window.seconds_until_open()
+            if remaining <= 0:
+                break
+            with self._lock:
+                if not self._paused:
+                    self._paused = True
+                    self.logger.info(f"Outside scan window {self.window.spec}; pausing for {remaining / 60:,.0f} min")
+            pause = min(remaining, SCHEDULE_POLL_SECONDS)
+            time.sleep(pause)
+            waited += pause
+        if waited:
+            with self._lock:
+                if self._paused:
+                    self._paused = False
+                    self.logger.info(f"Scan window {self.window.spec} open; resuming")
+            self._add_wait('schedule', waited)
+    
+    def listing(self):
+        """Call before each directory listing."""
+        self._wait_for_window()
+        if self.listing_bucket:
+            self._add_wait('listing', self.listing_bucket.acquire())
+    
+    def stat(self):
+        """Call before each stat that costs a file server round-trip."""
+        if self.stat_bucket:
+            self._add_wait('stat', self.stat_bucket.acquire())
+    
+    def add_waits(self, waited: Dict[str, float]):
+        """Fold in wait times measured elsewhere (e.g. by shard worker processes)."""
+        for cause, seconds in waited.items():
+            self._add_wait(cause, seconds)
+    
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            waited = dict(self.waited)
+        waited['total'] = sum(waited.values())
+        return {f'{cause}_wait_seconds': round(seconds, 3) for cause, seconds in waited.items()}
+
+
+class DirListing(list):
+    """Entries of one directory listing, plus the directory's mtime taken just before listing."""
+    mtime_ns = None
+    tree_item = None  # First item number in the tree snapshot being written
+
+
+class CachedListing:
+    """A directory whose mtime matches the previous snapshot; its results are reused without listing."""
+    
+    def __init__(self, path: str, record: dict):
+        self.path = path
+        self.record = record
+        self.issues = record['issues']
+        self.subdirs = [os.path.join(path, name) for name in record['dirs']]
+    
+    def __len__(self):
+        return len(self.record['names'])
+
+
+class DirectorySnapshot:
+    """
+    Per-directory scan results keyed on directory mtime, for incremental rescans.
+    
+    Each record holds a directory's mtime, the names of its (non-excluded)
+    children, which of them are folders, and the issues found among them.
+    Stored as gzip-compressed JSON Lines: a header line with the format
+    version and a fingerprint of the scan settings, then one line per
+    directory. A snapshot taken with different settings is not reused.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, fingerprint: str, scan_root: str):
+        self.fingerprint = fingerprint
+        self.scan_root = scan_root
+        self.dirs = {}  # path -> record
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.dirs)
+    
+    def get(self, path: str) -> Optional[dict]:
+        return self.dirs.get(path)
+    
+    def put(self, path: str, record: dict):
+        with self._lock:
+            self.dirs[path] = record
+    
+    @classmethod
+    def load(cls, snapshot_path: str, fingerprint: str, scan_root: str,
+             logger: logging.Logger) -> Optional['DirectorySnapshot']:
+        """Load a snapshot, or return None if it is missing or was taken with other settings."""
+        if not os.path.exists(snapshot_path):
+            logger.info(f"No previous snapshot at {snapshot_path}; running a full scan")
+            return None
+        
+        try:
+            with gzip.open(snapshot_path, 'rt', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                if (header.get('version') != cls.VERSION or header.get('fingerprint') != fingerprint
+                        or header.get('scan_root') != scan_root):
+                    logger.info("Previous snapshot was taken with different settings; running a full scan")
+                    return None
+                
+                snapshot = cls(fingerprint, scan_root)
+                for line in f:
+                    record = json.loads(line)
+                    snapshot.dirs[record['path']] = record
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read snapshot {snapshot_path}: {e}; running a full scan")
+            return None
+        
+        logger.info(f"Loaded snapshot of {len(snapshot):,} directories from {header.get('created', '?')}")
+        return snapshot
+    
+    def save(self, snapshot_path: str):
+        """Write the snapshot atomically (temp file, then rename)."""
+        output_dir = os.path.dirname(os.path.abspath(snapshot_path))
+        os.makedirs(output_dir, exist_ok=True)
+        temp_path = f"{snapshot_path}.tmp"
+        
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            header = {
+                'version': self.VERSION,
+                'fingerprint': self.fingerprint,
+                'scan_root': self.scan_root,
+                'created': datetime.now().isoformat(),
+            }
+            f.write(json.dumps(header) + '\n')
+            for record in self.dirs.values():
+                f.write(json.dumps(record, default=report_row) + '\n')
+        
+        os.replace(temp_path, snapshot_path)
+
+
+class ResumedListing(CachedListing):
+    """A directory finished before an interrupted scan; its rows are already in the report."""
+    
+    def __init__(self, path: str, record: dict):
+        self.path = path
+        self.record = record
+        self.issues = []
+        self.subdirs = [os.path.join(path, name) for name in record['dirs']]
+    
+    def __len__(self):
+        return self.record['items']
+
+
+class InventoryEntry:
+    """Stand-in for os.DirEntry built from an inventory row, so offline checks reuse the scan code."""
+    
+    __slots__ = ('name', 'path', '_is_file', '_stat')
+    
+    def __init__(self, full_path: str, name: str, is_file: bool, size_bytes: int, mtime: Optional[float] = None):
+        self.name = name
+        self.path = full_path
+        self._is_file = is_file
+        # st_mtime is None when the inventory has no modified date, so
+        # date rules skip the item instead of reading it as 1970
+        self._stat = os.stat_result(
+            (0, 0, 0, 0, 0, 0, size_bytes, 0, int(mtime or 0), 0, 0.0, mtime, 0.0)
+        )
+    
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return self._is_file
+    
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return not self._is_file
+    
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        return self._stat
+
+
+class FolderContext:
+    """
+    Values shared by every item in one folder, carried down the tree.
+    
+    depth is the FolderDepth of the folder's items and prefix the
+    URL-encoded path from the SharePoint base to the folder (ending in '/'),
+    so an item's URL is base + prefix + its encoded name and each child only
+    encodes its own name. base is None when no SharePoint URL is configured.
+    """
+    __slots__ = ('depth', 'base', 'prefix', 'url_length')
+    
+    def __init__(self, depth: int, base: Optional[str], prefix: str = ''):
+        self.depth = depth
+        self.base = base
+        self.prefix = prefix
+        self.url_length = len(base) + len(prefix) if base else 0
+    
+    def child(self, name: str) -> 'FolderContext':
+        """Context for the subfolder name (same destination)."""
+        return FolderContext(self.depth + 1, self.base, f'{self.prefix}{quote_path_component(name)}/')
+    
+    def rebase(self, base: Optional[str]) -> 'FolderContext':
+        """The same folder migrated under another SharePoint base."""
+        return FolderContext(self.depth, base, self.prefix)
+
+
+class FolderRecords(list):
+    """Records produced for one folder, tagged so the emitting thread can checkpoint the folder."""
+    
+    def __init__(self, records, path: str, subdirs: List[str], item_count: int):
+        super().__init__(records)
+        self.path = path
+        self.subdirs = subdirs
+        self.item_count = item_count
+
+
+class ScanCheckpoint:
+    """
+    Progress log for resuming an interrupted scan (--resume).
+    
+    A JSON Lines file next to the report: a header with a fingerprint of
+    the scan settings, then one line per finished folder (its subfolder
+    names and item count). Every few seconds the report CSV is flushed and
+    fsynced, the folders finished since the last checkpoint are appended,
+    and a marker line records the report size. On resume, anything after
+    the last marker is discarded in both files, so every folder logged as
+    finished has all of its rows in the report and nothing is written twice.
+    With --anonymize the header also keeps the salt, so a resumed scan
+    hashes paths exactly like the interrupted one.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, checkpoint_path: str, fingerprint: str, interval: float, anon_salt: Optional[str] = None):
+        self.checkpoint_path = checkpoint_path
+        self.fingerprint = fingerprint
+        self.interval = interval
+        self.anon_salt = anon_salt  # Replaced by the interrupted scan's salt on resume
+        self.done = {}  # Folders finished by the interrupted run: path -> record
+        self.report_offset = 0
+        self.previous_issues = []  # Rows already in the report when resuming
+        self.previous_keys = set()  # (FullPath, IssueType) of those rows
+        self._pending = []
+        self._last_save = time.monotonic()
+        self.file = None
+    
+    @property
+    def resumed(self) -> bool:
+        return bool(self.done)
+    
+    def start(self):
+        """Start a new checkpoint log, replacing any previous one."""
+        self.file = open(self.checkpoint_path, 'w', encoding='utf-8')
+        header = {'version': self.VERSION, 'fingerprint': self.fingerprint, 'created': datetime.now().isoformat()}
+        if self.anon_salt:
+            header['anon_salt'] = self.anon_salt
+        self.file.write(json.dumps(header) + '\n')
+        self._sync()
+    
+    def resume(self, report_path: str, logger: logging.Logger) -> bool:
+        """
+        Load the log of an interrupted scan and truncate both files to its last checkpoint.
+        
+        Returns False (start from scratch) if there is nothing to resume;
+        raises ValueError if the log belongs to a scan with other settings.
+        """
+        if not os.path.exists(self.checkpoint_path) or not os.path.exists(report_path):
+            logger.warning(f"No checkpoint found at {self.checkpoint_path}; starting a new scan")
+            return False
+        
+        done, pending = {}, {}
+        log_end = 0
+        with open(self.checkpoint_path, 'rb') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = {}
+            # The report is hashed or not as a whole, so --anonymize must match too
+            if (header.get('version') != self.VERSION or header.get('fingerprint') != self.fingerprint
+                    or bool(header.get('anon_salt')) != bool(self.anon_salt)):
+                raise ValueError(
+                    f"checkpoint {self.checkpoint_path} was written by a scan with different settings"
+                )
+            anon_salt = header.get('anon_salt')
+            log_end = f.tell()
+            
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn write at the end of the log
+                if 'report_offset' in record:
+                    done.update(pending)
+                    pending = {}
+                    self.report_offset = record['report_offset']
+                    log_end = f.tell()
+                else:
+                    pending[record['path']] = record
+        
+        if not done:
+            logger.warning("Checkpoint has no finished folders yet; starting a new scan")
+            return False
+        
+        # Drop rows and folders written after the last checkpoint
+        with open(report_path, 'r+b') as f:
+            f.truncate(self.report_offset)
+        with open(self.checkpoint_path, 'r+b') as f:
+            f.truncate(log_end)
+        
+        self.done = done
+        if self.anon_salt:
+            self.anon_salt = anon_salt
+        self.previous_issues = read_report_csv(report_path)
+        self.previous_keys = {(issue['FullPath'], issue['IssueType']) for issue in self.previous_issues}
+        self.file = open(self.checkpoint_path, 'a', encoding='utf-8')
+        logger.info(
+            f"Resuming: {len(done):,} folders already finished, "
+            f"{len(self.previous_issues):,} issues kept from the previous run"
+        )
+        return True
+    
+    def mark_done(self, path: str, subdirs: List[str], item_count: int):
+        """Record a folder whose rows have all been written to the report."""
+        self._pending.append({
+            'path': path,
+            'dirs': [os.path.basename(subdir) for subdir in subdirs],
+            'items': item_count,
+        })
+    
+    def maybe_save(self, csv_writer: 'StreamedCSVWriter'):
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save(csv_writer)
+    
+    def save(self, csv_writer: 'StreamedCSVWriter'):
+        """Flush the report, then log the folders finished since the last checkpoint."""
+        report_offset = csv_writer.sync()
+        for record in self._pending:
+            self.file.write(json.dumps(record) + '\n')
+        self.file.write(json.dumps({'report_offset': report_offset}) + '\n')
+        self._sync()
+        self._pending = []
+        self._last_save = time.monotonic()
+    
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+    
+    def finish(self):
+        """Remove the log once the scan has completed."""
+        if self.file:
+            self.file.close()
+            self.file = None
+        try:
+            os.remove(self.checkpoint_path)
+        except OSError:
+            pass
+
+
+class TreeSnapshotWriter:
+    """
+    Collect a compact snapshot of the scanned tree and write it with save().
+    
+    Item 0 is the scan root; every other item stores its parent's item
+    number, an interned name, a file flag, its size and mtime in parallel
+    fixed-width arrays, so a path is never stored twice and repeated
+    names (desktop.ini, Thumbs.db, ...) are stored once. Items of one
+    folder are contiguous. See TreeSnapshot for the file layout.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, snapshot_path: str, root_path: str):
+        self.snapshot_path = snapshot_path
+        self.name_ids = {}
+        self.names = []
+        self.parents = array.array('I')
+        self.name_refs = array.array('I')
+        self.flags = array.array('B')
+        self.sizes = array.array('Q')
+        self.mtimes = array.array('q')
+        self.folder_ids = {}  # Folder path -> item number, for parent pointers
+        self.incomplete = False  # Set when a listing could not be attached to the tree
+        self._lock = threading.Lock()
+        self._add(TREE_NO_PARENT, root_path, False, 0, 0)
+        self.folder_ids[root_path] = 0
+    
+    def __len__(self):
+        return len(self.parents)
+    
+    def _add(self, parent: int, name: str, is_file: bool, size: int, mtime_ns: int) -> int:
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        self.parents.append(parent)
+        self.name_refs.append(name_id)
+        self.flags.append(TREE_FLAG_FILE if is_file else 0)
+        self.sizes.append(size)
+        self.mtimes.append(mtime_ns)
+        return len(self.parents) - 1
+    
+    def add_listing(self, folder_path: str, entries: List[os.DirEntry]) -> int:
+        """
+        Record the entries of one folder as soon as it is listed.
+        
+        Called before any subfolder of the listing can be queued, so every
+        folder's parent is already recorded, whatever the engine. Sizes and
+        mtimes are filled in by add_stats from the scan's own stat results.
+        
+        Returns:
+            The item number of the first entry
+        
+        Raises:
+            RuntimeError: If folder_path itself was never recorded
+        """
+        items = []
+        for entry in entries:
+            try:
+                is_file = entry.is_file(follow_symlinks=False)
+            except OSError:
+                is_file = not entry.is_dir(follow_symlinks=False)
+            items.append((entry, is_file))
+        
+        with self._lock:
+            parent = self.folder_ids.get(folder_path)
+            if parent is None:
+                self.incomplete = True
+                raise RuntimeError(f"Tree snapshot: {folder_path} was listed before its parent folder was recorded")
+            first = len(self.parents)
+            for entry, is_file in items:
+                item = self._add(parent, entry.name, is_file, 0, 0)
+                if not is_file:
+                    self.folder_ids[entry.path] = item
+            return first
+    
+    def add_stats(self, first: int, entries: List[os.DirEntry], stats: Dict[str, Optional[os.stat_result]]):
+        """
+        Fill in sizes and mtimes of a listing recorded by add_listing.
+        
+        stats maps entry names to the stat results the scan already took;
+        entries missing from it (stat deferred or failed) keep 0.
+        """
+        values = []
+        for item, entry in enumerate(entries, first):
+            stat_result = stats.get(entry.name)
+            if stat_result:
+                values.append((item, stat_result.st_size if self.flags[item] & TREE_FLAG_FILE else 0,
+                               stat_result.st_mtime_ns))
+        
+        with self._lock:
+            for item, size, mtime_ns in values:
+                self.sizes[item] = size
+                self.mtimes[item] = mtime_ns
+    
+    def save(self):
+        """Write the snapshot atomically (temp file, then rename)."""
+        blob = bytearray()
+        offsets = array.array('Q', [0])
+        for name in self.names:
+            blob += name.encode('utf-8', 'surrogateescape')
+            offsets.append(len(blob))
+        blob += b'\0' * (-len(blob) % 8)
+        
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(TREE_SNAPSHOT_HEADER.pack(
+                TREE_SNAPSHOT_MAGIC, self.VERSION, 1 if sys.byteorder == 'little' else 0,
+                len(self.parents), len(self.names), len(blob)
+            ))
+            # 8-byte sections first so every array starts aligned
+            for section in (offsets, blob, self.sizes, self.mtimes, self.parents, self.name_refs, self.flags):
+                f.write(section)
+        os.replace(temp_path, self.snapshot_path)
+
+
+class TreeSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot written by TreeSnapshotWriter.
+    
+    Layout after the header: name offsets (uint64, names + 1), the UTF-8
+    name bytes (padded to 8), then per item sizes (uint64), mtimes
+    (int64 ns), parents (uint32), name numbers (uint32) and flags (uint8).
+    Arrays are used in place through memoryview casts, so opening a
+    snapshot reads nothing but the header.
+    """
+    
+    def __init__(self, snapshot_path: str):
+        self.snapshot_path = snapshot_path
+        with open(snapshot_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, little_endian, count, name_count, blob_size = TREE_SNAPSHOT_HEADER.unpack_from(self._mmap)
+        if magic != TREE_SNAPSHOT_MAGIC or version != TreeSnapshotWriter.VERSION:
+            raise ValueError(f"{snapshot_path} is not a tree snapshot this version can read")
+        if little_endian != (sys.byteorder == 'little'):
+            raise ValueError(f"{snapshot_path} was written on a machine with a different byte order")
+        
+        view = self._view = memoryview(self._mmap)
+        position = TREE_SNAPSHOT_HEADER.size
+        
+        def section(length: int, typecode: str) -> memoryview:
+            nonlocal position
+            size = length * struct.calcsize(typecode)
+            data = view[position:position + size].cast(typecode)
+            position += size
+            return data
+        
+        self.name_offsets = section(name_count + 1, 'Q')
+        self.name_blob = section(blob_size, 'B')
+        self.sizes = section(count, 'Q')
+        self.mtimes = section(count, 'q')
+        self.parents = section(count, 'I')
+        self.name_refs = section(count, 'I')
+        self.flags = section(count, 'B')
+        self._folder_paths = {}
+    
+    @staticmethod
+    def is_snapshot(path: str) -> bool:
+        try:
+            with open(path, 'rb') as f:
+                return f.read(len(TREE_SNAPSHOT_MAGIC)) == TREE_SNAPSHOT_MAGIC
+        except OSError:
+            return False
+    
+    def __len__(self):
+        return len(self.parents)
+    
+    @property
+    def root(self) -> str:
+        return self.name(0)
+    
+    def name(self, item: int) -> str:
+        name_id = self.name_refs[item]
+        start, end = self.name_offsets[name_id], self.name_offsets[name_id + 1]
+        return bytes(self.name_blob[start:end]).decode('utf-8', 'surrogateescape')
+    
+    def is_file(self, item: int) -> bool:
+        return bool(self.flags[item] & TREE_FLAG_FILE)
+    
+    def path(self, item: int) -> str:
+        """Full path of an item; folder paths are cached as they are built."""
+        # Walk up to the nearest known folder, then join names back down
+        chain = []
+        while item != 0 and item not in self._folder_paths:
+            chain.append(item)
+            item = self.parents[item]
+        full_path = self._folder_paths.get(item) or self.root
+        
+        for item in reversed(chain):
+            full_path = os.path.join(full_path, self.name(item))
+            if not self.is_file(item):
+                self._folder_paths[item] = full_path
+        return full_path
+    
+    def folders(self):
+        """Yield (folder item, range of its child items), one run per listed folder."""
+        count = len(self)
+        start = 1
+        while start < count:
+            parent = self.parents[start]
+            end = start + 1
+            while end < count and self.parents[end] == parent:
+                end += 1
+            yield parent, range(start, end)
+            start = end
+    
+    def close(self):
+        for attr in ('name_offsets', 'name_blob', 'sizes', 'mtimes', 'parents', 'name_refs', 'flags', '_view'):
+            getattr(self, attr).release()
+        self._mmap.close()
+
+
+class StreamedCSVWriter:
+    """Write CSV rows as issues are found (memory efficient)."""
+    
+    def __init__(self, output_path: str, fieldnames: List[str], anonymize_fn=None, append: bool = False):
+        self.output_path = output_path
+        self.fieldnames = fieldnames
+        self.anonymize_fn = anonymize_fn
+        self.append = append  # Continue an existing report (--resume)
+        self.file = None
+        self.writer = None
+        self.issue_count = 0
+        self._lock = threading.Lock()
+    
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        self.file = open(self.output_path, 'a' if self.append else 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, extrasaction='ignore')
+        if not self.append:
+            self.writer.writeheader()
+        return self
+    
+    def write_issue(self, issue: dict):
+        """Write single issue immediately (safe to call from worker threads)."""
+        self.write_issues([issue])
+    
+    def write_issues(self, issues: List[Mapping]):
+        """Format a batch of issues and write them under a single lock acquisition."""
+        rows = [report_row(issue) for issue in issues]
+        if self.anonymize_fn:
+            rows = [
+                dict(row, FullPath=self.anonymize_fn(row['FullPath']),
+                     CurrentValue=self.anonymize_fn(row['CurrentValue']))
+                for row in rows
+            ]
+        
+        with self._lock:
+            self.writer.writerows(rows)
+            self.issue_count += len(rows)
+    
+    def sync(self) -> int:
+        """Flush written rows to disk and return the file size in bytes."""
+        with self._lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            return self.file.tell()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.file:
+            self.file.close()
+
+
+class Destination:
+    """One candidate migration target checked during a multi-destination scan (--destinations)."""
+    
+    def __init__(self, name: str, checker: 'PreflightScanner', report_path: Optional[str] = None):
+        self.name = name
+        self.checker = checker  # Scanner configured for this destination; only runs checks
+        self.report_path = report_path
+        self.csv_writer = None
+        self.issue_count = 0
+        self.issues_by_type = {}
+    
+    def summary(self) -> dict:
+        return {
+            'name': self.name,
+            'sharepoint_base': self.checker.spo_base,
+            'allow_hash_percent': self.checker.config['allow_hash_percent'],
+            'report': self.report_path,
+            'total_issues': self.issue_count,
+            'issues_by_type': self.issues_by_type,
+        }
+
+
+class WorkQueue:
+    """
+    Shard queue shared by a coordinator and worker hosts through one directory (--queue-dir).
+    
+    Every state change is a single file create or rename, so any share all
+    hosts can write to works without a lock service:
+    
+        job.json            scan settings and root, written by the coordinator
+        pending/<id>.json   shards waiting for a worker
+        leased/<id>.json    shards being scanned; a worker claims one by renaming
+                            it out of pending/ and touches it as a heartbeat
+        results/<id>.csv    partial report of a finished shard, published once by hard link
+                            (emptied, not deleted, once merged)
+        results/<id>.json   its counters, written last (marks the shard done)
+        complete            the job id, once the coordinator has merged everything
+    
+    Lease expiry is judged on the coordinator's clock (how long a lease's
+    mtime has stayed unchanged), so clock skew between hosts does not matter.
+    A shard rescanned after its lease was reassigned produces the same rows;
+    the first copy published wins and later ones are discarded, so each
+    shard is merged exactly once.
+    """
+    
+    def __init__(self, queue_dir: str):
+        self.queue_dir = queue_dir
+        self.job_path = os.path.join(queue_dir, 'job.json')
+        self.complete_path = os.path.join(queue_dir, 'complete')
+        self.pending_dir = os.path.join(queue_dir, 'pending')
+        self.leased_dir = os.path.join(queue_dir, 'leased')
+        self.results_dir = os.path.join(queue_dir, 'results')
+        self._lease_seen = {}  # task id -> (lease mtime, monotonic time that mtime was first seen)
+    
+    @staticmethod
+    def _write_json(path: str, data: dict):
+        """Write a JSON file atomically so readers on other hosts never see it half written."""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+    
+    @staticmethod
+    def _read_json(path: str) -> Optional[dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def _completed_job(self) -> Optional[str]:
+        try:
+            with open(self.complete_path, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+    
+    def create(self, job: dict, shards: List[str]) -> List[str]:
+        """
+        Publish a new job and queue its shards (coordinator).
+        
+        Returns:
+            The task ids, one per shard
+        """
+        job_id = self._completed_job()
+        if os.path.exists(self.job_path) and job_id is None:
+            raise ValueError(f"{self.queue_dir} already holds an unfinished scan")
+        
+        for directory in (self.pending_dir, self.leased_dir, self.results_dir):
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+        
+        task_ids = [f'{index:05d}' for index in range(len(shards))]
+        for task_id, shard in zip(task_ids, shards):
+            self._write_json(os.path.join(self.pending_dir, f'{task_id}.json'), {'id': task_id, 'path': shard})
+        # Publish the job last: workers only start leasing once it exists
+        self._write_json(self.job_path, job)
+        return task_ids
+    
+    def load_job(self) -> Optional[dict]:
+        """Return the current job, or None if there is none or it is already complete (workers)."""
+        job = self._read_json(self.job_path)
+        if job is None or job['id'] == self._completed_job():
+            return None
+        return job
+    
+    def is_complete(self, job: dict) -> bool:
+        return self._completed_job() == job['id']
+    
+    def mark_complete(self, job: dict):
+        with open(self.complete_path, 'w', encoding='utf-8') as f:
+            f.write(job['id'])
+    
+    def claim(self) -> Optional[dict]:
+        """Lease the next pending shard, or return None if none is left (workers)."""
+        for name in sorted(os.listdir(self.pending_dir)):
+            if not name.endswith('.json'):
+                continue
+            lease_path = os.path.join(self.leased_dir, name)
+            try:
+                os.rename(os.path.join(self.pending_dir, name), lease_path)
+            except OSError:
+                continue  # Another worker leased it first
+            # The rename keeps the old mtime; refresh it so the lease starts fresh
+            os.utime(lease_path)
+            return self._read_json(lease_path)
+        return None
+    
+    def heartbeat(self, task: dict) -> bool:
+        """Renew a lease; False if the coordinator has already reassigned it."""
+        try:
+            os.utime(os.path.join(self.leased_dir, f"{task['id']}.json"))
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def result_paths(self, task_id: str) -> Tuple[str, str]:
+        """Return (partial report path, counters path) for a shard."""
+        return (os.path.join(self.results_dir, f'{task_id}.csv'),
+                os.path.join(self.results_dir, f'{task_id}.json'))
+    
+    def finish(self, task: dict, partial_path: str, result: dict):
+        """Publish a finished shard's partial report and counters, then drop the lease (workers)."""
+        report_path, result_path = self.result_paths(task['id'])
+        try:
+            # Unlike a rename, a hard link never replaces an existing file,
+            # so only the first worker to finish a shard publishes it
+            os.link(partial_path, report_path)
+        except FileExistsError:
+            # Another worker published this shard (it may already be merged)
+            os.remove(partial_path)
+            return
+        os.remove(partial_path)
+        self._write_json(result_path, result)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(self.leased_dir, f"{task['id']}.json"))
+    
+    def read_result(self, task_id: str) -> Optional[dict]:
+        """Return a shard's counters once it is done, else None (coordinator)."""
+        return self._read_json(self.result_paths(task_id)[1])
+    
+    def requeue_expired(self, lease_timeout: float) -> List[str]:
+        """
+        Move leases without a heartbeat for lease_timeout seconds back to pending (coordinator).
+        
+        Returns:
+            The task ids that were requeued
+        """
+        now = time.monotonic()
+        requeued = []
+        for name in os.listdir(self.leased_dir):
+            if not name.endswith('.json'):
+                continue
+            task_id = name[:-len('.json')]
+            lease_path = os.path.join(self.leased_dir, name)
+            try:
+                mtime = os.stat(lease_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            
+            seen = self._lease_seen.get(task_id)
+            if seen is None or seen[0] != mtime:
+                self._lease_seen[task_id] = (mtime, now)
+                continue
+            if now - seen[1] < lease_timeout or os.path.exists(self.result_paths(task_id)[1]):
+                continue
+            
+            try:
+                os.rename(lease_path, os.path.join(self.pending_dir, name))
+            except OSError:
+                continue  # Finished or renewed while we looked
+            del self._lease_seen[task_id]
+            requeued.append(task_id)
+        return requeued
+
+
+class PreflightScanner:
+    """Core scanner logic for SharePoint Online preflight checks."""
+    
+    def __init__(
+        self,
+        scan_root: str,
+        max_path: int = DEFAULT_MAX_site_url_count,
+        max_filename: int = DEFAULT_MAX_FILENAME_LENGTH,
+        max_file_size_gb: int = DEFAULT_MAX_FILE_SIZE_GB,
+        max_depth: int = DEFAULT_MAX_FOLDER_DEPTH,
+        blocked_extensions: Optional[List[str]] = None,
+        allow_hash_percent: bool = True,
+        exclude_dirs: Optional[List[str]] = None,
+        exclude_exts: Optional[List[str]] = None,
+        workers: Union[int, str] = 1,
+        engine: str = 'thread',
+        max_inflight: int = DEFAULT_MAX_INFLIGHT,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        max_listings_per_sec: Optional[float] = None,
+        max_stats_per_sec: Optional[float] = None,
+        schedule_window: Optional[str] = None,
+        listing_timeout: Optional[float] = None,
+        snapshot_path: Optional[str] = None,
+        full_rescan: bool = False,
+        tree_snapshot_path: Optional[str] = None,
+        anonymize: bool = False,
+        progress: bool = False,
+        stream_csv: bool = True,
+        spo_url: Optional[str] = None,
+        spo_library: Optional[str] = None,
+        is_onedrive: bool = False,
+        spo_overhead: int = 80,
+        destinations: Optional[List[dict]] = None,
+        routes: Optional[List[dict]] = None,
+        skip_rules: Optional[List[str]] = None,
+        custom_rules: Optional[List[dict]] = None,
+        batch_check: bool = False
+    ):
+        # Constructor arguments, used to rebuild the scanner in worker processes
+        self.config = {
+            name: value for name, value in locals().items()
+            if name not in ('self', '__class__')
+        }
+        
+        self.scan_root = os.path.normpath(scan_root)
+        self.max_path = max_path
+        self.max_filename = max_filename
+        self.max_file_size_bytes = max_file_size_gb * 1024 * 1024 * 1024
+        self.max_depth = max_depth
+        self.blocked_extensions = set(
+            (blocked_extensions or DEFAULT_BLOCKED_EXTENSIONS)
+        )
+        self.invalid_chars = get_invalid_chars(allow_hash_percent)
+        self.name_validator = NameValidator(self.invalid_chars, max_filename, self.blocked_extensions)
+        
+        # Rule registry: built-in rules then custom ones, minus --skip-rules.
+        # Metadata is only fetched when an enabled rule needs it.
+        skip_rules = set(skip_rules or ())
+        self.rules = [
+            rule for rule in BUILTIN_RULES + [build_custom_rule(spec) for spec in custom_rules or ()]
+            if rule.name not in skip_rules
+        ]
+        file_rules = [rule for rule in self.rules if rule.applies_to != RULE_APPLIES_FOLDER]
+        folder_rules = [rule for rule in self.rules if rule.applies_to != RULE_APPLIES_FILE]
+        self._stat_files = any(rule.needs & {RULE_NEEDS_SIZE, RULE_NEEDS_MTIME} for rule in file_rules)
+        self._stat_folders = any(RULE_NEEDS_MTIME in rule.needs for rule in folder_rules)
+        # The tree snapshot records every item's size and mtime, whatever the rules need
+        self._stat_all = bool(tree_snapshot_path)
+        self._check_siblings = any(RULE_NEEDS_SIBLINGS in rule.needs for rule in self.rules)
+        self._age_rules = any(RULE_NEEDS_MTIME in rule.needs for rule in self.rules)
+        self.age_reference = age_reference()  # What age rules count from; refreshed by rescan()
+        self._check_names = any(rule.name in NAME_RULES for rule in self.rules)
+        # Rules that can fire, by (is file, name has violations, has case collisions):
+        # a clean name skips the name rules and most items skip the sibling rules
+        self._rule_sets = {
+            (is_file, violations, collisions): [
+                rule for rule in (file_rules if is_file else folder_rules)
+                if (violations or rule.name not in NAME_RULES)
+                and (collisions or RULE_NEEDS_SIBLINGS not in rule.needs)
+            ]
+            for is_file in (False, True) for violations in (False, True) for collisions in (False, True)
+        }
+        # Large folders are pre-checked as arrays; only built-in rules can be batched
+        self.batch_checker = None
+        if batch_check and NUMPY_AVAILABLE and not custom_rules:
+            self.batch_checker = BatchChecker(self)
+        self.exclude_dirs = set(exclude_dirs or DEFAULT_EXCLUDE_DIRS)
+        self.exclude_exts = set(exclude_exts or DEFAULT_EXCLUDE_EXTS)
+        
+        # --workers auto: size pools for the upper bound and let the AIMD
+        # controller decide how many listings actually run at once
+        self.concurrency = None
+        if workers == WORKERS_AUTO:
+            self.concurrency = AdaptiveConcurrency(logger=logging.getLogger(__name__))
+            workers = AUTO_WORKERS_MAX
+        self.workers = workers
+        self.engine = engine
+        self.max_inflight = max(1, max_inflight)
+        self.queue_size = max(1, queue_size)
+        self.listing_timeout = listing_timeout
+        self.retry_queue = DeferredRetryQueue()
+        
+        # Incremental rescans (--snapshot): the previous run's results and
+        # the snapshot being built by this run (only set during scan_directory)
+        self.snapshot_path = snapshot_path
+        self.full_rescan = full_rescan
+        self.previous_snapshot = None
+        self.current_snapshot = None
+        self.reused_dirs = 0
+        self.keep_snapshot = False  # Keep the last snapshot in memory for rescan()
+        self.last_snapshot = None
+        self.checkpoint = None  # Set by start_checkpoint()
+        self.tree_snapshot_path = tree_snapshot_path
+        self.tree_snapshot = None  # TreeSnapshotWriter while traversing
+        self.resumed_dirs = 0
+        self._deferred_dirs = set()  # Folders with items still in the retry queue
+        self.unreachable_dirs = []  # (path, reason) for listings that timed out
+        self.throttle = None
+        if max_listings_per_sec or max_stats_per_sec or schedule_window:
+            self.throttle = IOThrottle(max_listings_per_sec, max_stats_per_sec, schedule_window,
+                                       logger=logging.getLogger(__name__))
+        self.pipeline_stats = None
+        self.anonymize = anonymize
+        self.progress = progress and TQDM_AVAILABLE
+        self.stream_csv = stream_csv
+        self.anon_salt = secrets.token_hex(16) if anonymize else None
+        self.scan_count = 0
+        self.issue_count = 0
+        self.logger = logging.getLogger(__name__)
+        self.csv_writer = None
+        
+        # Guards scan_count/issue_count when worker threads are active
+        self._count_lock = threading.Lock()
+        
+        # SharePoint URL configuration
+        self.spo_url = spo_url
+        self.spo_library = spo_library
+        self.is_onedrive = is_onedrive
+        
+        # Calculate SharePoint URL base and overhead
+        if spo_url and spo_library:
+            self.spo_base = build_spo_base(spo_url, spo_library)
+            self.url_overhead = len(self.spo_base)
+            self.effective_path_limit = 400 - self.url_overhead
+        else:
+            self.spo_base = None
+            self.url_overhead = spo_overhead
+            self.effective_path_limit = 400 - spo_overhead
+        
+        # Per-subtree destinations (--route-map): source folder -> (source folder, SharePoint base).
+        # Folders outside every route use spo_base relative to scan_root.
+        self.routes = {}
+        for route in routes or ():
+            source = os.path.normpath(route['source'])
+            self.routes[route_key(source)] = (source, build_spo_base(route['spo_url'], route['spo_library']))
+        self._route_cache = {}  # Folder path -> resolved route
+        self._routes_matched = set()  # Route keys that some folder resolved to
+        self._folder_contexts = {}  # Listed subfolder path -> FolderContext carried down from its parent
+        
+        if anonymize:
+            self.logger.info(f"Anonymization enabled. Salt: {self.anon_salt} (save to de-anonymize)")
+        
+        # Candidate destinations checked in the same traversal: each gets a
+        # scanner that only runs the (cheap) per-item checks
+        self.destinations = []
+        for spec in destinations or ():
+            checker_config = dict(
+                self.config,
+                spo_url=spec['spo_url'],
+                spo_library=spec.get('spo_library', 'Shared Documents'),
+                allow_hash_percent=spec.get('allow_hash_percent', allow_hash_percent),
+                workers=1, engine='thread', max_listings_per_sec=None, max_stats_per_sec=None,
+                schedule_window=None, listing_timeout=None, snapshot_path=None, tree_snapshot_path=None,
+                anonymize=False, progress=False, stream_csv=False, destinations=None, routes=None
+            )
+            self.destinations.append(Destination(spec['name'], PreflightScanner(**checker_config), spec.get('report')))
+        
+        if progress and not TQDM_AVAILABLE:
+            self.logger.warning("tqdm not installed. Progress bar disabled. Install with: pip install tqdm")
+        if batch_check and not NUMPY_AVAILABLE:
+            self.logger.warning("NumPy not installed. Batch checking disabled. Install with: pip install numpy")
+        elif batch_check and custom_rules:
+            self.logger.warning("Batch checking does not support custom rules; checking items one at a time")
+    
+    def should_exclude(self, entry_name: str, is_dir: bool) -> bool:
+        """Check if item should be excluded from scan."""
+        if is_dir:
+            return entry_name in self.exclude_dirs
+        else:
+            _, ext = os.path.splitext(entry_name)
+            return ext.lower() in self.exclude_exts
+
+    
+    def compute_depth(self, full_path: str, root_path: str) -> int:
+        """
+        Compute folder depth relative to the scan root.
+        Handles both local drives and UNC paths correctly.
+        """
+        try:
+            # Normalize paths
+            full_normalized = os.path.normpath(full_path)
+            root_normalized = os.path.normpath(root_path)
+            
+            # Get relative path
+            rel_path = os.path.relpath(full_normalized, root_normalized)
+            
+            # Count directory separators
+            if rel_path == '.':
+                return 0
+            return rel_path.count(os.sep)
+        except (ValueError, Exception) as e:
+            self.logger.warning(f"Could not compute depth for {full_path}: {e}")
+            return 0
+    
+    def sanitize_filename(self, name: str) -> str:
+        """
+        Replace invalid characters with underscores and trim spaces/periods.
+        """
+        return self.name_validator.sanitize(name)
+    
+    def truncate_to_limit(self, name: str, limit: int) -> str:
+        """
+        Truncate filename to the specified length, preserving extension if possible.
         """
         if len(name) <= limit:
             return name
@@ -527,443 +2331,1659 @@ class PreflightScanner:
         else:
             return name[:limit]
     
-    def suggest_fix(self, item_name: str) -> str:
+    def suggest_fix(self, item_name: str) -> str:
+        """
+        Generate a suggested filename fix.
+        """
+        fixed = self.sanitize_filename(item_name)
+        fixed = self.truncate_to_limit(fixed, self.max_filename)
+        return fixed
+    
+    def _sharepoint_url(self, full_path: str) -> Tuple[Optional[str], int]:
+        """
+        Build the SharePoint URL for an item.
+        
+        Returns:
+            Tuple of (URL or None if not configured/computable, SiteURLCount)
+        """
+        if self.routes:
+            route_root, spo_base = self._route(os.path.dirname(full_path))
+        else:
+            route_root, spo_base = self.scan_root, self.spo_base
+        
+        if not spo_base:
+            # Fall back to local path length
+            return None, len(full_path)
+        
+        try:
+            rel_path = os.path.relpath(full_path, route_root)
+            sharepoint_url = spo_base + '/'.join(quote_path_component(part) for part in rel_path.split(os.sep))
+            return sharepoint_url, len(sharepoint_url)
+        except ValueError as e:
+            self.logger.warning(f"Could not compute SharePoint URL for {full_path}: {e}")
+            return None, len(full_path)
+    
+    def _route(self, folder_path: str) -> Tuple[str, Optional[str]]:
+        """
+        Resolve the (source root, SharePoint base) that items in folder_path migrate to.
+        
+        A folder listed in the route map starts a new route; any other
+        folder inherits its parent's. Results are cached per folder, so a
+        live scan resolves each folder once, from its already-resolved parent.
+        """
+        route = self._route_cache.get(folder_path)
+        if route is not None:
+            return route
+        
+        # Walk up to the nearest resolved folder or route source
+        unresolved = []
+        path = folder_path
+        while True:
+            route = self._route_cache.get(path)
+            if route is not None:
+                break
+            key = route_key(path)
+            route = self.routes.get(key)
+            if route is not None:
+                self._routes_matched.add(key)
+                break
+            parent = os.path.dirname(path)
+            if parent == path:
+                route = (self.scan_root, self.spo_base)  # Outside every route
+                break
+            unresolved.append(path)
+            path = parent
+        
+        for path in unresolved:
+            self._route_cache[path] = route
+        return route
+    
+    def _folder_context(self, folder_path: str, root_path: str) -> FolderContext:
+        """
+        Return the context for items in folder_path.
+        
+        A context carried down from the parent folder (see _carry_context)
+        is used when there is one; otherwise it is computed from the paths.
+        """
+        context = self._folder_contexts.pop(folder_path, None)
+        if context is not None:
+            return context
+        
+        try:
+            rel_path = os.path.relpath(folder_path, root_path)
+            depth = 0 if rel_path == os.curdir else rel_path.count(os.sep) + 1
+        except ValueError as e:
+            self.logger.warning(f"Could not compute depth for {folder_path}: {e}")
+            depth = 0
+        
+        if self.routes:
+            route_root, spo_base = self._route(folder_path)
+        else:
+            route_root, spo_base = self.scan_root, self.spo_base
+        
+        try:
+            rel_path = os.path.relpath(folder_path, route_root)
+        except ValueError as e:
+            if spo_base:
+                self.logger.warning(f"Could not compute SharePoint URL for {folder_path}: {e}")
+            return FolderContext(depth, None)
+        if rel_path == os.curdir:
+            return FolderContext(depth, spo_base)
+        return FolderContext(
+            depth, spo_base, ''.join(f'{quote_path_component(part)}/' for part in rel_path.split(os.sep))
+        )
+    
+    def _carry_context(self, folder: FolderContext, subdir_path: str, name: str):
+        """Hand a subfolder its context so its own listing does not recompute it."""
+        if self.routes and route_key(subdir_path) in self.routes:
+            return  # Starts a new route
+        self._folder_contexts[subdir_path] = folder.child(name)
+    
+    def _drop_context(self, folder_path: str):
+        """Forget the context carried to a folder whose entries will not be handled."""
+        self._folder_contexts.pop(folder_path, None)
+    
+    def check_item(
+        self,
+        full_path: str,
+        root_path: str,
+        is_file: bool,
+        stat_result: Optional[os.stat_result] = None,
+        folder: Optional[FolderContext] = None,
+        colliding_names: Optional[List[str]] = None
+    ) -> List[IssueRecord]:
+        """
+        Check a single file or folder against every enabled rule.
+        Returns a list of IssueRecords (may be empty or contain multiple issues).
+        
+        Pass the item's stat_result (e.g. from DirEntry.stat()) to avoid
+        another stat call; it is only looked up here when omitted and an
+        enabled rule needs the size or modified time, and never when it is
+        STAT_FAILED (the size is then reported as 0). Traversals pass the
+        parent folder's context so the depth and URL prefix are not
+        recomputed for every item, and the names in the same folder that
+        differ only in case.
+        """
+        item_name = os.path.basename(full_path)
+        if folder is None:
+            folder = self._folder_context(os.path.dirname(full_path), root_path)
+        
+        # SharePoint URL length if configured (local path length otherwise);
+        # the URL itself is only built when an issue is written out
+        if folder.base:
+            site_url_count = folder.url_length + len(quote_path_component(item_name))
+        else:
+            site_url_count = len(full_path)
+        
+        # Size and mtime only when an enabled rule reads them
+        needs_stat = self._stat_files if is_file else self._stat_folders
+        if needs_stat and stat_result is None:
+            try:
+                if self.throttle:
+                    self.throttle.stat()
+                stat_result = retry_with_backoff(os.stat, full_path, follow_symlinks=False)
+            except OSError as e:
+                self.logger.warning(f"Could not get size for {full_path}: {e}")
+        if not is_file:
+            size = 0
+        elif self._stat_files:
+            size = stat_result.st_size if stat_result else 0
+        else:
+            size = None
+        
+        # All name-level checks in one pass (None for the common, clean name)
+        violations = self.name_validator.check(item_name, is_file) if self._check_names else None
+        item = ItemFacts(
+            item_name, full_path, is_file, size, stat_result.st_mtime if stat_result else None,
+            folder.depth, site_url_count, folder, violations, colliding_names or (), self
+        )
+        
+        return [
+            IssueRecord(item, rule)
+            for rule in self._rule_sets[is_file, violations is not None, bool(colliding_names)]
+            if rule.check(self, item)
+        ]
+    
+    def _count_scanned(self, count: int, label: str = "Scanned"):
+        """Add to scan_count and log progress every 1,000 items (thread-safe)."""
+        with self._count_lock:
+            before = self.scan_count
+            self.scan_count += count
+            after = self.scan_count
+        
+        # Progress indicator every 1,000 items
+        if before // 1000 != after // 1000:
+            self.logger.info(f"{label} {after - after % 1000:,} items...")
+    
+    def _record_issues(self, issues: List[dict], sink: List[dict]):
+        """Append issues to the sink, count them and stream them to the CSV writer (thread-safe)."""
+        with self._count_lock:
+            sink.extend(issues)
+            self.issue_count += len(issues)
+        
+        # Write to CSV immediately if streaming
+        if self.csv_writer:
+            self.csv_writer.write_issues(issues)
+        
+        if self.destinations:
+            self._route_to_destinations(issues)
+    
+    def _route_to_destinations(self, issues: List[dict]):
+        """Count destination-tagged issues and stream them to each destination's own report."""
+        by_destination = {destination.name: [] for destination in self.destinations}
+        for issue in issues:
+            by_destination[issue['Destination']].append(issue)
+        
+        for destination in self.destinations:
+            destination_issues = by_destination[destination.name]
+            if not destination_issues:
+                continue
+            with self._count_lock:
+                destination.issue_count += len(destination_issues)
+                for issue in destination_issues:
+                    issue_type = issue['IssueType']
+                    destination.issues_by_type[issue_type] = destination.issues_by_type.get(issue_type, 0) + 1
+            if destination.csv_writer:
+                destination.csv_writer.write_issues(destination_issues)
+    
+    def _list_folder(self, current_path: str) -> Optional[List[os.DirEntry]]:
+        """
+        List a directory, dropping excluded entries.
+        
+        This is the only place the traversal calls os.scandir, so every
+        engine pays the same (blocking) I/O here.
+        
+        Returns:
+            The remaining entries, or None if the directory could not be read
+        """
+        if self.checkpoint and current_path in self.checkpoint.done:
+            return ResumedListing(current_path, self.checkpoint.done[current_path])
+        
+        if self.throttle:
+            self.throttle.listing()
+            if self.current_snapshot is not None:
+                self.throttle.stat()  # The folder's own mtime, read by _read_folder
+        
+        slot = self.concurrency.slot() if self.concurrency else contextlib.nullcontext()
+        try:
+            with slot:
+                if self.listing_timeout:
+                    listing = self._read_folder_with_watchdog(current_path)
+                else:
+                    listing = self._read_folder(current_path)
+                if self.tree_snapshot is not None and isinstance(listing, DirListing):
+                    # Recorded here, before any engine can queue the subfolders
+                    listing.tree_item = self.tree_snapshot.add_listing(current_path, listing)
+                return listing
+        except OSError as e:
+            # A retried listing computes its context again
+            self._drop_context(current_path)
+            if is_transient_error(e) and self.retry_queue.defer(RETRY_LISTING, current_path):
+                self.logger.warning(f"Transient error listing {current_path}, will retry later: {e}")
+                return None
+            
+            self.retry_queue.record_failure()
+            if isinstance(e, TimeoutError):
+                self.logger.error(f"Directory unreachable, skipping subtree: {current_path} ({e})")
+                with self._count_lock:
+                    self.unreachable_dirs.append((current_path, str(e)))
+            elif isinstance(e, PermissionError):
+                self.logger.error(f"Permission denied accessing directory: {current_path}")
+            else:
+                self.logger.error(f"OS error accessing {current_path}: {e}")
+        return None
+    
+    def _scandir(self, current_path: str) -> List[os.DirEntry]:
+        """Read a whole directory listing, dropping excluded entries."""
+        with os.scandir(current_path) as entries:
+            return [
+                entry for entry in entries
+                # Skip excluded items
+                if not self.should_exclude(entry.name, entry.is_dir(follow_symlinks=False))
+            ]
+    
+    def _read_folder(self, current_path: str):
+        """
+        Read one folder: its mtime when a snapshot is being built, then its listing.
+        
+        Returns a CachedListing instead of listing when the mtime matches
+        the previous snapshot, otherwise a DirListing.
+        """
+        mtime_ns = None
+        if self.current_snapshot is not None:
+            # Taken before listing, so changes made during the listing
+            # show up as a newer mtime on the next run
+            mtime_ns = os.stat(current_path).st_mtime_ns
+            cached = self.previous_snapshot.get(current_path) if self.previous_snapshot else None
+            if cached and cached['mtime_ns'] == mtime_ns:
+                return CachedListing(current_path, cached)
+        
+        entries = DirListing(self._scandir(current_path))
+        entries.mtime_ns = mtime_ns
+        return entries
+    
+    def _read_folder_with_watchdog(self, current_path: str):
+        """
+        Run _read_folder on a helper thread and give up after listing_timeout.
+        
+        Both the mtime stat and the listing can block on an offline SMB/DFS
+        target and neither can be cancelled, so the helper is a daemon
+        thread that is simply abandoned; it ends on its own if the server
+        ever answers, or with the process.
+        """
+        result = {}
+        
+        def run():
+            try:
+                result['entries'] = self._read_folder(current_path)
+            except BaseException as e:
+                result['error'] = e
+        
+        watchdog = threading.Thread(target=run, name='spo-list-watchdog', daemon=True)
+        watchdog.start()
+        watchdog.join(self.listing_timeout)
+        
+        if watchdog.is_alive():
+            raise TimeoutError(f"listing timed out after {self.listing_timeout:g}s")
+        if 'error' in result:
+            raise result['error']
+        return result['entries']
+    
+    def _unreachable_issues(self, original_root: str) -> List[dict]:
+        """Turn directories whose listing timed out into 'Unreachable' issues (and forget them)."""
+        with self._count_lock:
+            unreachable, self.unreachable_dirs = self.unreachable_dirs, []
+        
+        # One issue per destination in a multi-destination scan
+        checkers = [(destination.checker, {'Destination': destination.name}) for destination in self.destinations]
+        
+        issues = []
+        for full_path, reason in unreachable:
+            for checker, tag in checkers or [(self, {})]:
+                sharepoint_url, site_url_count = checker._sharepoint_url(full_path)
+                issues.append({
+                    **tag,
+                    'ItemType': 'Folder',
+                    'FullPath': full_path,
+                    'IssueType': 'Unreachable',
+                    'CurrentValue': reason,
+                    'SuggestedFix': 'Check that the server or DFS target is online, then rescan this folder',
+                    'CharacterCount': len(os.path.basename(full_path)),
+                    'CharacterCountPath': len(full_path),
+                    'SharePointURL': sharepoint_url or 'N/A',
+                    'SiteURLCount': site_url_count,
+                    'FileSizeMB': '',
+                    'FolderDepth': self.compute_depth(full_path, original_root)
+                })
+        return issues
+    
+    def _stat_entry(self, entry: os.DirEntry) -> os.stat_result:
+        """stat() a listed entry, subject to the stat rate cap."""
+        # On Windows the listing already carried the metadata, so the call
+        # is free and is not counted against the server's stat budget
+        if self.throttle and os.name != 'nt':
+            self.throttle.stat()
+        return entry.stat(follow_symlinks=False)
+    
+    def _defer_stat(self, full_path: str, error: OSError, complete) -> bool:
+        """
+        Park an item whose stat failed transiently for the retry pass.
+        
+        complete(stat_result) builds the item's records once the stat is
+        retried (it receives STAT_FAILED if the retries run out).
+        
+        Returns:
+            True if the item was deferred, False if the error is permanent
+        """
+        if is_transient_error(error) and self.retry_queue.defer(RETRY_STAT, full_path, complete):
+            self.logger.warning(f"Transient error reading {full_path}, will retry later: {error}")
+            with self._count_lock:
+                self._deferred_dirs.add(os.path.dirname(full_path))
+            return True
+        self.retry_queue.record_failure()
+        return False
+    
+    def _drain_retries(self, handle_entries, emit):
+        """
+        Retry deferred listings and stats once the main pass is done.
+        
+        Each round waits for the earliest backoff to expire (the only sleep
+        in the retry path), re-stats deferred items and re-traverses
+        deferred directories, which may in turn defer more work.
+        """
+        while self.retry_queue:
+            batch = self.retry_queue.take_ready()
+            self.logger.info(f"Retrying {len(batch):,} deferred operations...")
+            
+            retry_dirs = []
+            for kind, path, complete in batch:
+                if kind == RETRY_LISTING:
+                    retry_dirs.append(path)
+                    continue
+                
+                try:
+                    if self.throttle:
+                        self.throttle.stat()
+                    stat_result = os.stat(path, follow_symlinks=False)
+                except OSError as e:
+                    if self._defer_stat(path, e, complete):
+                        continue
+                    self.logger.warning(f"Could not get info for {path} after retries: {e}")
+                    stat_result = STAT_FAILED
+                
+                records = complete(stat_result)
+                if records:
+                    emit(records)
+            
+            if retry_dirs:
+                self._run_engine(retry_dirs, handle_entries, emit)
+        
+        # Folders drop their carried context as they are handled or fail;
+        # this only catches a handler that raised
+        self._folder_contexts.clear()
+    
+    def _visit_folder(self, current_path: str, handle_entries) -> Tuple[List[dict], List[str]]:
+        """List one directory and pass its entries to handle_entries."""
+        entries = self._list_folder(current_path)
+        if entries is None:
+            return [], []
+        return self._handle_listing(current_path, entries, handle_entries)
+    
+    def _handle_listing(self, current_path: str, listing, handle_entries) -> Tuple[List[dict], List[str]]:
+        """
+        Run handle_entries on a listing, or reuse the snapshot for an unchanged folder.
+        
+        Freshly handled folders are added to the snapshot being built,
+        unless some of their items are still waiting in the retry queue.
+        Records come back as FolderRecords so the emitting thread can
+        checkpoint the folder once they are written.
+        """
+        if isinstance(listing, (ResumedListing, CachedListing)):
+            self._drop_context(current_path)  # Its entries are not checked again
+        
+        if isinstance(listing, ResumedListing):
+            self._count_scanned(len(listing))
+            with self._count_lock:
+                self.resumed_dirs += 1
+            return [], listing.subdirs
+        
+        if isinstance(listing, CachedListing):
+            self._count_scanned(len(listing))
+            self.current_snapshot.put(current_path, listing.record)
+            with self._count_lock:
+                self.reused_dirs += 1
+            return FolderRecords(listing.issues, current_path, listing.subdirs, len(listing)), listing.subdirs
+        
+        records, subdirs = handle_entries(current_path, listing)
+        
+        if self.current_snapshot is not None and listing.mtime_ns is not None:
+            with self._count_lock:
+                incomplete = current_path in self._deferred_dirs
+            if not incomplete:
+                self.current_snapshot.put(current_path, {
+                    'path': current_path,
+                    'mtime_ns': listing.mtime_ns,
+                    'names': [entry.name for entry in listing],
+                    'dirs': [os.path.basename(subdir) for subdir in subdirs],
+                    'issues': records,
+                })
+        
+        return FolderRecords(records, current_path, subdirs, len(listing)), subdirs
+    
+    def _record_tree_stats(self, listing, stats: Dict[str, Optional[os.stat_result]]):
+        """Pass the stat results a handler took for a listing on to the tree snapshot."""
+        if getattr(listing, 'tree_item', None) is not None:
+            self.tree_snapshot.add_stats(listing.tree_item, listing, stats)
+    
+    def _traverse(self, root_path: str, handle_entries, emit) -> None:
+        """
+        Walk the tree under root_path without recursion.
+        
+        handle_entries(path, entries) processes the listing of one directory
+        and returns (records, subdirectories to visit); emit(records) is
+        always called from a single thread, so sinks need no locking. Every
+        visited folder is emitted, even without records, so emit can
+        checkpoint it.
+        
+        Serial scans use an explicit stack; with workers > 1 each directory
+        becomes a work item on a thread pool, the async engine keeps up to
+        max_inflight listings outstanding, and the pipeline engine runs
+        listing, checking and writing as separate stages. All of them hide
+        SMB round-trip latency on UNC paths.
+        """
+        if self.tree_snapshot_path:
+            self.tree_snapshot = TreeSnapshotWriter(self.tree_snapshot_path, root_path)
+        
+        self._run_engine([root_path], handle_entries, emit)
+        self._drain_retries(handle_entries, emit)
+        
+        if self.tree_snapshot is not None:
+            tree_snapshot, self.tree_snapshot = self.tree_snapshot, None
+            if tree_snapshot.incomplete:
+                self.logger.error(
+                    f"Tree snapshot is missing listings that could not be attached to the tree; "
+                    f"not writing {self.tree_snapshot_path}"
+                )
+                return
+            try:
+                tree_snapshot.save()
+                self.logger.info(
+                    f"Tree snapshot of {len(tree_snapshot):,} items "
+                    f"({len(tree_snapshot.names):,} distinct names) written to: {self.tree_snapshot_path}"
+                )
+            except OSError as e:
+                self.logger.error(f"Failed to write tree snapshot {self.tree_snapshot_path}: {e}")
+    
+    def _run_engine(self, roots: List[str], handle_entries, emit) -> None:
+        """
+        Traverse the subtrees under roots with the configured engine.
+        
+        Every engine visits the subfolders handle_entries returns, and only
+        after it returned, so the context it carried down is in place when
+        a subfolder is listed.
+        """
+        if self.engine == 'async':
+            asyncio.run(self._traverse_async(roots, handle_entries, emit))
+            return
+        
+        if self.engine == 'pipeline':
+            self._traverse_pipeline(roots, handle_entries, emit)
+            return
+        
+        if self.workers <= 1:
+            stack = list(reversed(roots))
+            while stack:
+                records, subdirs = self._visit_folder(stack.pop(), handle_entries)
+                emit(records)
+                # Reverse so folders are visited in listing order
+                stack.extend(reversed(subdirs))
+            return
+        
+        if self.concurrency:
+            self.logger.info(
+                f"Parallel scan using adaptive workers "
+                f"(starting at {self.concurrency.limit}, up to {self.concurrency.maximum})"
+            )
+        else:
+            self.logger.info(f"Parallel scan using {self.workers} worker threads")
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='spo-scan') as executor:
+            pending = {executor.submit(self._visit_folder, root, handle_entries) for root in roots}
+            
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    try:
+                        records, subdirs = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Worker failed: {e}")
+                        continue
+                    
+                    emit(records)
+                    
+                    for subdir in subdirs:
+                        pending.add(executor.submit(self._visit_folder, subdir, handle_entries))
+        
+        if self.concurrency:
+            self.logger.info(
+                f"Adaptive workers finished at {self.concurrency.limit} "
+                f"(peak {self.concurrency.peak_limit})"
+            )
+    
+    async def _traverse_async(self, roots: List[str], handle_entries, emit) -> None:
+        """
+        Event-loop traversal for high-latency shares.
+        
+        Directory listings run on a bounded executor, gated by a semaphore
+        so at most max_inflight are outstanding. Entries are handled on the
+        event loop thread as each listing completes, using the same
+        handlers (and check_item logic) as the thread engine.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_inflight)
+        
+        self.logger.info(f"Async scan with up to {self.max_inflight} directory listings in flight")
+        
+        with ThreadPoolExecutor(max_workers=self.max_inflight, thread_name_prefix='spo-list') as executor:
+            async def visit(path: str) -> Tuple[List[dict], List[str]]:
+                async with semaphore:
+                    entries = await loop.run_in_executor(executor, self._list_folder, path)
+                if entries is None:
+                    return [], []
+                return self._handle_listing(path, entries, handle_entries)
+            
+            pending = {asyncio.ensure_future(visit(root)) for root in roots}
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in done:
+                    try:
+                        records, subdirs = task.result()
+                    except Exception as e:
+                        self.logger.error(f"Worker failed: {e}")
+                        continue
+                    
+                    emit(records)
+                    
+                    for subdir in subdirs:
+                        pending.add(asyncio.ensure_future(visit(subdir)))
+    
+    def _traverse_pipeline(self, roots: List[str], handle_entries, emit) -> None:
         """
-        Generate a suggested filename fix.
+        Run the traversal as three stages connected by bounded queues.
+        
+        Enumerator threads list directories, a checker pool runs
+        handle_entries on each listing, and a single writer thread emits
+        the records. A folder's subfolders are queued for listing once it
+        has been checked. A full queue blocks the stage feeding it, so a
+        slow report disk or CPU-bound checks throttle enumeration instead
+        of piling up listings in memory. Per-stage counters are kept in
+        self.pipeline_stats.
         """
-        fixed = self.sanitize_filename(item_name)
-        fixed = self.truncate_to_limit(fixed, self.max_filename)
-        return fixed
+        stage_threads = max(1, self.workers)
+        frontier = queue.Queue()
+        check_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        stats = {
+            'enumerate': StageCounter('enumerate'),
+            'check': StageCounter('check'),
+            'write': StageCounter('write'),
+        }
+        if self.pipeline_stats:
+            # Retry passes add to the counters of the main pass
+            stats = self.pipeline_stats
+        self.pipeline_stats = stats
+        
+        self.logger.info(
+            f"Pipeline scan: {stage_threads} enumerator(s), {stage_threads} checker(s), 1 writer, "
+            f"queue size {self.queue_size}"
+        )
+        
+        def enumerator():
+            while True:
+                path = frontier.get()
+                if path is None:
+                    return
+                entries = None
+                try:
+                    started = time.perf_counter()
+                    entries = self._list_folder(path)
+                    stats['enumerate'].add(len(entries or ()), time.perf_counter() - started)
+                except Exception as e:
+                    self.logger.error(f"Enumerator failed on {path}: {e}")
+                if entries is None:
+                    frontier.task_done()
+                else:
+                    check_queue.put((path, entries))  # The checker marks the folder done
+        
+        def checker():
+            while True:
+                item = check_queue.get()
+                if item is None:
+                    return
+                path, entries = item
+                try:
+                    started = time.perf_counter()
+                    records, subdirs = self._handle_listing(path, entries, handle_entries)
+                    stats['check'].add(len(entries), time.perf_counter() - started)
+                    # Queued before the folder is marked done, so enumeration cannot look finished
+                    for subdir in subdirs:
+                        frontier.put(subdir)
+                    write_queue.put(records)
+                except Exception as e:
+                    self.logger.error(f"Checker failed on {path}: {e}")
+                finally:
+                    frontier.task_done()
+        
+        def writer():
+            while True:
+                records = write_queue.get()
+                if records is None:
+                    return
+                try:
+                    started = time.perf_counter()
+                    emit(records)
+                    stats['write'].add(len(records), time.perf_counter() - started)
+                except Exception as e:
+                    self.logger.error(f"Writer failed: {e}")
+        
+        def start(target, name, count):
+            threads = [threading.Thread(target=target, name=f'spo-{name}-{i}', daemon=True) for i in range(count)]
+            for thread in threads:
+                thread.start()
+            return threads
+        
+        enumerators = start(enumerator, 'enumerate', stage_threads)
+        checkers = start(checker, 'check', stage_threads)
+        writers = start(writer, 'write', 1)
+        
+        # Enumeration is finished once every discovered directory was listed and checked
+        for root in roots:
+            frontier.put(root)
+        frontier.join()
+        
+        # Then drain each stage in order
+        for stage_queue, threads in ((frontier, enumerators), (check_queue, checkers), (write_queue, writers)):
+            for _ in threads:
+                stage_queue.put(None)
+            for thread in threads:
+                thread.join()
+        
+        for counter in stats.values():
+            self.logger.info(str(counter))
     
-    def check_item(
-        self,
-        full_path: str,
-        root_path: str,
-        is_file: bool
-    ) -> List[dict]:
+    def _scan_entries(self, current_path: str, entries_list: List[os.DirEntry],
+                      original_root: str) -> Tuple[List[dict], List[str]]:
         """
-        Check a single file or folder for all SPO migration issues.
-        Returns a list of issue records (may be empty or contain multiple issues).
+        Check every entry of a single directory listing (no recursion).
+        
+        Case-collision detection only needs the names of one folder, so a
+        folder is the unit of work for every traversal engine.
+        
+        Returns:
+            Tuple of (issues found in this folder, subdirectory paths to scan next)
         """
-        issues = []
-        item_name = os.path.basename(full_path)
-        item_type = 'File' if is_file else 'Folder'
+        folder_issues = []
+        subdirs = []
+        check_entry = self._check_destinations if self.destinations else self._check_entry
+        folder = self._folder_context(current_path, original_root)
         
-        # Calculate local Windows path length
-        character_count_path = len(full_path)
+        # First pass: detect case collisions among this folder's names
+        folder_items = {}  # key: lowercase name, value: original name
+        collision_groups = {}  # key: lowercase name, value: list of original names
         
-        # Calculate SharePoint URL length if configured
-        if self.spo_base:
-            # Get relative path from scan root
-            try:
-                rel_path = os.path.relpath(full_path, self.scan_root)
-                # Convert Windows path separators to URL format
-                rel_path_url = rel_path.replace('\\', '/')
-                # URL-encode the path components
-                path_parts = [quote(part) for part in rel_path_url.split('/')]
-                rel_path_encoded = '/'.join(path_parts)
-                # Build full SharePoint URL
-                sharepoint_url = self.spo_base + rel_path_encoded
-                site_url_count = len(sharepoint_url)
-            except (ValueError, Exception) as e:
-                self.logger.warning(f"Could not compute SharePoint URL for {full_path}: {e}")
-                site_url_count = len(full_path)
-                sharepoint_url = None
-        else:
-            # Fall back to local path length
-            site_url_count = len(full_path)
-            sharepoint_url = None
+        for entry in entries_list if self._check_siblings else ():
+            name_lower = entry.name.lower()
+            
+            if name_lower in folder_items:
+                # Collision detected!
+                if name_lower not in collision_groups:
+                    collision_groups[name_lower] = [folder_items[name_lower]]
+                collision_groups[name_lower].append(entry.name)
+            else:
+                folder_items[name_lower] = entry.name
         
-        # Compute depth
-        depth = self.compute_depth(full_path, root_path)
+        self._count_scanned(len(entries_list))
         
-        # Get file size if it's a file
-        file_size_mb = 0.0
-        if is_file:
+        # Second pass: queue subfolders and stat the entries an enabled rule needs
+        rows = []  # (full_path, name, is_file, stat_result, colliding_names)
+        for entry in entries_list:
             try:
-                file_size_bytes = retry_with_backoff(os.path.getsize, full_path)
-                file_size_mb = file_size_bytes / (1024 * 1024)
+                full_path = entry.path
+                is_file = entry.is_file(follow_symlinks=False)
+                is_dir = entry.is_dir(follow_symlinks=False)
+                
+                if is_dir:
+                    subdirs.append(full_path)
+                    self._carry_context(folder, full_path, entry.name)
+                
+                colliding_names = [
+                    n for n in collision_groups.get(entry.name.lower(), ()) if n != entry.name
+                ] if collision_groups else None
+                
+                # Stat once, and only if an enabled rule needs the size or
+                # mtime: DirEntry caches the result from the directory
+                # listing on Windows, so this is usually free there
+                stat_result = None
+                if self._stat_all or (self._stat_files if is_file else self._stat_folders):
+                    try:
+                        stat_result = self._stat_entry(entry)
+                    except OSError as e:
+                        complete = functools.partial(
+                            check_entry, full_path, entry.name, is_file, colliding_names, original_root,
+                            folder=folder
+                        )
+                        if self._defer_stat(full_path, e, complete):
+                            continue
+                        self.logger.warning(f"Could not get size for {full_path}: {e}")
+                        stat_result = STAT_FAILED
+                
+                rows.append((full_path, entry.name, is_file, stat_result, colliding_names))
+            
+            except PermissionError:
+                self.logger.warning(f"Permission denied: {entry.path}")
             except OSError as e:
-                self.logger.warning(f"Could not get size for {full_path}: {e}")
-                file_size_bytes = 0
-        else:
-            file_size_bytes = 0
-        
-        # Check 0: Reserved device names (Windows/SharePoint)
-        if check_reserved_name(item_name):
-            issues.append({
-                'ItemType': item_type,
-                'FullPath': full_path,
-                'IssueType': 'Reserved device name (Windows)',
-                'CurrentValue': item_name,
-                'SuggestedFix': f'{item_name}_file' if is_file else f'{item_name}_folder',
-                'CharacterCount': len(item_name),
-                'CharacterCountPath': character_count_path,
-                'SharePointURL': sharepoint_url or 'N/A',
-                'SiteURLCount': site_url_count,
-                'FileSizeMB': f'{file_size_mb:.2f}' if is_file else '',
-                'FolderDepth': depth
-            })
-        
-        # Check 1: Path length (using SharePoint URL if available)
-        if site_url_count > self.max_path:
-            issue_detail = f'SharePoint URL: {site_url_count} chars' if sharepoint_url else f'{site_url_count} chars'
-            issues.append({
-                'ItemType': item_type,
-                'FullPath': full_path,
-                'IssueType': 'Path too long',
-                'CurrentValue': issue_detail,
-                'SuggestedFix': f'Shorten to ≤{self.max_path} chars (current: {site_url_count}, limit: {self.max_path})',
-                'CharacterCount': len(item_name),
-                'CharacterCountPath': character_count_path,
-                'SharePointURL': sharepoint_url or 'N/A',
-                'SiteURLCount': site_url_count,
-                'FileSizeMB': f'{file_size_mb:.2f}' if is_file else '',
-                'FolderDepth': depth
-            })
-        
-        # Check 2: Filename length
-        if len(item_name) > self.max_filename:
-            issues.append({
-                'ItemType': item_type,
-                'FullPath': full_path,
-                'IssueType': 'Filename too long',
-                'CurrentValue': item_name,
-                'SuggestedFix': self.suggest_fix(item_name),
-                'CharacterCount': len(item_name),
-                'CharacterCountPath': character_count_path,
-                'SharePointURL': sharepoint_url or 'N/A',
-                'SiteURLCount': site_url_count,
-                'FileSizeMB': f'{file_size_mb:.2f}' if is_file else '',
-                'FolderDepth': depth
-            })
+                self.logger.warning(f"OS error scanning {entry.path}: {e}")
         
-        # Check 3: Invalid characters
-        invalid_found = [c for c in item_name if c in self.invalid_chars]
-        if invalid_found:
-            issues.append({
-                'ItemType': item_type,
-                'FullPath': full_path,
-                'IssueType': 'Invalid characters',
-                'CurrentValue': f"{item_name} (chars: {', '.join(set(invalid_found))})",
-                'SuggestedFix': self.suggest_fix(item_name),
-                'CharacterCount': len(item_name),
-                'CharacterCountPath': character_count_path,
-                'SharePointURL': sharepoint_url or 'N/A',
-                'SiteURLCount': site_url_count,
-                'FileSizeMB': f'{file_size_mb:.2f}' if is_file else '',
-                'FolderDepth': depth
-            })
-        
-        # Check 4: Leading/trailing spaces or periods
-        stripped = item_name.strip(' .')
-        if stripped != item_name:
-            issues.append({
-                'ItemType': item_type,
-                'FullPath': full_path,
-                'IssueType': 'Leading/trailing space or period',
-                'CurrentValue': item_name,
-                'SuggestedFix': self.suggest_fix(item_name),
-                'CharacterCount': len(item_name),
-                'CharacterCountPath': character_count_path,
-                'SharePointURL': sharepoint_url or 'N/A',
-                'SiteURLCount': site_url_count,
-                'FileSizeMB': f'{file_size_mb:.2f}' if is_file else '',
-                'FolderDepth': depth
-            })
-        
-        # Check 5: Blocked extensions (files only)
-        if is_file:
-            _, ext = os.path.splitext(item_name)
-            if ext.lower() in self.blocked_extensions:
-                issues.append({
-                    'ItemType': item_type,
-                    'FullPath': full_path,
-                    'IssueType': 'Blocked file extension',
-                    'CurrentValue': ext,
-                    'SuggestedFix': 'Remove or rename file',
-                    'CharacterCount': len(item_name),
-                'CharacterCountPath': character_count_path,
-                    'SharePointURL': sharepoint_url or 'N/A',
-                    'SiteURLCount': site_url_count,
-                    'FileSizeMB': f'{file_size_mb:.2f}',
-                    'FolderDepth': depth
-                })
+        if self.tree_snapshot is not None:
+            self._record_tree_stats(entries_list, {row[1]: row[3] for row in rows})
         
-        # Check 6: File size (files only)
-        if is_file and file_size_bytes > self.max_file_size_bytes:
-            issues.append({
-                'ItemType': item_type,
-                'FullPath': full_path,
-                'IssueType': 'File too large',
-                'CurrentValue': f'{file_size_mb:.2f} MB',
-                'SuggestedFix': f'Split or reduce to ≤{self.max_file_size_bytes / (1024**3):.0f} GB',
-                'CharacterCount': len(item_name),
-                'CharacterCountPath': character_count_path,
-                'SharePointURL': sharepoint_url or 'N/A',
-                'SiteURLCount': site_url_count,
-                'FileSizeMB': f'{file_size_mb:.2f}',
-                'FolderDepth': depth
-            })
+        # Third pass: run the rules, on every row or (--batch-check) only on
+        # the rows a large folder's vectorized pre-check flags
+        if self.batch_checker and len(rows) >= BATCH_MIN_ENTRIES and not self.destinations:
+            rows = self.batch_checker.flagged(rows, folder)
         
-        # Check 7: Excessive folder depth
-        if depth > self.max_depth:
-            issues.append({
-                'ItemType': item_type,
-                'FullPath': full_path,
-                'IssueType': 'Excessive folder depth',
-                'CurrentValue': str(depth),
-                'SuggestedFix': f'Flatten hierarchy to ≤{self.max_depth} levels',
-                'CharacterCount': len(item_name),
-                'CharacterCountPath': character_count_path,
-                'SharePointURL': sharepoint_url or 'N/A',
-                'SiteURLCount': site_url_count,
-                'FileSizeMB': f'{file_size_mb:.2f}' if is_file else '',
-                'FolderDepth': depth
-            })
+        for full_path, name, is_file, stat_result, colliding_names in rows:
+            try:
+                issues = check_entry(full_path, name, is_file, colliding_names, original_root, stat_result, folder)
+                if issues:
+                    folder_issues.extend(issues)
+            
+            except PermissionError:
+                self.logger.warning(f"Permission denied: {full_path}")
+            except OSError as e:
+                self.logger.warning(f"OS error scanning {full_path}: {e}")
         
+        return folder_issues, subdirs
+    
+    def _check_entry(self, full_path: str, name: str, is_file: bool, colliding_names: List[str],
+                     original_root: str, stat_result: Optional[os.stat_result],
+                     folder: Optional[FolderContext] = None) -> List[dict]:
+        """Run check_item on one listed entry (use original_root for depth calculation)."""
+        return self.check_item(full_path, original_root, is_file, stat_result, folder, colliding_names)
+    
+    def _check_destinations(self, full_path: str, name: str, is_file: bool, colliding_names: List[str],
+                            original_root: str, stat_result: Optional[os.stat_result],
+                            folder: Optional[FolderContext] = None) -> List[dict]:
+        """Run the entry checks once per destination, tagging each issue with the destination name."""
+        issues = []
+        for destination in self.destinations:
+            # Checkers share the folder's encoded path; a routed prefix is relative to another root
+            checker_folder = folder.rebase(destination.checker.spo_base) if folder and not self.routes else None
+            for issue in destination.checker._check_entry(
+                full_path, name, is_file, colliding_names, original_root, stat_result, checker_folder
+            ):
+                issue.destination = destination.name
+                issues.append(issue)
         return issues
     
     def scan_directory(self, current_path: str, original_root: str = None) -> List[dict]:
         """
-        Recursively scan a directory and return all issue records.
+        Scan a directory tree and return all issue records.
         
         Args:
-            current_path: The directory currently being scanned
+            current_path: The directory to scan
             original_root: The original scan root (for depth calculation)
         """
-        # On first call, set original_root to current_path
         if original_root is None:
             original_root = current_path
+        
+        if self.snapshot_path or self.keep_snapshot:
+            self._start_snapshot(current_path)
+        
+        all_issues = []
+        emit = lambda issues: self._record_issues(issues, all_issues)
+        if self.checkpoint:
+            all_issues.extend(self.checkpoint.previous_issues)
+            self.issue_count += len(self.checkpoint.previous_issues)
+            emit = lambda issues: self._emit_checkpointed(issues, all_issues)
+        
+        try:
+            self._traverse(
+                current_path,
+                lambda path, entries: self._scan_entries(path, entries, original_root),
+                emit
+            )
+        finally:
+            if self.current_snapshot is not None:
+                self._finish_snapshot()
+        
+        unreachable = self._unreachable_issues(original_root)
+        if unreachable:
+            self._record_issues(unreachable, all_issues)
+        
+        if not (self.resumed_dirs or self.reused_dirs):
+            # Folders skipped by --resume or a reused snapshot are never routed
+            for key, (source, _) in self.routes.items():
+                if key not in self._routes_matched:
+                    self.logger.warning(f"Route source {source} matched no scanned folder; check the path")
+        return all_issues
+    
+    def recheck_items(self, root_path: str, previous_issues: List[dict]) -> List[dict]:
+        """
+        Re-check the folders that held issues in a previous report.
+        
+        Each parent folder of a flagged item is listed once and every entry
+        in it is checked, so an item that was fixed, renamed or newly added
+        there shows up as Resolved or New. Folders reported as Unreachable
+        are scanned again with their whole subtree. Other folders are not
+        visited, so work scales with the number of flagged folders, not the
+        size of the share (the contents of a flagged folder that was renamed
+        are only checked by a full scan).
+        
+        Returns:
+            Current issues marked Still open or New, followed by the previous
+            issues that no longer occur, marked Resolved
+        """
+        folders = set()  # Parent folders of flagged items: every entry checked
+        subtrees = set()  # Previously Unreachable folders: scanned in full
+        for issue in previous_issues:
+            full_path = issue['FullPath']
+            if issue['IssueType'] == 'Unreachable':
+                subtrees.add(full_path)
+            parent = os.path.dirname(full_path)
+            if parent != full_path:
+                folders.add(parent)
+        
+        def in_subtree(path: str) -> bool:
+            while path not in subtrees:
+                parent = os.path.dirname(path)
+                if parent == path:
+                    return False
+                path = parent
+            return True
+        
+        # Folders inside a rescanned subtree are reached by its traversal
+        roots = sorted(subtrees) + sorted(folder for folder in folders if not in_subtree(folder))
+        self.logger.info(
+            f"Rechecking {len(previous_issues):,} previous issues in {len(folders):,} folders "
+            f"and {len(subtrees):,} previously unreachable subtrees"
+        )
+        
+        current_issues = []
+        
+        def handle_entries(path: str, entries) -> Tuple[List[dict], List[str]]:
+            records, subdirs = self._scan_entries(path, entries, root_path)
+            if in_subtree(path):
+                return records, subdirs
+            for subdir in subdirs:
+                self._drop_context(subdir)
+            return records, []
+        
+        emit = lambda issues: self._record_issues(issues, current_issues)
+        self._run_engine(roots, handle_entries, emit)
+        self._drain_retries(handle_entries, emit)
+        current_issues.extend(self._unreachable_issues(root_path))
+        
+        previous_keys = {(issue['FullPath'], issue['IssueType']) for issue in previous_issues}
+        current_keys = set()
+        rows = []
+        for issue in current_issues:
+            key = (issue['FullPath'], issue['IssueType'])
+            current_keys.add(key)
+            status = RECHECK_STILL_OPEN if key in previous_keys else RECHECK_NEW
+            rows.append(dict(report_row(issue), RecheckStatus=status))
+        
+        for issue in previous_issues:
+            if (issue['FullPath'], issue['IssueType']) not in current_keys:
+                rows.append(dict(issue, RecheckStatus=RECHECK_RESOLVED))
+        
+        return rows
+    
+    def check_inventory(self, inventory_path: str, root_path: str) -> List[dict]:
+        """
+        Run all checks against a saved inventory instead of the file server.
+        
+        inventory_path is an inventory CSV or a tree snapshot. root_path is
+        the folder it was taken from; it does not need to be reachable.
+        Items are checked folder by folder like a live scan, with the
+        current exclusions and thresholds. File sizes from an inventory CSV
+        come from its FileSizeMB column (rounded to 0.01 MB) and modified
+        times from its ModifiedDate column (to the second, local time).
+        """
+        if TreeSnapshot.is_snapshot(inventory_path):
+            tree = TreeSnapshot(inventory_path)
+            try:
+                self.logger.info(f"Opened tree snapshot of {len(tree):,} items from {inventory_path}")
+                return self._check_inventory_folders(self._tree_snapshot_folders(tree), root_path)
+            finally:
+                tree.close()
+        
+        folders = {}  # ParentPath -> [InventoryEntry]
+        with open(inventory_path, 'r', newline='', encoding='utf-8-sig') as csvfile:
+            for row in csv.DictReader(csvfile):
+                item_type = row.get('ItemType')
+                if item_type not in ('File', 'Folder'):
+                    break  # Summary section at the end of the inventory
+                
+                is_file = item_type == 'File'
+                size_bytes = int(float(row['FileSizeMB'] or 0) * 1024 * 1024) if is_file else 0
+                modified_date = row.get('ModifiedDate')
+                mtime = datetime.strptime(modified_date, INVENTORY_DATE_FORMAT).timestamp() if modified_date else None
+                folders.setdefault(row['ParentPath'], []).append(
+                    InventoryEntry(row['FullPath'], row['FileName'], is_file, size_bytes, mtime)
+                )
+        
+        self.logger.info(f"Loaded inventory of {len(folders):,} folders from {inventory_path}")
+        return self._check_inventory_folders(folders.items(), root_path)
+    
+    @staticmethod
+    def _tree_snapshot_folders(tree: TreeSnapshot):
+        """Yield (folder path, [InventoryEntry]) for each folder of a tree snapshot."""
+        for folder, items in tree.folders():
+            folder_path = tree.path(folder)
+            yield folder_path, [
+                InventoryEntry(os.path.join(folder_path, tree.name(item)), tree.name(item),
+                               tree.is_file(item), tree.sizes[item],
+                               # 0 is stored for items that could not be stat'ed
+                               tree.mtimes[item] / 1e9 if tree.mtimes[item] else None)
+                for item in items
+            ]
+    
+    def what_if_destinations(self, inventory_path: str, root_path: str,
+                             candidates: List[Tuple[str, str]]) -> List[dict]:
+        """
+        Count path-too-long items for candidate destinations without rescanning.
+        
+        The encoded relative URL length of every item in the inventory (CSV
+        or tree snapshot) is computed once and sorted; each candidate
+        (spo_url, spo_library) then only adds its base length and counts
+        the items over max_path with a binary search.
+        
+        Returns:
+            One result row per candidate (see WHAT_IF_FIELDNAMES)
+        """
+        lengths = sorted(self._encoded_path_lengths(inventory_path, root_path))
+        self.logger.info(f"Computed encoded URL lengths of {len(lengths):,} items from {inventory_path}")
+        longest = lengths[-1] if lengths else 0
+        
+        results = []
+        for spo_url, spo_library in candidates:
+            spo_base = build_spo_base(spo_url, spo_library)
+            overhead = len(spo_base)
+            results.append({
+                'SharePointURL': spo_url,
+                'DocumentLibrary': spo_library,
+                'SharePointBase': spo_base,
+                'URLOverhead': overhead,
+                'EffectivePathLimit': self.max_path - overhead,
+                'ItemsChecked': len(lengths),
+                'PathTooLong': len(lengths) - bisect.bisect_right(lengths, self.max_path - overhead),
+                'LongestURL': overhead + longest,
+            })
+        return results
+    
+    def _encoded_path_lengths(self, inventory_path: str, root_path: str) -> array.array:
+        """Length of the URL-encoded path below the library for every non-excluded inventory item."""
+        quoted_lengths = {}  # name -> len(quote(name))
+        
+        def quoted_length(name: str) -> int:
+            length = quoted_lengths.get(name)
+            if length is None:
+                length = quoted_lengths[name] = len(quote(name))
+            return length
+        
+        lengths = array.array('I')
+        
+        if TreeSnapshot.is_snapshot(inventory_path):
+            tree = TreeSnapshot(inventory_path)
+            try:
+                # Parents always precede their children, so one pass suffices;
+                # -1 marks excluded items and everything below them
+                item_lengths = array.array('q', [0]) * len(tree)
+                for item in range(1, len(tree)):
+                    parent = tree.parents[item]
+                    name = tree.name(item)
+                    if item_lengths[parent] < 0 or self.should_exclude(name, not tree.is_file(item)):
+                        item_lengths[item] = -1
+                        continue
+                    length = quoted_length(name) + (item_lengths[parent] + 1 if parent else 0)
+                    item_lengths[item] = length
+                    lengths.append(length)
+            finally:
+                tree.close()
+            return lengths
+        
+        with open(inventory_path, 'r', newline='', encoding='utf-8-sig') as csvfile:
+            for row in csv.DictReader(csvfile):
+                if row.get('ItemType') not in ('File', 'Folder'):
+                    break  # Summary section at the end of the inventory
+                if (self._inventory_path_excluded(row['ParentPath'], root_path)
+                        or self.should_exclude(row['FileName'], row['ItemType'] == 'Folder')):
+                    continue
+                parts = os.path.relpath(row['FullPath'], root_path).replace('\\', '/').split('/')
+                lengths.append(sum(quoted_length(part) for part in parts) + len(parts) - 1)
+        return lengths
+    
+    def _check_inventory_folders(self, folders, root_path: str) -> List[dict]:
+        """Check (folder path, entries) pairs loaded from an inventory."""
+        all_issues = []
+        for parent, entries in folders:
+            if self._inventory_path_excluded(parent, root_path):
+                continue
+            entries = [entry for entry in entries if not self.should_exclude(entry.name, entry.is_dir())]
+            issues, _ = self._scan_entries(parent, entries, root_path)
+            if issues:
+                self._record_issues(issues, all_issues)
+        
+        self._folder_contexts.clear()  # Folders without items are not in the inventory's groups
+        return all_issues
+    
+    def _inventory_path_excluded(self, folder_path: str, root_path: str) -> bool:
+        """True if any folder between root_path and folder_path matches --exclude-dirs."""
+        rel_path = os.path.relpath(folder_path, root_path)
+        if rel_path == os.curdir:
+            return False
+        return any(self.should_exclude(part, True) for part in rel_path.split(os.sep))
+    
+    def _emit_checkpointed(self, issues: List[dict], sink: List[dict]):
+        """Record issues, mark their folder finished and save a checkpoint when one is due."""
+        if issues and self.checkpoint.previous_keys:
+            # Folders that had deferred items are rescanned after a resume;
+            # skip the rows the interrupted run already wrote for them
+            anonymize_fn = self.csv_writer.anonymize_fn if self.csv_writer else None
+            issues_to_record = [
+                issue for issue in issues
+                if ((anonymize_fn(issue['FullPath']) if anonymize_fn else issue['FullPath']), issue['IssueType'])
+                not in self.checkpoint.previous_keys
+            ]
+        else:
+            issues_to_record = issues
+        if issues_to_record:
+            self._record_issues(issues_to_record, sink)
+        
+        if isinstance(issues, FolderRecords):
+            with self._count_lock:
+                incomplete = issues.path in self._deferred_dirs
+            # A folder with deferred items is rescanned on resume
+            if not incomplete:
+                self.checkpoint.mark_done(issues.path, issues.subdirs, issues.item_count)
+        self.checkpoint.maybe_save(self.csv_writer)
+    
+    def start_checkpoint(self, root_path: str, report_path: str, interval: float, resume: bool) -> bool:
+        """
+        Checkpoint the scan of root_path to <report>.checkpoint every interval seconds.
+        
+        With resume, continue the interrupted scan recorded there instead of
+        starting over; the caller must then append to the report. Returns
+        True if a previous scan is being resumed.
+        """
+        checkpoint = ScanCheckpoint(
+            f"{report_path}.checkpoint", self._config_fingerprint(root_path), interval, self.anon_salt
+        )
+        resumed = resume and checkpoint.resume(report_path, self.logger)
+        if not resumed:
+            checkpoint.start()
+        elif checkpoint.anon_salt != self.anon_salt:
+            # Rows already in the report were hashed with the interrupted scan's salt
+            self.anon_salt = checkpoint.anon_salt
+            self.logger.info(f"Anonymization salt of the interrupted scan reused: {self.anon_salt}")
+        self.checkpoint = checkpoint
+        return resumed
+    
+    def rescan(self, root_path: str) -> List[dict]:
+        """
+        Scan root_path again, re-listing only folders whose mtime changed since the last call.
+        
+        The first call is a full scan (or an incremental one against the
+        --snapshot file); the snapshot it builds is kept in memory for the
+        next call. Counters start from zero on every call.
+        """
+        self.keep_snapshot = True
+        self.scan_count = 0
+        self.issue_count = 0
+        self.reused_dirs = 0
+        self.age_reference = age_reference()
+        return self.scan_directory(root_path)
+    
+    @property
+    def changed_dirs(self) -> int:
+        """Folders listed (rather than reused) by the last rescan()."""
+        return len(self.last_snapshot) - self.reused_dirs if self.last_snapshot else 0
+    
+    def _config_fingerprint(self, root_path: str) -> str:
+        """Hash of every setting that affects which issues a folder produces."""
+        settings = {
+            'version': __version__,
+            'root': os.path.normpath(root_path),
+            'scan_root': self.scan_root,
+            'max_path': self.max_path,
+            'max_filename': self.max_filename,
+            'max_file_size_bytes': self.max_file_size_bytes,
+            'max_depth': self.max_depth,
+            'blocked_extensions': sorted(self.blocked_extensions),
+            'invalid_chars': sorted(self.invalid_chars),
+            'exclude_dirs': sorted(self.exclude_dirs),
+            'exclude_exts': sorted(self.exclude_exts),
+            'spo_base': self.spo_base,
+            'url_overhead': self.url_overhead,
+            'routes': sorted(self.routes.values()),
+            'destinations': [
+                [destination.name, destination.checker.spo_base, sorted(destination.checker.invalid_chars)]
+                for destination in self.destinations
+            ],
+            'rules': [rule.name for rule in self.rules],
+            'custom_rules': self.config['custom_rules'],
+            # Age rules give other results on another day, even for an unchanged folder
+            'age_reference': self.age_reference if self._age_rules else None,
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+    
+    def _start_snapshot(self, root_path: str):
+        """Load the previous snapshot (unless full_rescan) and start a new one."""
+        fingerprint = self._config_fingerprint(root_path)
+        if self.last_snapshot is not None and self.last_snapshot.fingerprint == fingerprint:
+            self.previous_snapshot = self.last_snapshot
+        elif self.full_rescan:
+            self.logger.info("Full rescan requested; previous snapshot ignored")
+        elif self.snapshot_path:
+            self.previous_snapshot = DirectorySnapshot.load(
+                self.snapshot_path, fingerprint, self.scan_root, self.logger
+            )
+        self.current_snapshot = DirectorySnapshot(fingerprint, self.scan_root)
+    
+    def _finish_snapshot(self):
+        """Save the snapshot built by this run."""
+        snapshot, self.current_snapshot = self.current_snapshot, None
+        self.previous_snapshot = None
+        if self.keep_snapshot:
+            self.last_snapshot = snapshot
+        
+        if self.reused_dirs:
+            self.logger.info(
+                f"Incremental scan: reused {self.reused_dirs:,} unchanged of {len(snapshot):,} directories"
+            )
+        if not self.snapshot_path:
+            return
+        try:
+            snapshot.save(self.snapshot_path)
+            self.logger.info(f"Snapshot written to: {self.snapshot_path}")
+        except OSError as e:
+            self.logger.error(f"Failed to write snapshot {self.snapshot_path}: {e}")
+
+    def _split_shards(self, root_path: str, shard_target: int, all_issues: List[dict]) -> List[str]:
+        """
+        Scan the top of the tree in-process and return the subtrees left to scan.
+        
+        Levels are split (up to MAX_SHARD_SPLIT_LEVELS) until there are at
+        least shard_target shards, so case collisions between top-level names
+        are still caught here. Issues found on the way are recorded.
+        """
+        def visit(path):
+            issues, subdirs = self._visit_folder(
+                path, lambda path, entries: self._scan_entries(path, entries, root_path)
+            )
+            if issues:
+                self._record_issues(issues, all_issues)
+            return subdirs
+        
+        shards = visit(root_path)
+        for _ in range(MAX_SHARD_SPLIT_LEVELS - 1):
+            if not shards or len(shards) >= shard_target:
+                break
+            next_level = []
+            for shard in shards:
+                next_level.extend(visit(shard))
+            shards = next_level
+        
+        # Shards are scanned by worker processes, which compute their own contexts
+        for shard in shards:
+            self._drop_context(shard)
+        
+        # Top-level folders that failed transiently are finished in-process
+        self._drain_retries(
+            lambda path, entries: self._scan_entries(path, entries, root_path),
+            lambda issues: self._record_issues(issues, all_issues)
+        )
+        
+        unreachable = self._unreachable_issues(root_path)
+        if unreachable:
+            self._record_issues(unreachable, all_issues)
+        return shards
+    
+    def _shard_worker_config(self, processes: int) -> dict:
+        """Scanner settings for shard workers, with rate caps split across processes."""
+        # Workers write raw rows; anonymization happens once, in our writer
+        worker_config = dict(self.config, anonymize=False, progress=False, snapshot_path=None,
+                             tree_snapshot_path=None)
+        
+        # Rate caps apply to the whole scan, so split them across processes
+        for cap in ('max_listings_per_sec', 'max_stats_per_sec'):
+            if worker_config.get(cap):
+                worker_config[cap] = worker_config[cap] / processes
+        return worker_config
+    
+    def _merge_shard(self, partial_path: str, scan_count: int, worker_stats: dict, all_issues: List[dict],
+                     tombstone: bool = False):
+        """
+        Fold a finished shard's counters and partial report into this scan, then delete the partial.
+        
+        With tombstone the partial is emptied instead, so its name stays
+        taken and a late duplicate cannot publish the shard again.
+        """
+        self._count_scanned(scan_count)
+        if self.throttle:
+            self.throttle.add_waits(worker_stats['throttle'])
+        self.retry_queue.add_counts(**worker_stats['retries'])
+        
+        try:
+            issues = read_report_csv(partial_path)
+            if issues:
+                self._record_issues(issues, all_issues)
+        finally:
+            if tombstone:
+                os.truncate(partial_path, 0)
+            else:
+                os.remove(partial_path)
+    
+    def scan_directory_sharded(self, root_path: str, processes: int, report_path: str) -> List[dict]:
+        """
+        Scan the tree with several worker processes and merge their reports.
+        
+        The top of the tree is scanned here (so case collisions between
+        top-level names are still caught) until there are enough subtree
+        shards to keep every process busy. Each shard is then scanned in a
+        separate process that writes its own partial CSV next to
+        report_path; the partial reports are streamed into this scanner's
+        CSV writer and deleted as the shards finish.
+        
+        Returns:
+            All issue records, as with scan_directory
+        """
+        all_issues = []
+        shards = self._split_shards(root_path, processes * SHARDS_PER_PROCESS, all_issues)
+        if not shards:
+            return all_issues
+        
+        self.logger.info(f"Sharded scan: {len(shards)} subtrees across {processes} processes")
+        
+        worker_config = self._shard_worker_config(processes)
+        log_path = next(
+            (h.baseFilename for h in logging.getLogger().handlers if isinstance(h, logging.FileHandler)),
+            None
+        )
+        
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker_logging,
+            initargs=(log_path,)
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _scan_shard, worker_config, shard, root_path,
+                    f"{report_path}.part{index:04d}.csv"
+                )
+                for index, shard in enumerate(shards)
+            ]
             
+            for future in as_completed(futures):
+                try:
+                    partial_path, scan_count, worker_stats = future.result()
+                except Exception as e:
+                    self.logger.error(f"Shard worker failed: {e}")
+                    continue
+                
+                self._merge_shard(partial_path, scan_count, worker_stats, all_issues)
+        
+        return all_issues
+    
+    def scan_directory_distributed(self, root_path: str, queue_dir: str, local_workers: int = 0,
+                                   lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+                                   expected_workers: Optional[int] = None) -> List[dict]:
+        """
+        Coordinate a scan whose shards are leased to worker hosts through a shared directory.
+        
+        The top two levels are split here as for scan_directory_sharded,
+        then every remaining subtree is queued in queue_dir (see WorkQueue).
+        Workers started with --queue-worker on any host that sees the same
+        scan path lease shards, heartbeat while scanning and publish partial
+        reports, which are merged into this scanner's CSV writer as they
+        arrive. Leases whose heartbeat stops are requeued for other workers.
+        local_workers worker processes are also started on this machine.
+        Rate caps are split across expected_workers, the total number of
+        worker processes on all hosts (default: local_workers).
+        
+        Returns:
+            All issue records, as with scan_directory
+        """
         all_issues = []
+        # Split both levels regardless of size: the number of hosts is not known up front
+        shards = self._split_shards(root_path, sys.maxsize, all_issues)
+        if not shards:
+            return all_issues
         
-        # Track names in this folder for case-collision detection
-        folder_items = {}  # key: lowercase name, value: original name
-        collision_groups = {}  # key: lowercase name, value: list of original names
+        work_queue = WorkQueue(queue_dir)
+        job = {
+            'id': secrets.token_hex(8),
+            'root': root_path,
+            'config': self._shard_worker_config(max(expected_workers or local_workers, 1)),
+            'lease_timeout': lease_timeout,
+        }
+        pending = set(work_queue.create(job, shards))
+        total = len(pending)
+        self.logger.info(f"Distributed scan: {total} subtrees queued in {queue_dir}")
+        
+        log_path = next(
+            (h.baseFilename for h in logging.getLogger().handlers if isinstance(h, logging.FileHandler)),
+            None
+        )
+        hostname = socket.gethostname()
+        processes = [
+            multiprocessing.Process(
+                target=run_queue_worker,
+                args=(queue_dir, f"{hostname}-{index + 1}", log_path),
+                daemon=True
+            )
+            for index in range(local_workers)
+        ]
+        for process in processes:
+            process.start()
         
         try:
-            # First pass: collect all names and detect collisions
-            entries_list = []
-            with os.scandir(current_path) as entries:
-                for entry in entries:
-                    # Skip excluded items
-                    if self.should_exclude(entry.name, entry.is_dir(follow_symlinks=False)):
+            while pending:
+                for task_id in sorted(pending):
+                    result = work_queue.read_result(task_id)
+                    if result is None:
                         continue
-                    
-                    entries_list.append(entry)
-                    name_lower = entry.name.lower()
-                    
-                    if name_lower in folder_items:
-                        # Collision detected!
-                        if name_lower not in collision_groups:
-                            collision_groups[name_lower] = [folder_items[name_lower]]
-                        collision_groups[name_lower].append(entry.name)
-                    else:
-                        folder_items[name_lower] = entry.name
-            
-            # Second pass: process items and add collision issues
-            for entry in entries_list:
-                self.scan_count += 1
+                    pending.discard(task_id)
+                    self._merge_shard(work_queue.result_paths(task_id)[0], result['scan_count'],
+                                      result['stats'], all_issues, tombstone=True)
+                    os.remove(work_queue.result_paths(task_id)[1])
+                    self.logger.info(
+                        f"Shard {task_id} merged from worker {result['worker']} "
+                        f"({total - len(pending)}/{total})"
+                    )
                 
-                # Progress indicator every 1,000 items
-                if self.scan_count % 1000 == 0:
-                    self.logger.info(f"Scanned {self.scan_count:,} items...")
+                for task_id in work_queue.requeue_expired(lease_timeout):
+                    self.logger.warning(f"Lease on shard {task_id} expired; returned to the queue")
                 
-                try:
-                    full_path = entry.path
-                    is_file = entry.is_file(follow_symlinks=False)
-                    is_dir = entry.is_dir(follow_symlinks=False)
-                    
-                    # Check this item (use original_root for depth calculation)
-                    issues = self.check_item(full_path, original_root, is_file)
-                    
-                    # Add case-collision issue if applicable
-                    name_lower = entry.name.lower()
-                    if name_lower in collision_groups:
-                        colliding_names = [n for n in collision_groups[name_lower] if n != entry.name]
-                        if colliding_names:
-                            depth = self.compute_depth(full_path, original_root)
-                            file_size_mb = 0.0
-                            
-                            # Calculate SharePoint URL and path length for collision issue
-                            site_url_count = len(full_path)
-                            if self.spo_base:
-                                try:
-                                    rel_path = os.path.relpath(full_path, self.scan_root)
-                                    rel_path_url = rel_path.replace('\\', '/')
-                                    path_parts = [quote(part) for part in rel_path_url.split('/')]
-                                    rel_path_encoded = '/'.join(path_parts)
-                                    sharepoint_url = self.spo_base + rel_path_encoded
-                                    site_url_count = len(sharepoint_url)
-                                except:
-                                    site_url_count = site_url_count
-                                    sharepoint_url = None
-                            else:
-                                site_url_count = site_url_count
-                                sharepoint_url = None
-                            
-                            if is_file:
-                                try:
-                                    file_size_bytes = retry_with_backoff(os.path.getsize, full_path)
-                                    file_size_mb = file_size_bytes / (1024 * 1024)
-                                except OSError:
-                                    pass
-                            
-                            issues.append({
-                                'ItemType': 'File' if is_file else 'Folder',
-                                'FullPath': full_path,
-                                'IssueType': 'Case-insensitive duplicate',
-                                'CurrentValue': f'{entry.name} (collides with: {", ".join(colliding_names)})',
-                                'SuggestedFix': f'Rename to make unique: {entry.name}_1, {entry.name}_2, etc.',
-                                'CharacterCount': len(entry.name),
-                                'SharePointURL': sharepoint_url or 'N/A',
-                                'SiteURLCount': site_url_count,
-                                'FileSizeMB': f'{file_size_mb:.2f}' if is_file else '',
-                                'FolderDepth': depth
-                            })
-                    
-                    if issues:
-                        all_issues.extend(issues)
-                        self.issue_count += len(issues)
-                        
-                        # Write to CSV immediately if streaming
-                        if self.csv_writer:
-                            for issue in issues:
-                                self.csv_writer.write_issue(issue)
-                    
-                    # Recurse into subdirectories (pass along original_root)
-                    if is_dir:
-                        sub_issues = self.scan_directory(full_path, original_root)
-                        all_issues.extend(sub_issues)
+                if pending:
+                    if processes and not any(process.is_alive() for process in processes):
+                        self.logger.warning("All local workers have exited; waiting for remote workers")
+                        processes = []
+                    time.sleep(QUEUE_POLL_SECONDS)
+        finally:
+            work_queue.mark_complete(job)
+            for process in processes:
+                process.join()
+        
+        return all_issues
+    
+    def generate_inventory(self, current_path: str, original_root: str = None) -> Tuple[List[dict], int, int, float]:
+        """
+        Generate a complete inventory of all files and folders (no issue checking).
+        Returns (inventory_items, file_count, folder_count, total_size_mb)
+        """
+        if original_root is None:
+            original_root = current_path
+        
+        inventory_items = []
+        totals = {'files': 0, 'folders': 0, 'size_mb': 0.0}
+        self._traverse(
+            current_path,
+            lambda path, entries: self._inventory_entries(path, entries, original_root, totals),
+            inventory_items.extend
+        )
+        return inventory_items, totals['files'], totals['folders'], totals['size_mb']
+    
+    def _inventory_entries(self, current_path: str, entries_list: List[os.DirEntry], original_root: str,
+                           totals: Dict[str, float]) -> Tuple[List[dict], List[str]]:
+        """
+        Build inventory rows for every entry of a single directory listing (no recursion).
+        
+        Returns:
+            Tuple of (inventory rows for this folder, subdirectory paths to inventory next)
+        """
+        folder_items = []
+        subdirs = []
+        file_count = 0
+        folder_count = 0
+        total_size_mb = 0.0
+        folder = self._folder_context(current_path, original_root)
+        tree_stats = {} if self.tree_snapshot is not None else None
+        
+        self._count_scanned(len(entries_list), "Inventoried")
+        
+        for entry in entries_list:
+            try:
+                full_path = entry.path
+                is_file = entry.is_file(follow_symlinks=False)
+                is_dir = entry.is_dir(follow_symlinks=False)
                 
-                except PermissionError:
-                    self.logger.warning(f"Permission denied: {entry.path}")
+                if is_dir:
+                    subdirs.append(full_path)
+                    self._carry_context(folder, full_path, entry.name)
+                
+                # One stat per item covers both size and mtime
+                try:
+                    stat_result = self._stat_entry(entry)
                 except OSError as e:
-                    self.logger.warning(f"OS error scanning {entry.path}: {e}")
+                    complete = functools.partial(
+                        self._complete_inventory_row, totals, full_path, entry.name, is_file, original_root,
+                        folder=folder
+                    )
+                    if self._defer_stat(full_path, e, complete):
+                        continue
+                    if is_file:
+                        self.logger.warning(f"Could not get info for {full_path}: {e}")
+                    stat_result = None
+                if tree_stats is not None:
+                    tree_stats[entry.name] = stat_result
+                
+                folder_items.append(
+                    self._inventory_row(full_path, entry.name, is_file, stat_result, original_root, folder)
+                )
+                
+                if not is_file:
+                    folder_count += 1
+                elif stat_result:
+                    file_count += 1
+                    total_size_mb += stat_result.st_size / (1024 * 1024)
+            
+            except PermissionError:
+                self.logger.warning(f"Permission denied: {entry.path}")
+            except OSError as e:
+                self.logger.warning(f"OS error scanning {entry.path}: {e}")
         
-        except PermissionError:
-            self.logger.error(f"Permission denied accessing directory: {current_path}")
-        except OSError as e:
-            self.logger.error(f"OS error accessing {current_path}: {e}")
+        with self._count_lock:
+            totals['files'] += file_count
+            totals['folders'] += folder_count
+            totals['size_mb'] += total_size_mb
+        
+        if tree_stats is not None:
+            self._record_tree_stats(entries_list, tree_stats)
+        return folder_items, subdirs
+    
+    def _inventory_row(self, full_path: str, name: str, is_file: bool, stat_result: Optional[os.stat_result],
+                       original_root: str, folder: Optional[FolderContext] = None) -> dict:
+        """Build the inventory record for one item."""
+        if folder is None:
+            folder = self._folder_context(os.path.dirname(full_path), original_root)
+        
+        # Get file extension
+        _, ext = os.path.splitext(name)
+        
+        # Get file size and modified date
+        file_size_mb = 0.0
+        modified_date = ''
+        if stat_result:
+            if is_file:
+                file_size_mb = stat_result.st_size / (1024 * 1024)
+            modified_date = datetime.fromtimestamp(stat_result.st_mtime).strftime(INVENTORY_DATE_FORMAT)
+        
+        # Calculate SharePoint URL if configured
+        sharepoint_url = folder.base + folder.prefix + quote_path_component(name) if folder.base else None
+        
+        return {
+            'ItemType': 'File' if is_file else 'Folder',
+            'FileName': name,
+            'Extension': ext.lower() if ext else '',
+            'FullPath': full_path,
+            'ParentPath': os.path.dirname(full_path),
+            'FileSizeMB': f'{file_size_mb:.2f}' if is_file else '',
+            'FolderDepth': folder.depth,
+            'SharePointURL': sharepoint_url or 'N/A',
+            'SiteURLCount': len(sharepoint_url) if sharepoint_url else len(full_path),
+            'CharacterCountPath': len(full_path),
+            'ModifiedDate': modified_date
+        }
+    
+    def _complete_inventory_row(self, totals: Dict[str, float], full_path: str, name: str, is_file: bool,
+                                original_root: str, stat_result: Optional[os.stat_result],
+                                folder: Optional[FolderContext] = None) -> List[dict]:
+        """Finish an inventory row whose stat was deferred to the retry pass."""
+        with self._count_lock:
+            if not is_file:
+                totals['folders'] += 1
+            elif stat_result:
+                totals['files'] += 1
+                totals['size_mb'] += stat_result.st_size / (1024 * 1024)
+        return [self._inventory_row(full_path, name, is_file, stat_result, original_root, folder)]
+
+
+def _init_worker_logging(log_path: Optional[str]):
+    """Configure logging in a worker process that did not inherit handlers (spawn start method)."""
+    if not logging.getLogger().handlers:
+        setup_logging(log_path)
+
+
+def _scan_shard(config: dict, shard_path: str, original_root: str,
+                partial_path: str) -> Tuple[str, int, dict]:
+    """
+    Scan one subtree in a worker process, writing its issues to partial_path.
+    
+    Returns:
+        Tuple of (partial_path, number of items scanned, worker stats)
+    """
+    scanner = PreflightScanner(**config)
+    
+    with StreamedCSVWriter(partial_path, REPORT_FIELDNAMES) as csv_writer:
+        scanner.csv_writer = csv_writer
+        scanner._traverse(
+            shard_path,
+            lambda path, entries: scanner._scan_entries(path, entries, original_root),
+            csv_writer.write_issues
+        )
+        
+        unreachable = scanner._unreachable_issues(original_root)
+        if unreachable:
+            csv_writer.write_issues(unreachable)
+    
+    stats = {
+        'throttle': scanner.throttle.waited if scanner.throttle else {},
+        'retries': scanner.retry_queue.summary(),
+    }
+    return partial_path, scanner.scan_count, stats
+
+
+def run_queue_worker(queue_dir: str, worker_id: str, log_path: Optional[str] = None) -> int:
+    """
+    Lease and scan shards from a distributed scan's queue until the coordinator finishes.
+    
+    Waits for a job to be published, then repeatedly leases a pending shard,
+    scans it with the coordinator's settings while a background thread
+    renews the lease, and publishes the partial report (see WorkQueue).
+    
+    Returns:
+        Number of shards scanned by this worker
+    """
+    _init_worker_logging(log_path)
+    logger = logging.getLogger(__name__)
+    work_queue = WorkQueue(queue_dir)
+    
+    job = None
+    while job is None:
+        job = work_queue.load_job() if os.path.isdir(work_queue.pending_dir) else None
+        if job is None:
+            time.sleep(QUEUE_POLL_SECONDS)
+    logger.info(f"Worker {worker_id}: joined scan of {job['root']}")
+    
+    heartbeat_interval = job['lease_timeout'] / 4
+    scanned = 0
+    while not work_queue.is_complete(job):
+        task = work_queue.claim()
+        if task is None:
+            time.sleep(QUEUE_POLL_SECONDS)
+            continue
         
-        return all_issues
-
-    def generate_inventory(self, current_path: str, original_root: str = None) -> Tuple[List[dict], int, int, float]:
-        """
-        Generate a complete inventory of all files and folders (no issue checking).
-        Returns (inventory_items, file_count, folder_count, total_size_mb)
-        """
-        if original_root is None:
-            original_root = current_path
+        logger.info(f"Worker {worker_id}: scanning shard {task['id']} ({task['path']})")
+        stop = threading.Event()
         
-        inventory_items = []
-        file_count = 0
-        folder_count = 0
-        total_size_mb = 0.0
+        def renew_lease():
+            while not stop.wait(heartbeat_interval):
+                if not work_queue.heartbeat(task):
+                    logger.warning(f"Worker {worker_id}: lease on shard {task['id']} was reassigned")
+                    return
         
+        heartbeat = threading.Thread(target=renew_lease, daemon=True)
+        heartbeat.start()
         try:
-            with os.scandir(current_path) as entries:
-                for entry in entries:
-                    # Skip excluded items
-                    if self.should_exclude(entry.name, entry.is_dir(follow_symlinks=False)):
-                        continue
-                    
-                    self.scan_count += 1
-                    
-                    # Progress indicator every 1,000 items
-                    if self.scan_count % 1000 == 0:
-                        self.logger.info(f"Inventoried {self.scan_count:,} items...")
-                    
-                    try:
-                        full_path = entry.path
-                        is_file = entry.is_file(follow_symlinks=False)
-                        is_dir = entry.is_dir(follow_symlinks=False)
-                        item_type = 'File' if is_file else 'Folder'
-                        
-                        # Get file extension
-                        _, ext = os.path.splitext(entry.name)
-                        
-                        # Get parent path
-                        parent_path = os.path.dirname(full_path)
-                        
-                        # Calculate depth
-                        depth = self.compute_depth(full_path, original_root)
-                        
-                        # Get file size and modified date
-                        file_size_mb = 0.0
-                        modified_date = ''
-                        
-                        if is_file:
-                            try:
-                                file_size_bytes = retry_with_backoff(os.path.getsize, full_path)
-                                file_size_mb = file_size_bytes / (1024 * 1024)
-                                total_size_mb += file_size_mb
-                                file_count += 1
-                                
-                                # Get modified timestamp
-                                mtime = os.path.getmtime(full_path)
-                                modified_date = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
-                            except OSError as e:
-                                self.logger.warning(f"Could not get info for {full_path}: {e}")
-                        else:
-                            folder_count += 1
-                            try:
-                                mtime = os.path.getmtime(full_path)
-                                modified_date = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
-                            except OSError:
-                                pass
-                        
-                        # Calculate SharePoint URL if configured
-                        character_count_path = len(full_path)
-                        site_url_count = len(full_path)
-                        sharepoint_url = 'N/A'
-                        
-                        if self.spo_base:
-                            try:
-                                rel_path = os.path.relpath(full_path, self.scan_root)
-                                rel_path_url = rel_path.replace('\\', '/')
-                                path_parts = [quote(part) for part in rel_path_url.split('/')]
-                                rel_path_encoded = '/'.join(path_parts)
-                                sharepoint_url = self.spo_base + rel_path_encoded
-                                site_url_count = len(sharepoint_url)
-                            except Exception as e:
-                                self.logger.warning(f"Could not compute SharePoint URL for {full_path}: {e}")
-                        
-                        # Build inventory record
-                        inventory_items.append({
-                            'ItemType': item_type,
-                            'FileName': entry.name,
-                            'Extension': ext.lower() if ext else '',
-                            'FullPath': full_path,
-                            'ParentPath': parent_path,
-                            'FileSizeMB': f'{file_size_mb:.2f}' if is_file else '',
-                            'FolderDepth': depth,
-                            'SharePointURL': sharepoint_url,
-                            'SiteURLCount': site_url_count,
-                            'CharacterCountPath': character_count_path,
-                            'ModifiedDate': modified_date
-                        })
-                        
-                        # Recurse into subdirectories
-                        if is_dir:
-                            sub_inventory, sub_files, sub_folders, sub_size = self.generate_inventory(full_path, original_root)
-                            inventory_items.extend(sub_inventory)
-                            file_count += sub_files
-                            folder_count += sub_folders
-                            total_size_mb += sub_size
-                    
-                    except PermissionError:
-                        self.logger.warning(f"Permission denied: {entry.path}")
-                    except OSError as e:
-                        self.logger.warning(f"OS error scanning {entry.path}: {e}")
+            partial_path, scan_count, worker_stats = _scan_shard(
+                job['config'], task['path'], job['root'],
+                os.path.join(work_queue.results_dir, f"{task['id']}.{worker_id}.part")
+            )
+        finally:
+            stop.set()
+            heartbeat.join()
         
-        except PermissionError:
-            self.logger.error(f"Permission denied accessing directory: {current_path}")
-        except OSError as e:
-            self.logger.error(f"OS error accessing {current_path}: {e}")
-        
-        return inventory_items, file_count, folder_count, total_size_mb
+        work_queue.finish(task, partial_path, {
+            'worker': worker_id,
+            'scan_count': scan_count,
+            'stats': worker_stats,
+        })
+        scanned += 1
+    
+    logger.info(f"Worker {worker_id}: scan complete, {scanned} shards scanned")
+    return scanned
+
+
+def read_report_csv(report_path: str) -> List[dict]:
+    """
+    Read issue records back from a report CSV written by this tool.
+    
+    Numeric columns are converted back to int so the records match those
+    produced by a live scan.
+    """
+    issues = []
+    with open(report_path, 'r', newline='', encoding='utf-8-sig') as csvfile:
+        for row in csv.DictReader(csvfile):
+            for field in REPORT_INT_FIELDS:
+                if row.get(field):
+                    row[field] = int(row[field])
+            issues.append(row)
+    return issues
 
 
 def write_inventory_csv(inventory_items: List[dict], output_path: str, logger: logging.Logger, 
@@ -1019,6 +4039,128 @@ def write_inventory_csv(inventory_items: List[dict], output_path: str, logger: l
         sys.exit(3)
 
 
+def build_summary(scanner: 'PreflightScanner', args: argparse.Namespace, issues: List[dict],
+                  start_time: datetime, duration: timedelta, recheck_counts: Optional[dict] = None) -> dict:
+    """
+    Build the --summary-json document for a finished issue scan.
+    """
+    metrics = [issue_metrics(issue) for issue in issues]
+    
+    # Count by issue type
+    issue_counts = {}
+    for issue_type, _, _, _, _ in metrics:
+        issue_counts[issue_type] = issue_counts.get(issue_type, 0) + 1
+    
+    # Top 50 longest paths, deepest folders and largest files
+    # (nlargest keeps the order of ties, like a stable sort)
+    longest_paths = [
+        {'path': path, 'length': length}
+        for _, path, length, _, _ in heapq.nlargest(50, metrics, key=lambda m: m[2])
+    ]
+    deepest = [
+        {'path': path, 'depth': depth}
+        for _, path, _, depth, _ in heapq.nlargest(50, (m for m in metrics if m[3]), key=lambda m: m[3])
+    ]
+    largest = [
+        {'path': path, 'size_mb': size_mb}
+        for _, path, _, _, size_mb in heapq.nlargest(
+            50, (m for m in metrics if m[4] is not None), key=lambda m: m[4]
+        )
+    ]
+    
+    summary = {
+        'scan_timestamp': start_time.isoformat(),
+        'scan_path': args.scan_path,
+        'sharepoint_url': args.spo_url,
+        'document_library': args.spo_library,
+        'is_onedrive': args.onedrive,
+        'total_items_scanned': scanner.scan_count,
+        'total_issues': scanner.issue_count,
+        **scanner.retry_queue.summary(),
+        'reused_directories': scanner.reused_dirs,
+        'resumed_directories': scanner.resumed_dirs,
+        'rules': [rule.name for rule in scanner.rules],
+        'issues_by_type': issue_counts,
+        'top_50_longest_paths': longest_paths,
+        'top_50_deepest_folders': deepest,
+        'top_50_largest_files': largest,
+        'scan_duration_seconds': duration.total_seconds()
+    }
+    
+    if recheck_counts:
+        summary['recheck'] = {'previous_report': args.recheck_from, **recheck_counts}
+    
+    if scanner.destinations:
+        summary['destinations'] = [destination.summary() for destination in scanner.destinations]
+    
+    if scanner.throttle:
+        summary['throttle'] = scanner.throttle.summary()
+    
+    if scanner.pipeline_stats:
+        summary['pipeline_stats'] = {
+            name: counter.as_dict() for name, counter in scanner.pipeline_stats.items()
+        }
+    
+    return summary
+
+
+def run_watch(scanner: 'PreflightScanner', args: argparse.Namespace, logger: logging.Logger, anonymize_fn=None):
+    """
+    --watch: scan once, then re-check changed folders every watch_interval seconds.
+    
+    Each pass stats every folder and re-lists only those whose mtime
+    changed, so steady-state cost follows churn rather than tree size.
+    The report and summary are replaced after any pass that found changes,
+    and issues are compared with the first pass (the baseline). Runs
+    until interrupted (Ctrl+C or the GUI stop button).
+    """
+    baseline_keys = None
+    watch_started = datetime.now()
+    pass_number = 0
+    
+    try:
+        while True:
+            pass_number += 1
+            start_time = datetime.now()
+            issues = scanner.rescan(args.scan_path)
+            duration = datetime.now() - start_time
+            
+            keys = {(issue['FullPath'], issue['IssueType']) for issue in issues}
+            if baseline_keys is None:
+                baseline_keys = keys
+            
+            watch_stats = {
+                'started': watch_started.isoformat(),
+                'passes': pass_number,
+                'changed_directories': scanner.changed_dirs,
+                'baseline_issues': len(baseline_keys),
+                'new_since_baseline': len(keys - baseline_keys),
+                'resolved_since_baseline': len(baseline_keys - keys),
+            }
+            logger.info(
+                f"Watch pass {pass_number}: {scanner.changed_dirs:,} changed folders, {len(issues):,} issues "
+                f"({watch_stats['new_since_baseline']:,} new / {watch_stats['resolved_since_baseline']:,} resolved "
+                f"since baseline) in {duration}"
+            )
+            
+            if pass_number == 1 or scanner.changed_dirs:
+                # Write to temp files and rename, so readers never see a partial report
+                with StreamedCSVWriter(f"{args.report}.tmp", REPORT_FIELDNAMES, anonymize_fn) as csv_writer:
+                    csv_writer.write_issues(issues)
+                os.replace(f"{args.report}.tmp", args.report)
+                
+                if args.summary_json:
+                    summary = build_summary(scanner, args, issues, start_time, duration)
+                    summary['watch'] = watch_stats
+                    with open(f"{args.summary_json}.tmp", 'w', encoding='utf-8') as f:
+                        json.dump(summary, f, indent=2)
+                    os.replace(f"{args.summary_json}.tmp", args.summary_json)
+            
+            time.sleep(max(0.0, args.watch_interval - duration.total_seconds()))
+    except KeyboardInterrupt:
+        logger.info(f"Watch stopped after {pass_number} passes; report: {args.report}")
+
+
 def write_csv_report(issues: List[dict], output_path: str, logger: logging.Logger):
     """
     Write issue records to CSV with stable column order.
@@ -1049,7 +4191,7 @@ def write_csv_report(issues: List[dict], output_path: str, logger: logging.Logge
         with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
-            writer.writerows(issues)
+            writer.writerows(report_row(issue) for issue in issues)
         
         logger.info(f"Report written to: {output_path}")
         logger.info(f"Total issues recorded: {len(issues):,}")
@@ -1093,6 +4235,120 @@ def setup_logging(log_path: Optional[str] = None) -> logging.Logger:
     return logger
 
 
+def route_key(path: str) -> str:
+    """Normalized absolute form of a path, so route sources and scanned folders compare equal however they were given."""
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
+
+
+def load_routes(routes_path: str, scan_path: str) -> List[dict]:
+    """
+    Read a per-subtree routing table from a JSON file.
+    
+    The file holds a list of objects with "source" (a folder under the
+    scan path), "spo_url" and optionally "spo_library" (default
+    "Shared Documents"). Items below a source migrate to that library,
+    with URLs relative to the source folder; nested sources override
+    their parents.
+    
+    Raises:
+        ValueError: if the file is not a list of valid routes
+    """
+    with open(routes_path, 'r', encoding='utf-8') as f:
+        routes = json.load(f)
+    
+    if not isinstance(routes, list) or not routes:
+        raise ValueError("expected a non-empty JSON list of routes")
+    
+    scan_root = route_key(scan_path)
+    for route in routes:
+        if not isinstance(route, dict) or not route.get('source') or not route.get('spo_url'):
+            raise ValueError(f"each route needs a source and spo_url: {route}")
+        source = route_key(route['source'])
+        if os.path.commonpath([scan_root, source]) != scan_root:
+            raise ValueError(f"route source is not under the scan path: {route['source']}")
+        route.setdefault('spo_library', 'Shared Documents')
+    return routes
+
+
+def load_custom_rules(rules_path: str) -> List[dict]:
+    """
+    Read custom rule definitions from a JSON file (see build_custom_rule).
+    
+    Raises:
+        ValueError: if the file is not a list of valid rules, or a name is used twice
+    """
+    with open(rules_path, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("expected a non-empty JSON list of rules")
+    
+    names = {rule.name for rule in BUILTIN_RULES}
+    for spec in specs:
+        rule = build_custom_rule(spec)
+        if rule.name in names:
+            raise ValueError(f"duplicate rule name: {rule.name}")
+        names.add(rule.name)
+    return specs
+
+
+def load_destinations(destinations_path: str, report_path: str,
+                      allow_hash_percent: bool) -> List[dict]:
+    """
+    Read candidate destinations for a multi-destination scan from a JSON file.
+    
+    The file holds a list of objects with "name" and "spo_url", and
+    optionally "spo_library" (default "Shared Documents"),
+    "allow_hash_percent" (default: the command-line setting) and "report"
+    (default: the --report name with _<name> appended).
+    
+    Raises:
+        ValueError: if the file is not a list of valid destinations
+    """
+    with open(destinations_path, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("expected a non-empty JSON list of destinations")
+    
+    report_stem, report_ext = os.path.splitext(report_path)
+    names = set()
+    for spec in specs:
+        if not isinstance(spec, dict) or not spec.get('name') or not spec.get('spo_url'):
+            raise ValueError(f"each destination needs a name and spo_url: {spec}")
+        if spec['name'] in names:
+            raise ValueError(f"duplicate destination name: {spec['name']}")
+        names.add(spec['name'])
+        
+        spec.setdefault('spo_library', 'Shared Documents')
+        spec.setdefault('allow_hash_percent', allow_hash_percent)
+        safe_name = re.sub(r'[^\w.-]+', '_', spec['name'])
+        spec.setdefault('report', f"{report_stem}_{safe_name}{report_ext or '.csv'}")
+    return specs
+
+
+def parse_workers(value: str) -> Union[int, str]:
+    """argparse type for --workers: a positive integer or 'auto'."""
+    if value.strip().lower() == WORKERS_AUTO:
+        return WORKERS_AUTO
+    try:
+        workers = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or '{WORKERS_AUTO}', got {value!r}")
+    if workers < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return workers
+
+
+def parse_schedule_window(value: str) -> str:
+    """argparse type for --schedule-window: validates HH:MM-HH:MM."""
+    try:
+        ScanWindow(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
 def parse_args():
     """
     Parse command-line arguments.
@@ -1222,6 +4478,24 @@ Examples:
         help='Block # %% & characters (most tenants now support these)'
     )
     
+    parser.add_argument(
+        '--skip-rules',
+        nargs='+',
+        default=[],
+        metavar='RULE',
+        help=f'Rules to turn off ({", ".join(rule.name for rule in BUILTIN_RULES)} or a custom rule name). '
+             f'Files are only stat\'ed when an enabled rule needs their size or modified time, so '
+             f'--skip-rules file-size gives a names-only preflight'
+    )
+    
+    parser.add_argument(
+        '--custom-rules',
+        metavar='JSON_FILE',
+        help='Extra rules: a JSON list of {"name", "issue_type", "applies_to" (file/folder/any), "name_pattern", '
+             '"min_size_mb", "max_size_mb", "older_than_days", "newer_than_days", "suggested_fix"}; '
+             'an item is reported when all given conditions hold'
+    )
+    
     parser.add_argument(
         '--exclude-dirs',
         nargs='*',
@@ -1238,9 +4512,209 @@ Examples:
     
     parser.add_argument(
         '--workers',
+        type=parse_workers,
+        default=1,
+        help='Number of worker threads for parallel scanning, or "auto" to adapt to the share while scanning '
+             '(default: 1, recommended: 8 or auto for UNC)'
+    )
+    
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default='thread',
+        help='Traversal engine: "thread" (default; uses --workers), "async" (many listings in flight, for high-latency WAN shares) '
+             'or "pipeline" (separate enumerate/check/write stages with bounded queues; uses --workers per stage)'
+    )
+    
+    parser.add_argument(
+        '--max-inflight',
+        type=int,
+        default=DEFAULT_MAX_INFLIGHT,
+        help=f'Maximum concurrent directory listings for --engine async (default: {DEFAULT_MAX_INFLIGHT})'
+    )
+    
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f'Bounded queue length between stages for --engine pipeline (default: {DEFAULT_QUEUE_SIZE})'
+    )
+    
+    parser.add_argument(
+        '--batch-check',
+        action='store_true',
+        help=f'Pre-check folders of {BATCH_MIN_ENTRIES}+ items as NumPy arrays and only run the per-item '
+             f'checks on the items that fail (requires numpy; not used with --custom-rules)'
+    )
+    
+    parser.add_argument(
+        '--max-listings-per-sec',
+        type=float,
+        help='Politeness cap on directory listings per second (token bucket; default: unlimited)'
+    )
+    
+    parser.add_argument(
+        '--max-stats-per-sec',
+        type=float,
+        help='Politeness cap on file stat calls per second (token bucket; default: unlimited)'
+    )
+    
+    parser.add_argument(
+        '--schedule-window',
+        type=parse_schedule_window,
+        help='Only touch the file server inside this daily window, e.g. "19:00-07:00"; the scan pauses outside it'
+    )
+    
+    parser.add_argument(
+        '--listing-timeout',
+        type=float,
+        help='Give up on a directory listing after this many seconds, report the folder as Unreachable '
+             'and skip its subtree (for offline SMB/DFS targets; default: wait indefinitely)'
+    )
+    
+    parser.add_argument(
+        '--snapshot',
+        help='Incremental rescans: load this snapshot from the previous run, skip folders whose modified time '
+             'is unchanged (reusing their issues) and save an updated snapshot. Note: size changes to existing '
+             'files do not change the folder time; run --full-rescan periodically'
+    )
+    
+    parser.add_argument(
+        '--full-rescan',
+        action='store_true',
+        help='With --snapshot: ignore the previous snapshot, scan everything and write a fresh one'
+    )
+    
+    parser.add_argument(
+        '--from-inventory',
+        metavar='INVENTORY_CSV',
+        help='Offline check: run all checks against an inventory CSV from --inventory-only instead of the file '
+             'server. scan_path must be the folder the inventory was taken from (it need not be reachable)'
+    )
+    
+    parser.add_argument(
+        '--tree-snapshot',
+        metavar='FILE',
+        help='Also write a compact binary snapshot of the scanned tree (interned names, parent pointers, '
+             'sizes and modified times; memory-mappable). Every item is stat\'ed for it, even with --skip-rules. '
+             'Can be used with --from-inventory'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running: after the first scan, re-check folders whose modified time changed every '
+             '--watch-interval seconds, rewriting --report/--summary-json and counting new issues since the '
+             'first scan. Stop with Ctrl+C'
+    )
+    
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=DEFAULT_WATCH_INTERVAL,
+        help=f'Seconds between --watch passes (default: {DEFAULT_WATCH_INTERVAL})'
+    )
+    
+    parser.add_argument(
+        '--route-map',
+        metavar='JSON_FILE',
+        help='Per-subtree destinations: a JSON list of {"source", "spo_url", "spo_library"}. Items under each '
+             'source folder get URLs in that library; everything else uses --spo-url/--spo-library'
+    )
+    
+    parser.add_argument(
+        '--destinations',
+        metavar='JSON_FILE',
+        help='Check several candidate destinations in one pass: a JSON list of {"name", "spo_url", '
+             '"spo_library", "allow_hash_percent", "report"}. Writes one report per destination plus a combined '
+             '--report with a Destination column'
+    )
+    
+    parser.add_argument(
+        '--what-if',
+        nargs='+',
+        action='append',
+        metavar='SPO_URL [LIBRARY]',
+        help='With --from-inventory: compare path-too-long counts for a candidate destination without '
+             'rescanning (library defaults to --spo-library or "Shared Documents"). Repeat for each candidate; '
+             'results are written to --report'
+    )
+    
+    parser.add_argument(
+        '--recheck-from',
+        metavar='REPORT_CSV',
+        help='Targeted recheck: re-check every item in the folders that held issues in a previous report '
+             '(and the whole subtree of folders it reported Unreachable) and write a report with RecheckStatus '
+             'Still open / Resolved / New. Other folders, including the contents of renamed folders, are not '
+             'visited. Does not work with anonymized reports'
+    )
+    
+    parser.add_argument(
+        '--checkpoint',
+        action='store_true',
+        help='Checkpoint scan progress to <report>.checkpoint (removed when the scan completes) so an '
+             'interrupted scan can be continued with --resume'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=float,
+        help=f'Seconds between checkpoints; implies --checkpoint (default: {DEFAULT_CHECKPOINT_INTERVAL})'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue an interrupted --checkpoint scan from <report>.checkpoint, appending to the existing '
+             '--report and checkpointing as it goes (same scan path and settings required)'
+    )
+    
+    parser.add_argument(
+        '--processes',
         type=int,
         default=1,
-        help='Number of worker threads for parallel scanning (default: 1, recommended: 8 for UNC)'
+        help='Number of worker processes; splits the tree into subtree shards and merges their reports (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--queue-dir',
+        metavar='DIR',
+        help='Shared directory for a distributed scan: with scan_path, coordinate the scan and merge the '
+             'shards leased by workers; with --queue-worker, work on the scan published there'
+    )
+    
+    parser.add_argument(
+        '--queue-worker',
+        action='store_true',
+        help='Run as a distributed scan worker against --queue-dir (scan_path and other settings come from '
+             'the coordinator; the scan path must resolve to the same tree on this host)'
+    )
+    
+    parser.add_argument(
+        '--worker-id',
+        help='Name of this worker in the coordinator log (default: <hostname>-<pid>)'
+    )
+    
+    parser.add_argument(
+        '--local-workers',
+        type=int,
+        default=0,
+        help='Worker processes the coordinator also starts on this machine (default: 0)'
+    )
+    
+    parser.add_argument(
+        '--queue-workers',
+        type=int,
+        metavar='N',
+        help='Total worker processes expected on all hosts for --queue-dir (default: --local-workers); '
+             '--max-listings-per-sec and --max-stats-per-sec are split across them, so start no more than N'
+    )
+    
+    parser.add_argument(
+        '--lease-timeout',
+        type=float,
+        default=DEFAULT_LEASE_TIMEOUT,
+        help=f'Seconds without a worker heartbeat before its shard is reassigned (default: {DEFAULT_LEASE_TIMEOUT})'
     )
     
     parser.add_argument(
@@ -1287,6 +4761,15 @@ def main():
     """
     args = parse_args()
     
+    # Distributed scan worker: everything else comes from the coordinator's job
+    if args.queue_worker:
+        if not args.queue_dir:
+            print("ERROR: --queue-worker requires --queue-dir")
+            sys.exit(1)
+        setup_logging(args.log)
+        run_queue_worker(args.queue_dir, args.worker_id or f"{socket.gethostname()}-{os.getpid()}")
+        return
+    
     # Handle interactive mode
     if args.interactive:
         scan_path, spo_url, spo_library, is_onedrive = interactive_setup()
@@ -1357,18 +4840,163 @@ def main():
     
     logger.info(f"Exclude directories: {len(args.exclude_dirs)} patterns")
     logger.info(f"Exclude extensions: {len(args.exclude_exts)} patterns")
-    if args.workers > 1:
+    if args.engine == 'async':
+        logger.info(f"Engine: async ({args.max_inflight} listings in flight)")
+    elif args.engine == 'pipeline':
+        logger.info(f"Engine: pipeline ({args.workers} threads per stage, queue size {args.queue_size})")
+    elif args.workers == WORKERS_AUTO:
+        logger.info(f"Worker threads: auto (adaptive, 1-{AUTO_WORKERS_MAX})")
+    elif args.workers > 1:
         logger.info(f"Worker threads: {args.workers}")
+    # Checkpoints are opt-in; a resumed scan keeps checkpointing
+    if args.checkpoint_interval is None:
+        args.checkpoint_interval = DEFAULT_CHECKPOINT_INTERVAL if args.checkpoint or args.resume else 0
+    if args.queue_dir:
+        if (args.inventory_only or args.from_inventory or args.recheck_from or args.what_if or args.watch
+                or args.destinations):
+            logger.error("--queue-dir cannot be combined with --inventory-only, --from-inventory, --recheck-from, "
+                         "--what-if, --watch or --destinations")
+            sys.exit(1)
+        if args.resume:
+            logger.error("--resume is not supported with --queue-dir")
+            sys.exit(2)
+        logger.info(f"Distributed scan: queue {args.queue_dir}, {args.local_workers} local workers, "
+                    f"lease timeout {args.lease_timeout:g}s")
+        if args.queue_workers is not None and args.queue_workers < max(args.local_workers, 1):
+            logger.error("--queue-workers must be at least --local-workers (and at least 1)")
+            sys.exit(1)
+        if args.max_listings_per_sec or args.max_stats_per_sec:
+            expected_workers = args.queue_workers or max(args.local_workers, 1)
+            logger.info(f"Rate caps split across {expected_workers} worker process(es) on all hosts")
+            if args.queue_workers is None:
+                logger.warning("Each --queue-worker on another host adds its own share of the rate caps; "
+                               "pass --queue-workers with the total number of workers")
+        if args.processes > 1 or args.snapshot or args.tree_snapshot:
+            logger.warning("--processes, --snapshot and --tree-snapshot are ignored with --queue-dir")
+        # Shards are scanned by the workers, so these behave as they do for --processes
+        args.processes = 1
+        args.snapshot = None
+        args.tree_snapshot = None
+        args.checkpoint_interval = 0
+    elif args.processes > 1 and not args.inventory_only:
+        logger.info(f"Worker processes: {args.processes}")
+    if args.max_listings_per_sec:
+        logger.info(f"Listing rate cap: {args.max_listings_per_sec:g}/s")
+    if args.max_stats_per_sec:
+        logger.info(f"Stat rate cap: {args.max_stats_per_sec:g}/s")
+    if args.schedule_window:
+        logger.info(f"Scan window: {args.schedule_window}")
+    if args.listing_timeout:
+        logger.info(f"Directory listing timeout: {args.listing_timeout:g}s")
+    if args.snapshot and not args.inventory_only:
+        if args.processes > 1:
+            logger.warning("--snapshot is not supported with --processes; running without it")
+            args.snapshot = None
+        else:
+            logger.info(f"Snapshot: {args.snapshot}{' (full rescan)' if args.full_rescan else ''}")
+    if args.from_inventory and not args.inventory_only:
+        logger.info(f"Mode: OFFLINE CHECK of inventory {args.from_inventory}")
+    elif args.recheck_from and not args.inventory_only:
+        logger.info(f"Mode: RECHECK of {args.recheck_from}")
+    if (args.from_inventory or args.recheck_from) and not args.inventory_only:
+        if args.processes > 1 or args.snapshot or args.tree_snapshot:
+            logger.warning("--processes, --snapshot and --tree-snapshot are ignored when rechecking")
+        args.processes = 1
+        args.snapshot = None
+        args.tree_snapshot = None
+        args.checkpoint_interval = 0
+    if args.checkpoint_interval > 0 and args.processes > 1 and not args.inventory_only:
+        logger.warning("Checkpoints are not supported with --processes; --resume will not be available")
+        args.checkpoint_interval = 0
+    if args.resume and args.checkpoint_interval <= 0:
+        logger.error("--resume requires checkpoints (--checkpoint-interval > 0, no --processes)")
+        sys.exit(2)
+    if args.tree_snapshot:
+        # Only folders that are actually listed can be recorded
+        if (args.processes > 1 and not args.inventory_only) or (args.resume and not args.inventory_only):
+            logger.warning("--tree-snapshot is not supported with --processes or --resume; not writing it")
+            args.tree_snapshot = None
+        else:
+            if args.snapshot and not args.full_rescan and not args.inventory_only:
+                logger.info("--tree-snapshot needs every folder listed; previous --snapshot is not reused")
+                args.full_rescan = True
+            logger.info(f"Tree snapshot: {args.tree_snapshot}")
+    custom_rules = None
+    if args.custom_rules and not args.inventory_only:
+        try:
+            custom_rules = load_custom_rules(args.custom_rules)
+        except (OSError, ValueError) as e:
+            logger.error(f"Invalid --custom-rules file {args.custom_rules}: {e}")
+            sys.exit(1)
+    if not args.inventory_only:
+        rule_names = [rule.name for rule in BUILTIN_RULES] + [spec['name'] for spec in custom_rules or ()]
+        unknown = [name for name in args.skip_rules if name not in rule_names]
+        if unknown:
+            logger.error(f"Unknown rule(s) in --skip-rules: {', '.join(unknown)}")
+            sys.exit(1)
+        logger.info(f"Rules: {', '.join(name for name in rule_names if name not in args.skip_rules)}")
+    
+    routes = None
+    if args.route_map and not args.inventory_only:
+        try:
+            routes = load_routes(args.route_map, args.scan_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Invalid --route-map file {args.route_map}: {e}")
+            sys.exit(1)
+        for route in routes:
+            logger.info(f"Route: {route['source']} -> {build_spo_base(route['spo_url'], route['spo_library'])}")
+        if args.destinations:
+            logger.warning("--route-map applies to the main scan only; --destinations checks use their own URL")
+    
+    if args.watch:
+        if args.inventory_only or args.from_inventory or args.recheck_from or args.what_if or args.destinations:
+            logger.error("--watch cannot be combined with --inventory-only, --from-inventory, --recheck-from, "
+                         "--what-if or --destinations")
+            sys.exit(1)
+        if args.resume:
+            logger.error("--resume is not supported in watch mode")
+            sys.exit(2)
+        logger.info(f"Watch mode: re-checking changed folders every {args.watch_interval:g}s")
+        if args.processes > 1 or args.tree_snapshot:
+            logger.warning("--processes and --tree-snapshot are ignored in watch mode")
+        args.processes = 1
+        args.tree_snapshot = None
+        args.checkpoint_interval = 0
+    
+    destinations = None
+    if args.destinations and not (args.inventory_only or args.recheck_from or args.what_if):
+        try:
+            destinations = load_destinations(args.destinations, args.report, args.allow_hash_percent)
+        except (OSError, ValueError) as e:
+            logger.error(f"Invalid --destinations file {args.destinations}: {e}")
+            sys.exit(1)
+        for spec in destinations:
+            logger.info(
+                f"Destination '{spec['name']}': {build_spo_base(spec['spo_url'], spec['spo_library'])} "
+                f"(allow # % &: {spec['allow_hash_percent']}) -> {spec['report']}"
+            )
+        if args.processes > 1 or args.checkpoint_interval > 0:
+            logger.info("Multi-destination scans run in one process without checkpoints")
+            if args.resume:
+                logger.error("--resume is not supported with --destinations")
+                sys.exit(2)
+            args.processes = 1
+            args.checkpoint_interval = 0
+    elif args.destinations:
+        logger.warning("--destinations is ignored with --inventory-only, --recheck-from and --what-if")
     if args.anonymize:
         logger.info("Anonymization: ENABLED")
     logger.info("=" * 70)
     
-    # Validate scan path
-    if not os.path.exists(args.scan_path):
+    # Validate scan path (offline checks never touch it)
+    if args.from_inventory and not args.inventory_only:
+        if not os.path.isfile(args.from_inventory):
+            logger.error(f"Inventory file does not exist: {args.from_inventory}")
+            sys.exit(1)
+    elif not os.path.exists(args.scan_path):
         logger.error(f"Scan path does not exist: {args.scan_path}")
         sys.exit(1)
-    
-    if not os.path.isdir(args.scan_path):
+    elif not os.path.isdir(args.scan_path):
         logger.error(f"Scan path is not a directory: {args.scan_path}")
         sys.exit(2)
     
@@ -1384,14 +5012,31 @@ def main():
         exclude_dirs=args.exclude_dirs,
         exclude_exts=args.exclude_exts,
         workers=args.workers,
+        engine=args.engine,
+        max_inflight=args.max_inflight,
+        queue_size=args.queue_size,
+        max_listings_per_sec=args.max_listings_per_sec,
+        max_stats_per_sec=args.max_stats_per_sec,
+        schedule_window=args.schedule_window,
+        listing_timeout=args.listing_timeout,
+        snapshot_path=None if args.inventory_only else args.snapshot,
+        full_rescan=args.full_rescan,
+        tree_snapshot_path=args.tree_snapshot,
         anonymize=args.anonymize,
         progress=args.progress,
         stream_csv=True,
         spo_url=args.spo_url,
         spo_library=args.spo_library,
         is_onedrive=args.onedrive,
-        spo_overhead=args.spo_overhead
+        spo_overhead=args.spo_overhead,
+        destinations=destinations,
+        routes=routes,
+        skip_rules=args.skip_rules,
+        custom_rules=custom_rules,
+        batch_check=args.batch_check
     )
+    if not args.inventory_only and not scanner._stat_files:
+        logger.info("No enabled rule needs file sizes or modified times; files are not stat'ed")
     
     # Start scan
     start_time = datetime.now()
@@ -1416,72 +5061,130 @@ def main():
         
         return
     
+    # What-if comparison of candidate destinations from a saved inventory
+    if args.what_if:
+        if not args.from_inventory:
+            logger.error("--what-if requires --from-inventory (an inventory CSV or tree snapshot)")
+            sys.exit(1)
+        
+        candidates = []
+        for values in args.what_if:
+            if len(values) > 2:
+                logger.error(f"--what-if takes a URL and an optional library, got: {' '.join(values)}")
+                sys.exit(1)
+            candidates.append((values[0], values[1] if len(values) == 2 else args.spo_library or 'Shared Documents'))
+        
+        results = scanner.what_if_destinations(args.from_inventory, args.scan_path, candidates)
+        duration = datetime.now() - start_time
+        
+        with StreamedCSVWriter(args.report, WHAT_IF_FIELDNAMES) as csv_writer:
+            csv_writer.write_issues(results)
+        
+        if args.summary_json:
+            with open(args.summary_json, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'scan_timestamp': start_time.isoformat(),
+                    'scan_path': args.scan_path,
+                    'inventory': args.from_inventory,
+                    'max_path': args.max_path,
+                    'what_if': results,
+                    'scan_duration_seconds': duration.total_seconds()
+                }, f, indent=2)
+            logger.info(f"JSON summary written to: {args.summary_json}")
+        
+        logger.info("=" * 70)
+        logger.info("WHAT-IF COMPARISON COMPLETE")
+        logger.info("=" * 70)
+        for result in results:
+            logger.info(
+                f"{result['SharePointBase']}: {result['PathTooLong']:,} paths too long "
+                f"(overhead {result['URLOverhead']}, longest URL {result['LongestURL']})"
+            )
+        logger.info(f"Duration: {duration}")
+        logger.info(f"Report: {args.report}")
+        logger.info("=" * 70)
+        return
+    
     # Standard issue-checking scan
     logger.info("Issue scan started...")
     
     # Use streamed CSV writing
-    fieldnames = [
-        'ItemType', 'FullPath', 'IssueType', 'CurrentValue', 'SuggestedFix',
-        'CharacterCount', 'CharacterCountPath', 'SiteURLCount', 'SharePointURL',
-        'FileSizeMB', 'FolderDepth'
-    ]
-    
     anonymize_fn = None
     if args.anonymize:
         anonymize_fn = lambda p: anonymize_path(p, scanner.anon_salt)
     
-    with StreamedCSVWriter(args.report, fieldnames, anonymize_fn) as csv_writer:
-        scanner.csv_writer = csv_writer
-        issues = scanner.scan_directory(args.scan_path)
+    if args.watch:
+        run_watch(scanner, args, logger, anonymize_fn)
+        return
+    
+    # Multi-destination scans: the combined report gets a Destination column
+    # and each destination also gets its own report
+    report_fieldnames = DESTINATION_FIELDNAMES if scanner.destinations else REPORT_FIELDNAMES
+    destination_writers = contextlib.ExitStack()
+    for destination in scanner.destinations:
+        destination.csv_writer = destination_writers.enter_context(
+            StreamedCSVWriter(destination.report_path, REPORT_FIELDNAMES, anonymize_fn)
+        )
+    
+    recheck_counts = None
+    if args.from_inventory:
+        with StreamedCSVWriter(args.report, report_fieldnames, anonymize_fn) as csv_writer:
+            scanner.csv_writer = csv_writer
+            issues = scanner.check_inventory(args.from_inventory, args.scan_path)
+    elif args.recheck_from:
+        try:
+            previous_issues = [
+                issue for issue in read_report_csv(args.recheck_from)
+                if issue.pop('RecheckStatus', None) != RECHECK_RESOLVED
+            ]
+        except OSError as e:
+            logger.error(f"Cannot read previous report {args.recheck_from}: {e}")
+            sys.exit(1)
+        
+        with StreamedCSVWriter(args.report, RECHECK_FIELDNAMES, anonymize_fn) as csv_writer:
+            rows = scanner.recheck_items(args.scan_path, previous_issues)
+            csv_writer.write_issues(rows)
+        
+        recheck_counts = {status: 0 for status in (RECHECK_STILL_OPEN, RECHECK_RESOLVED, RECHECK_NEW)}
+        for row in rows:
+            recheck_counts[row['RecheckStatus']] += 1
+        issues = [row for row in rows if row['RecheckStatus'] != RECHECK_RESOLVED]
+    else:
+        resumed = False
+        if args.checkpoint_interval > 0:
+            try:
+                resumed = scanner.start_checkpoint(args.scan_path, args.report, args.checkpoint_interval, args.resume)
+            except (OSError, ValueError) as e:
+                logger.error(f"Cannot resume: {e}")
+                sys.exit(2)
+        
+        with StreamedCSVWriter(args.report, report_fieldnames, anonymize_fn, append=resumed) as csv_writer:
+            scanner.csv_writer = csv_writer
+            if args.queue_dir:
+                try:
+                    issues = scanner.scan_directory_distributed(
+                        args.scan_path, args.queue_dir, args.local_workers, args.lease_timeout,
+                        args.queue_workers
+                    )
+                except (OSError, ValueError) as e:
+                    logger.error(f"Distributed scan failed: {e}")
+                    sys.exit(1)
+            elif args.processes > 1:
+                issues = scanner.scan_directory_sharded(args.scan_path, args.processes, args.report)
+            else:
+                issues = scanner.scan_directory(args.scan_path)
+        
+        if scanner.checkpoint:
+            scanner.checkpoint.finish()
+    
+    destination_writers.close()
     
     end_time = datetime.now()
     duration = end_time - start_time
     
     # Generate JSON summary if requested
     if args.summary_json:
-        # Count by issue type
-        issue_counts = {}
-        for issue in issues:
-            issue_type = issue['IssueType']
-            issue_counts[issue_type] = issue_counts.get(issue_type, 0) + 1
-        
-        # Top 50 longest paths
-        longest_paths = sorted(
-            [{'path': i['FullPath'], 'length': int(i['CharacterCountPath'])} for i in issues],
-            key=lambda x: x['length'],
-            reverse=True
-        )[:50]
-        
-        # Top 50 deepest folders
-        deepest = sorted(
-            [{'path': i['FullPath'], 'depth': int(i['FolderDepth'])} for i in issues if i['FolderDepth']],
-            key=lambda x: x['depth'],
-            reverse=True
-        )[:50]
-        
-        # Top 50 largest files
-        largest = sorted(
-            [{'path': i['FullPath'], 'size_mb': float(i['FileSizeMB'])} 
-             for i in issues if i['FileSizeMB']],
-            key=lambda x: x['size_mb'],
-            reverse=True
-        )[:50]
-        
-        summary = {
-            'scan_timestamp': start_time.isoformat(),
-            'scan_path': args.scan_path,
-            'sharepoint_url': args.spo_url,
-            'document_library': args.spo_library,
-            'is_onedrive': args.onedrive,
-            'total_items_scanned': scanner.scan_count,
-            'total_issues': scanner.issue_count,
-            'issues_by_type': issue_counts,
-            'top_50_longest_paths': longest_paths,
-            'top_50_deepest_folders': deepest,
-            'top_50_largest_files': largest,
-            'scan_duration_seconds': duration.total_seconds()
-        }
-        
+        summary = build_summary(scanner, args, issues, start_time, duration, recheck_counts)
         with open(args.summary_json, 'w', encoding='utf-8') as f:
             json.dump(summary, f, indent=2)
         
@@ -1493,7 +5196,23 @@ def main():
     logger.info("=" * 70)
     logger.info(f"Total items scanned: {scanner.scan_count:,}")
     logger.info(f"Total issues found: {scanner.issue_count:,}")
+    for destination in scanner.destinations:
+        logger.info(f"  {destination.name}: {destination.issue_count:,} issues -> {destination.report_path}")
+    if recheck_counts:
+        logger.info(
+            f"Recheck: {recheck_counts[RECHECK_STILL_OPEN]:,} still open, "
+            f"{recheck_counts[RECHECK_RESOLVED]:,} resolved, {recheck_counts[RECHECK_NEW]:,} new"
+        )
+    retry_counts = scanner.retry_queue.summary()
+    logger.info(f"Retries: {retry_counts['retries']:,}, permanent failures: {retry_counts['permanent_failures']:,}")
     logger.info(f"Duration: {duration}")
+    if scanner.throttle:
+        waits = scanner.throttle.summary()
+        logger.info(
+            f"Time throttled: {waits['total_wait_seconds']:,.1f}s "
+            f"(listings {waits['listing_wait_seconds']:,.1f}s, stats {waits['stat_wait_seconds']:,.1f}s, "
+            f"schedule {waits['schedule_wait_seconds']:,.1f}s; summed across threads)"
+        )
     logger.info(f"Report: {args.report}")
     logger.info("=" * 70)
     
@@ -1506,4 +5225,5 @@ def main():
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Needed for --processes in the PyInstaller EXE
     main()
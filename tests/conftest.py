@@ -0,0 +1,76 @@
+"""Shared fixtures for the scanner tests: a small share with known issues."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spo_preflight  # noqa: E402
+
+SPO_URL = 'https://contoso.sharepoint.com/sites/Team'
+SPO_LIBRARY = 'Shared Documents'
+
+# Relative path -> file size in bytes; folders end in '/'
+SAMPLE_TREE = {
+    'ok.txt': 10,
+    'README.md': 1,
+    'readme.md': 1,
+    'CON.txt': 0,
+    'in*valid.txt': 5,
+    ' leading.txt': 0,
+    'trailing.': 0,
+    'setup.exe': 20,
+    'docs/': None,
+    'docs/report:final.docx': 100,
+    'docs/notes.txt': 2,
+    'docs/deep/': None,
+    'docs/deep/deeper/': None,
+    'docs/deep/deeper/~$lock.docx': 0,
+    'docs/deep/deeper/' + 'x' * 120 + '.txt': 3,
+    'archive/': None,
+    'archive/old?.txt': 0,
+    'archive/2019/': None,
+    'archive/2019/Budget.xlsx': 4,
+    'archive/2019/budget.XLSX': 4,
+    'bad|folder/': None,
+    'bad|folder/fine.txt': 1,
+    'empty/': None,
+}
+
+
+def build_tree(root, tree=SAMPLE_TREE):
+    """Create the files and folders of tree under root."""
+    for rel_path, size in tree.items():
+        path = os.path.join(root, *rel_path.rstrip('/').split('/'))
+        if size is None:
+            os.makedirs(path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+
+
+def make_scanner(root, **kwargs):
+    """A scanner for root with the sample SharePoint destination and a short filename limit."""
+    kwargs.setdefault('spo_url', SPO_URL)
+    kwargs.setdefault('spo_library', SPO_LIBRARY)
+    kwargs.setdefault('max_filename', 100)
+    return spo_preflight.PreflightScanner(str(root), **kwargs)
+
+
+def report_rows(issues):
+    """Issues as sorted report rows, so results of different runs compare equal."""
+    return sorted(
+        tuple(str(row[field]) for field in spo_preflight.REPORT_FIELDNAMES)
+        for row in map(spo_preflight.report_row, issues)
+    )
+
+
+@pytest.fixture
+def share(tmp_path):
+    """Path of a fresh copy of SAMPLE_TREE."""
+    root = tmp_path / 'share'
+    build_tree(str(root))
+    return str(root)
@@ -0,0 +1,73 @@
+"""Targeted recheck (--recheck-from): Still open / Resolved / New classification."""
+
+import os
+
+import pytest
+
+import spo_preflight
+from conftest import make_scanner
+
+
+def previous_report(share, tmp_path):
+    """Report of a scan that could not reach the archive folder, read back like --recheck-from does."""
+    archive = os.path.join(share, 'archive')
+    issues = [issue for issue in make_scanner(share).scan_directory(share)
+              if not issue['FullPath'].startswith(archive + os.sep)]
+    issues.append(dict(
+        spo_preflight.report_row(issues[0]), ItemType='Folder', FullPath=archive, IssueType='Unreachable',
+        CurrentValue='listing timed out after 30s', FileSizeMB=''
+    ))
+    
+    report_path = str(tmp_path / 'previous.csv')
+    with spo_preflight.StreamedCSVWriter(report_path, spo_preflight.REPORT_FIELDNAMES) as writer:
+        writer.write_issues(issues)
+    return spo_preflight.read_report_csv(report_path)
+
+
+@pytest.mark.parametrize('engine', [
+    {'engine': 'thread', 'workers': 1},
+    {'engine': 'thread', 'workers': 4},
+    {'engine': 'async'},
+    {'engine': 'pipeline', 'workers': 3},
+], ids=lambda engine: '-'.join(map(str, engine.values())))
+def test_recheck_classifies_previous_and_current_issues(share, tmp_path, engine):
+    previous = previous_report(share, tmp_path)
+    
+    # Fixed, newly broken in a flagged folder, and newly broken where nothing was flagged
+    os.rename(os.path.join(share, 'CON.txt'), os.path.join(share, 'con-notes.txt'))
+    open(os.path.join(share, 'new*.txt'), 'w').close()
+    open(os.path.join(share, 'empty', 'unflagged?.txt'), 'w').close()
+    # Inside the previously unreachable subtree, which is scanned in full
+    open(os.path.join(share, 'archive', '2019', 'deep|new.txt'), 'w').close()
+    
+    rows = make_scanner(share, **engine).recheck_items(share, previous)
+    status = {}
+    for row in rows:
+        assert (row['FullPath'], row['IssueType']) not in status, 'issue reported twice'
+        status[(row['FullPath'], row['IssueType'])] = row['RecheckStatus']
+    
+    def path(*parts):
+        return os.path.join(share, *parts)
+    
+    assert status.pop((path('CON.txt'), 'Reserved device name (Windows)')) == spo_preflight.RECHECK_RESOLVED
+    assert status.pop((path('archive'), 'Unreachable')) == spo_preflight.RECHECK_RESOLVED
+    new = {key for key, value in status.items() if value == spo_preflight.RECHECK_NEW}
+    assert new == {
+        (path('new*.txt'), 'Invalid characters'),
+        (path('archive', 'old?.txt'), 'Invalid characters'),
+        (path('archive', '2019', 'Budget.xlsx'), 'Case-insensitive duplicate'),
+        (path('archive', '2019', 'budget.XLSX'), 'Case-insensitive duplicate'),
+        (path('archive', '2019', 'deep|new.txt'), 'Invalid characters'),
+    }
+    # Every other previous issue is still there
+    still_open = {key for key, value in status.items() if value == spo_preflight.RECHECK_STILL_OPEN}
+    assert still_open == {(row['FullPath'], row['IssueType']) for row in previous} - {
+        (path('CON.txt'), 'Reserved device name (Windows)'), (path('archive'), 'Unreachable')
+    }
+
+
+def test_recheck_without_changes_resolves_nothing(share, tmp_path):
+    previous = [spo_preflight.report_row(issue) for issue in make_scanner(share).scan_directory(share)]
+    rows = make_scanner(share).recheck_items(share, previous)
+    assert {row['RecheckStatus'] for row in rows} == {spo_preflight.RECHECK_STILL_OPEN}
+    assert len(rows) == len(previous)
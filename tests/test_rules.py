@@ -0,0 +1,85 @@
+"""Name validation, batch checking and custom rules."""
+
+import os
+
+import pytest
+
+import spo_preflight
+from conftest import build_tree, make_scanner, report_rows
+
+NAMES = [
+    'ok.txt', 'CON', 'con.txt', 'Con.tar.gz', 'LPT9.xlsx', 'COM0', 'nul.', 'AUX .txt', 'CONSOLE.txt',
+    'desktop.ini', 'Desktop.INI', '.lock', '~$report.xlsx', '~report.xlsx', '_vti_cnf', 'my_VTI_x',
+    'forms', 'in*valid', 'a:b?c', 'q"uote', 'a<b>c', 'pipe|', 'back\\slash', '#hash', '%pct',
+    ' lead', 'trail ', 'dot.', '.hidden', '..', 'x' * 101, 'x' * 100, 'tool.EXE', 'tool.exe',
+    '.exe', 'archive.tar.exe', 'no_extension', 'ünïcödé.txt', '日本語.docx',
+]
+
+
+@pytest.mark.parametrize('allow_hash_percent', [True, False])
+def test_name_validator_matches_reference_checks(allow_hash_percent):
+    invalid_chars = spo_preflight.get_invalid_chars(allow_hash_percent)
+    validator = spo_preflight.NameValidator(invalid_chars, 100, {'.exe', '.bat'})
+    
+    for name in NAMES:
+        for is_file in (True, False):
+            violations = validator.check(name, is_file)
+            expected_chars = list(dict.fromkeys(char for char in name if char in invalid_chars))
+            ext = os.path.splitext(name)[1]
+            expected = (
+                spo_preflight.check_reserved_name(name),
+                len(name) > 100,
+                expected_chars,
+                name != name.strip(' .'),
+                ext if is_file and ext.lower() in {'.exe', '.bat'} else None,
+            )
+            if violations is None:
+                assert not any(expected), name
+            else:
+                assert tuple(violations) == expected, name
+
+
+def test_batch_check_matches_per_item_checks(tmp_path):
+    pytest.importorskip('numpy')
+    # One folder large enough to be batch checked, with issues spread through it
+    names = [f'file{index:04d}.txt' for index in range(spo_preflight.BATCH_MIN_ENTRIES)]
+    names += ['CON.txt', 'bad*name.txt', ' lead.txt', 'tool.exe', 'x' * 101, 'Dup.txt', 'dup.TXT',
+              '_vti_x.txt', '~$lock.docx', 'ünïcödé%.txt']
+    build_tree(str(tmp_path / 'share'), {f'big/{name}': 1 for name in names} | {'big/sub/': None})
+    root = str(tmp_path / 'share')
+    
+    expected = report_rows(make_scanner(root, blocked_extensions=['.exe']).scan_directory(root))
+    scanner = make_scanner(root, blocked_extensions=['.exe'], batch_check=True)
+    assert scanner.batch_checker is not None
+    assert report_rows(scanner.scan_directory(root)) == expected
+    assert len(expected) >= 10
+
+
+def test_skip_rules_disable_checks(share):
+    issues = make_scanner(share, skip_rules=['invalid-chars', 'case-collision']).scan_directory(share)
+    issue_types = {issue['IssueType'] for issue in issues}
+    assert 'Invalid characters' not in issue_types
+    assert 'Case-insensitive duplicate' not in issue_types
+    assert 'Reserved device name (Windows)' in issue_types
+
+
+def test_custom_age_rule_counts_from_scan_day(tmp_path, monkeypatch):
+    root = str(tmp_path / 'share')
+    build_tree(root, {'old.txt': 1, 'new.txt': 1})
+    midnight = spo_preflight.age_reference()
+    os.utime(os.path.join(root, 'old.txt'), (midnight - 40 * 86400, midnight - 40 * 86400))
+    os.utime(os.path.join(root, 'new.txt'), (midnight - 10 * 86400, midnight - 10 * 86400))
+    rule = {'name': 'stale', 'issue_type': 'Stale file', 'older_than_days': 30}
+    
+    issues = make_scanner(root, custom_rules=[rule]).scan_directory(root)
+    assert [os.path.basename(issue['FullPath']) for issue in issues] == ['old.txt']
+    
+    # 25 days later both files are past the cut-off
+    monkeypatch.setattr(spo_preflight, 'age_reference', lambda: midnight + 25 * 86400)
+    issues = make_scanner(root, custom_rules=[rule]).scan_directory(root)
+    assert sorted(os.path.basename(issue['FullPath']) for issue in issues) == ['new.txt', 'old.txt']
+
+
+def test_build_custom_rule_rejects_rule_without_conditions():
+    with pytest.raises(ValueError):
+        spo_preflight.build_custom_rule({'name': 'empty', 'issue_type': 'Empty'})
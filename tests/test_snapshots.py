@@ -0,0 +1,150 @@
+"""Incremental rescans, tree snapshots and checkpoint/resume."""
+
+import os
+
+import pytest
+
+import spo_preflight
+from conftest import SAMPLE_TREE, make_scanner, report_rows
+
+FOLDER_COUNT = 1 + sum(1 for rel_path in SAMPLE_TREE if rel_path.endswith('/'))
+
+
+def touch_folder(path):
+    """Give a folder a modified time no snapshot can hold yet."""
+    mtime_ns = os.stat(path).st_mtime_ns + 5 * 10**9
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.mark.parametrize('engine', ['thread', 'pipeline'])
+def test_snapshot_reuses_unchanged_folders(share, tmp_path, engine):
+    snapshot_path = str(tmp_path / 'scan.snapshot')
+    expected = report_rows(make_scanner(share, snapshot_path=snapshot_path).scan_directory(share))
+    
+    scanner = make_scanner(share, snapshot_path=snapshot_path, engine=engine)
+    assert report_rows(scanner.scan_directory(share)) == expected
+    assert scanner.reused_dirs == FOLDER_COUNT
+    assert scanner.scan_count == len(SAMPLE_TREE)
+    
+    # A new bad name in one folder: only that folder is listed again
+    docs = os.path.join(share, 'docs')
+    open(os.path.join(docs, 'new|file.txt'), 'w').close()
+    touch_folder(docs)
+    scanner = make_scanner(share, snapshot_path=snapshot_path, engine=engine)
+    issues = scanner.scan_directory(share)
+    assert scanner.reused_dirs == FOLDER_COUNT - 1
+    assert os.path.join(docs, 'new|file.txt') in {issue['FullPath'] for issue in issues}
+
+
+def test_snapshot_with_other_settings_is_not_reused(share, tmp_path):
+    snapshot_path = str(tmp_path / 'scan.snapshot')
+    make_scanner(share, snapshot_path=snapshot_path).scan_directory(share)
+    
+    scanner = make_scanner(share, snapshot_path=snapshot_path, max_filename=50)
+    scanner.scan_directory(share)
+    assert scanner.reused_dirs == 0
+
+
+def test_snapshot_with_age_rule_is_not_reused_on_a_new_day(share, tmp_path, monkeypatch):
+    snapshot_path = str(tmp_path / 'scan.snapshot')
+    rules = [{'name': 'stale', 'issue_type': 'Stale file', 'older_than_days': 30}]
+    make_scanner(share, snapshot_path=snapshot_path, custom_rules=rules).scan_directory(share)
+    
+    scanner = make_scanner(share, snapshot_path=snapshot_path, custom_rules=rules)
+    scanner.scan_directory(share)
+    assert scanner.reused_dirs == FOLDER_COUNT
+    
+    tomorrow = spo_preflight.age_reference() + 86400
+    monkeypatch.setattr(spo_preflight, 'age_reference', lambda: tomorrow)
+    scanner = make_scanner(share, snapshot_path=snapshot_path, custom_rules=rules)
+    scanner.scan_directory(share)
+    assert scanner.reused_dirs == 0
+
+
+def test_rescan_lists_only_changed_folders(share):
+    scanner = make_scanner(share)
+    first = report_rows(scanner.rescan(share))
+    assert report_rows(scanner.rescan(share)) == first
+    assert scanner.changed_dirs == 0
+    
+    archive = os.path.join(share, 'archive')
+    os.remove(os.path.join(archive, 'old?.txt'))
+    touch_folder(archive)
+    issues = scanner.rescan(share)
+    assert scanner.changed_dirs == 1
+    assert len(issues) == len(first) - 1
+
+
+def test_tree_snapshot_records_exact_sizes_without_size_rule(share, tmp_path):
+    tree_path = str(tmp_path / 'share.tree')
+    scanner = make_scanner(share, tree_snapshot_path=tree_path, skip_rules=['file-size'], engine='pipeline')
+    scanner.scan_directory(share)
+    
+    tree = spo_preflight.TreeSnapshot(tree_path)
+    try:
+        assert len(tree) == len(SAMPLE_TREE) + 1
+        for item in range(1, len(tree)):
+            path = tree.path(item)
+            assert tree.is_file(item) == os.path.isfile(path)
+            if tree.is_file(item):
+                stat_result = os.stat(path)
+                assert tree.sizes[item] == stat_result.st_size
+                assert tree.mtimes[item] == stat_result.st_mtime_ns
+    finally:
+        tree.close()
+
+
+def test_checks_from_tree_snapshot_match_live_scan(share, tmp_path):
+    tree_path = str(tmp_path / 'share.tree')
+    expected = report_rows(make_scanner(share, tree_snapshot_path=tree_path).scan_directory(share))
+    assert report_rows(make_scanner(share).check_inventory(tree_path, share)) == expected
+
+
+def scan_with_checkpoint(share, report_path, resume, fail_after=None):
+    """Scan share with a checkpoint after every folder; with fail_after, crash after that many folders."""
+    scanner = make_scanner(share)
+    resumed = scanner.start_checkpoint(share, report_path, 0.0, resume)
+    if fail_after is not None:
+        scan_entries = scanner._scan_entries
+        calls = []
+        
+        def crashing_scan_entries(*args):
+            calls.append(args[0])
+            if len(calls) > fail_after:
+                raise RuntimeError('simulated crash')
+            return scan_entries(*args)
+        
+        scanner._scan_entries = crashing_scan_entries
+    
+    with spo_preflight.StreamedCSVWriter(report_path, spo_preflight.REPORT_FIELDNAMES, append=resumed) as writer:
+        scanner.csv_writer = writer
+        try:
+            issues = scanner.scan_directory(share)
+        finally:
+            scanner.checkpoint.file.close()
+    return scanner, resumed, issues
+
+
+def test_resume_skips_finished_folders_and_writes_each_row_once(share, tmp_path):
+    expected = report_rows(make_scanner(share).scan_directory(share))
+    report_path = str(tmp_path / 'report.csv')
+    
+    with pytest.raises(RuntimeError):
+        scan_with_checkpoint(share, report_path, resume=False, fail_after=3)
+    assert os.path.exists(f'{report_path}.checkpoint')
+    
+    scanner, resumed, issues = scan_with_checkpoint(share, report_path, resume=True)
+    assert resumed
+    assert scanner.resumed_dirs == 3
+    assert report_rows(issues) == expected
+    assert report_rows(spo_preflight.read_report_csv(report_path)) == expected
+
+
+def test_resume_with_other_settings_is_refused(share, tmp_path):
+    report_path = str(tmp_path / 'report.csv')
+    with pytest.raises(RuntimeError):
+        scan_with_checkpoint(share, report_path, resume=False, fail_after=3)
+    
+    scanner = make_scanner(share, max_filename=50)
+    with pytest.raises(ValueError):
+        scanner.start_checkpoint(share, report_path, 0.0, True)
@@ -0,0 +1,84 @@
+"""Traversal engines: identical results, listing watchdog and carried folder contexts."""
+
+import json
+import os
+import time
+
+import pytest
+
+import spo_preflight
+from conftest import SAMPLE_TREE, make_scanner, report_rows
+
+ENGINES = [
+    {'engine': 'thread', 'workers': 1},
+    {'engine': 'thread', 'workers': 4},
+    {'engine': 'async'},
+    {'engine': 'pipeline', 'workers': 3, 'queue_size': 2},
+]
+
+
+class ContextLog(dict):
+    """_folder_contexts stand-in that records how many contexts were left for the final clear()."""
+    
+    def clear(self):
+        self.left_at_clear = len(self)
+        super().clear()
+
+
+@pytest.mark.parametrize('engine', ENGINES, ids=lambda engine: '-'.join(map(str, engine.values())))
+def test_engines_report_the_same_issues(share, engine):
+    expected = report_rows(make_scanner(share).scan_directory(share))
+    
+    scanner = make_scanner(share, **engine)
+    scanner._folder_contexts = ContextLog()
+    assert report_rows(scanner.scan_directory(share)) == expected
+    assert scanner.scan_count == len(SAMPLE_TREE)
+    # Every carried context was used by the folder it was carried to
+    assert scanner._folder_contexts.left_at_clear == 0
+
+
+@pytest.mark.parametrize('engine', ENGINES, ids=lambda engine: '-'.join(map(str, engine.values())))
+def test_recheck_frees_contexts_of_folders_it_does_not_visit(share, engine):
+    previous = [spo_preflight.report_row(issue) for issue in make_scanner(share).scan_directory(share)]
+    
+    scanner = make_scanner(share, **engine)
+    scanner._folder_contexts = ContextLog()
+    scanner.recheck_items(share, previous)
+    assert scanner._folder_contexts.left_at_clear == 0
+
+
+def test_routes_compute_urls_per_subtree(share, tmp_path):
+    routes_path = tmp_path / 'routes.json'
+    routes_path.write_text(json.dumps([{
+        'source': os.path.join(share, 'docs'),
+        'spo_url': 'https://contoso.sharepoint.com/sites/Docs',
+        'spo_library': 'Library',
+    }]))
+    scanner = make_scanner(share, routes=spo_preflight.load_routes(str(routes_path), share))
+    urls = {os.path.basename(issue['FullPath']): spo_preflight.report_row(issue)['SharePointURL']
+            for issue in scanner.scan_directory(share)}
+    assert urls['report:final.docx'] == 'https://contoso.sharepoint.com/sites/Docs/Library/report%3Afinal.docx'
+    assert urls['~$lock.docx'].startswith('https://contoso.sharepoint.com/sites/Docs/Library/deep/deeper/')
+    assert urls['CON.txt'].startswith('https://contoso.sharepoint.com/sites/Team/Shared%20Documents/')
+
+
+def test_hung_listing_is_reported_unreachable(share, monkeypatch):
+    scanner = make_scanner(share, listing_timeout=0.2)
+    scanner.retry_queue = spo_preflight.DeferredRetryQueue(max_retries=0)
+    scandir = scanner._scandir
+    hung = os.path.join(share, 'archive')
+    
+    def slow_scandir(path):
+        if path == hung:
+            time.sleep(1)
+        return scandir(path)
+    
+    monkeypatch.setattr(scanner, '_scandir', slow_scandir)
+    issues = scanner.scan_directory(share)
+    
+    unreachable = [issue for issue in issues if issue['IssueType'] == 'Unreachable']
+    assert [issue['FullPath'] for issue in unreachable] == [hung]
+    # The rest of the share is still scanned, the hung subtree is not
+    paths = {issue['FullPath'] for issue in issues}
+    assert os.path.join(share, 'CON.txt') in paths
+    assert not any(path.startswith(hung + os.sep) for path in paths)
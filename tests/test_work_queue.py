@@ -0,0 +1,99 @@
+"""Shard queue of distributed scans, and the settings handed to shard workers."""
+
+import os
+
+import pytest
+
+import spo_preflight
+from conftest import make_scanner, report_rows
+
+
+@pytest.fixture
+def work_queue(tmp_path):
+    work_queue = spo_preflight.WorkQueue(str(tmp_path / 'queue'))
+    work_queue.create({'id': 'job-1'}, ['/share/a', '/share/b'])
+    return work_queue
+
+
+def write_partial(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+
+def test_claim_leases_each_shard_once(work_queue):
+    assert work_queue.load_job() == {'id': 'job-1'}
+    claimed = [work_queue.claim(), work_queue.claim()]
+    assert sorted(task['path'] for task in claimed) == ['/share/a', '/share/b']
+    assert work_queue.claim() is None
+
+
+def test_create_refuses_a_queue_with_an_unfinished_job(work_queue):
+    with pytest.raises(ValueError):
+        work_queue.create({'id': 'job-2'}, ['/share/c'])
+    
+    work_queue.mark_complete({'id': 'job-1'})
+    assert work_queue.load_job() is None
+    assert work_queue.create({'id': 'job-2'}, ['/share/c']) == ['00000']
+
+
+def test_expired_lease_is_requeued(work_queue):
+    task = work_queue.claim()
+    
+    # The first look only records the lease's mtime
+    assert work_queue.requeue_expired(0) == []
+    assert work_queue.requeue_expired(60) == []
+    assert work_queue.requeue_expired(0) == [task['id']]
+    
+    # The old holder learns it lost the lease; the shard is leased again
+    assert not work_queue.heartbeat(task)
+    assert work_queue.claim()['id'] == task['id']
+
+
+def test_heartbeat_keeps_a_lease(work_queue):
+    task = work_queue.claim()
+    assert work_queue.requeue_expired(0) == []
+    lease_path = os.path.join(work_queue.leased_dir, f"{task['id']}.json")
+    mtime_ns = os.stat(lease_path).st_mtime_ns + 10**9
+    os.utime(lease_path, ns=(mtime_ns, mtime_ns))  # A heartbeat, as another host's clock sees it
+    assert work_queue.requeue_expired(0) == []
+    assert work_queue.heartbeat(task)
+
+
+def test_finished_lease_is_not_requeued(work_queue, tmp_path):
+    task = work_queue.claim()
+    work_queue.requeue_expired(0)
+    work_queue.finish(task, write_partial(str(tmp_path / 'partial.csv'), 'rows'), {'scan_count': 1})
+    assert work_queue.requeue_expired(0) == []
+    assert work_queue.read_result(task['id']) == {'scan_count': 1}
+
+
+def test_shard_is_published_once(work_queue, tmp_path):
+    task = work_queue.claim()
+    first = write_partial(str(tmp_path / 'first.csv'), 'first copy')
+    second = write_partial(str(tmp_path / 'second.csv'), 'second copy')
+    
+    work_queue.finish(task, first, {'scan_count': 1})
+    # A worker whose lease was reassigned finishes the same shard late
+    work_queue.finish(task, second, {'scan_count': 2})
+    
+    report_path, _ = work_queue.result_paths(task['id'])
+    with open(report_path, encoding='utf-8') as f:
+        assert f.read() == 'first copy'
+    assert work_queue.read_result(task['id']) == {'scan_count': 1}
+    assert not os.path.exists(first) and not os.path.exists(second)
+
+
+def test_shard_workers_split_rate_caps(share):
+    scanner = make_scanner(share, max_listings_per_sec=100, max_stats_per_sec=1000, anonymize=True)
+    config = scanner._shard_worker_config(4)
+    assert config['max_listings_per_sec'] == 25
+    assert config['max_stats_per_sec'] == 250
+    assert not config['anonymize'] and config['snapshot_path'] is None
+
+
+def test_sharded_scan_matches_serial_scan(share, tmp_path):
+    expected = report_rows(make_scanner(share).scan_directory(share))
+    scanner = make_scanner(share)
+    issues = scanner.scan_directory_sharded(share, 2, str(tmp_path / 'report.csv'))
+    assert report_rows(issues) == expected